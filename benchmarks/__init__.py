@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for otlet, run against a local stand-in for PyPI.
+
+    python -m benchmarks run [--quick] [-o results.json]
+    python -m benchmarks compare old.json new.json
+"""
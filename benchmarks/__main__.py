@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
+from otlet_cli import __version__
+from .fakepypi import RECORDINGS_DIR
+from .suite import BENCHMARKS, run_benchmarks
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+RESULTS_FORMAT = 1
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> int:
+    commit = git_commit()
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": time.time(),
+        "commit": commit,
+        "otlet_cli": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "quick": args.quick,
+        "results": run_benchmarks(args.only, args.repeat, args.quick),
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit or int(report['created'])}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}", file=sys.stderr)
+    return 0
+
+
+def compare(args) -> int:
+    reports: List[Dict[str, Any]] = []
+    for path in (args.old, args.new):
+        with open(path) as f:
+            reports.append(json.load(f))
+    old, new = (report["results"] for report in reports)
+    print(f"{reports[0].get('commit') or args.old} -> {reports[1].get('commit') or args.new} (median times)\n")
+    print(f"{'[benchmark]':<48}{'[old]':>12}{'[new]':>12}{'[change]':>10}")
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key]["median"], new[key]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        text = f"{key:<48}{before * 1000:>10.2f}ms{after * 1000:>10.2f}ms{change:>+9.1f}%"
+        if change > args.threshold:
+            regressions += 1
+            text = f"\u001b[31m{text}\u001b[0m"
+        elif change < -args.threshold:
+            text = f"\u001b[32m{text}\u001b[0m"
+        print(text)
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key:<48}  (only in {'old' if key in old else 'new'} results)")
+    if regressions:
+        print(f"\n{regressions} benchmark(s) slower by more than {args.threshold}%.")
+    return 1 if regressions and args.fail else 0
+
+
+def record(args) -> int:
+    """Save PyPI's current JSON API responses for packages, to be served by the fake PyPI."""
+    from urllib.request import urlopen
+
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    for name in args.packages:
+        with urlopen(f"https://pypi.org/pypi/{name}/json") as res:
+            body = res.read()
+        with open(os.path.join(RECORDINGS_DIR, f"{name}.json"), "wb") as f:
+            f.write(body)
+        print(f"Recorded {name} ({round(len(body) / 1024, 1)} KiB)", file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(prog="python -m benchmarks", description="Offline benchmarks for otlet")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save their results as JSON")
+    run_parser.add_argument("-o", "--output", help=f"where to write the results (Default: {RESULTS_DIR}/<commit>.json)")
+    run_parser.add_argument("-n", "--repeat", type=int, default=5, help="runs of every benchmark (Default: 5)")
+    run_parser.add_argument("--quick", action="store_true", help="skip the largest inputs")
+    run_parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="only run these benchmarks")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=10.0, help="percentage a benchmark may slow down by (Default: 10)"
+    )
+    compare_parser.add_argument("--fail", action="store_true", help="exit with status 1 if any benchmark regressed")
+    compare_parser.set_defaults(func=compare)
+
+    record_parser = subparsers.add_parser("record", help="record PyPI responses for packages (requires network access)")
+    record_parser.add_argument("packages", nargs="+")
+    record_parser.set_defaults(func=record)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+CHUNK_SIZE = 256 * 1024
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def synthetic_data(filename: str, size: int) -> bytes:
+    """Return size bytes of deterministic content for filename."""
+    block = hashlib.sha256(filename.encode()).digest() * 2048  # 64 KiB
+    return (block * (size // len(block) + 1))[:size]
+
+
+def _with_etag(data: bytes) -> Tuple[bytes, str]:
+    return data, f'"{hashlib.md5(data).hexdigest()}"'
+
+
+def file_entry(url: str, filename: str, size: int, sha256: str, upload_time: datetime) -> Dict[str, Any]:
+    """Return the description of a distribution file, as found in PyPI's 'releases' and 'urls'."""
+    wheel = filename.endswith(".whl")
+    return {
+        "comment_text": "",
+        "digests": {"md5": hashlib.md5(filename.encode()).hexdigest(), "sha256": sha256},
+        "downloads": -1,
+        "filename": filename,
+        "has_sig": False,
+        "md5_digest": hashlib.md5(filename.encode()).hexdigest(),
+        "packagetype": "bdist_wheel" if wheel else "sdist",
+        "python_version": filename.split("-")[2] if wheel else "source",
+        "requires_python": ">=3.7",
+        "size": size,
+        "upload_time": upload_time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "upload_time_iso_8601": upload_time.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+        "url": url,
+        "yanked": False,
+        "yanked_reason": None,
+    }
+
+
+class FakePyPI:
+    """
+    Local stand-in for PyPI, answering '/pypi/<name>/json' like the JSON API
+    and '/packages/<filename>' like files.pythonhosted.org (with HEAD, conditional
+    requests and byte range support). It serves the recorded responses in
+    benchmarks/recordings, and synthetic projects and files added at runtime.
+    """
+
+    def __init__(self, recordings: Optional[str] = RECORDINGS_DIR) -> None:
+        # response bodies with their ETags, by canonical project name and by filename
+        self.projects: Dict[str, Tuple[bytes, str]] = {}
+        self.files: Dict[str, Tuple[bytes, str]] = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakePyPIRequestHandler)
+        self.server.daemon_threads = True
+        self.server.fakepypi = self  # type: ignore
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.index_url = self.url + "/pypi"
+        self._thread: Optional[threading.Thread] = None
+        if recordings and os.path.isdir(recordings):
+            for filename in sorted(os.listdir(recordings)):
+                if filename.endswith(".json"):
+                    with open(os.path.join(recordings, filename), "rb") as f:
+                        self.projects[canonical_name(filename[:-5])] = _with_etag(f.read())
+
+    def add_file(self, filename: str, size: int) -> Tuple[str, str]:
+        """Serve size bytes of synthetic content as filename. Returns its URL and sha256 digest."""
+        data = synthetic_data(filename, size)
+        self.files[filename] = _with_etag(data)
+        return f"{self.url}/packages/{filename}", hashlib.sha256(data).hexdigest()
+
+    def add_project(
+        self,
+        name: str,
+        releases: int = 1,
+        wheels: Optional[List[str]] = None,
+        file_size: int = 64 * 1024,
+        requires_dist: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Add a synthetic project with the given number of releases, each with
+        an sdist, and the latest one with a wheel for every tag triple in wheels
+        (i.e. 'cp311-cp311-manylinux_2_17_x86_64'). Only the files of the
+        latest release can actually be downloaded. Returns the latest version.
+        """
+        start = datetime(2015, 1, 1)
+        versions = [f"{i // 100}.{i // 10 % 10}.{i % 10}" for i in range(1, releases + 1)]
+        release_files: Dict[str, List[Dict[str, Any]]] = {}
+        for num, version in enumerate(versions):
+            filename = f"{name}-{version}.tar.gz"
+            upload_time = start + timedelta(hours=num)
+            if version == versions[-1]:
+                url, sha256 = self.add_file(filename, file_size)
+            else:
+                url, sha256 = f"{self.url}/packages/{filename}", hashlib.sha256(filename.encode()).hexdigest()
+            release_files[version] = [file_entry(url, filename, file_size, sha256, upload_time)]
+        latest = versions[-1]
+        upload_time = start + timedelta(hours=releases)
+        for tags in wheels or []:
+            filename = f"{name.replace('-', '_')}-{latest}-{tags}.whl"
+            url, sha256 = self.add_file(filename, file_size)
+            release_files[latest].append(file_entry(url, filename, file_size, sha256, upload_time))
+
+        body = json.dumps(
+            {
+                "info": {
+                    "author": "otlet benchmarks",
+                    "author_email": "bench@example.com",
+                    "classifiers": [],
+                    "description": "",
+                    "home_page": f"{self.url}/{name}",
+                    "license": "MIT",
+                    "maintainer": None,
+                    "maintainer_email": None,
+                    "name": name,
+                    "package_url": f"{self.url}/project/{name}/",
+                    "project_urls": {"Homepage": f"{self.url}/{name}"},
+                    "requires_dist": requires_dist,
+                    "requires_python": ">=3.7",
+                    "summary": f"Synthetic project with {releases} releases",
+                    "version": latest,
+                    "yanked": False,
+                    "yanked_reason": None,
+                },
+                "last_serial": releases,
+                "releases": release_files,
+                "urls": release_files[latest],
+                "vulnerabilities": [],
+            }
+        ).encode()
+        self.projects[canonical_name(name)] = _with_etag(body)
+        return latest
+
+    def start(self) -> "FakePyPI":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakePyPI":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakePyPIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, which Nagle's algorithm would delay on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.respond(head=False)
+
+    def do_HEAD(self) -> None:
+        self.respond(head=True)
+
+    def respond(self, head: bool) -> None:
+        fakepypi: FakePyPI = self.server.fakepypi  # type: ignore
+        segments = self.path.split("?")[0].strip("/").split("/")
+        if segments[0] == "pypi" and len(segments) == 3 and segments[2] == "json":
+            project = fakepypi.projects.get(canonical_name(segments[1]))
+            if project is None:
+                return self.send_empty(404)
+            return self.send_data(*project, "application/json", head)
+        if segments[0] == "packages" and len(segments) == 2 and segments[1] in fakepypi.files:
+            return self.send_data(*fakepypi.files[segments[1]], "application/octet-stream", head, ranges=True)
+        self.send_empty(404)
+
+    def send_empty(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_data(self, data: bytes, etag: str, content_type: str, head: bool, ranges: bool = False) -> None:
+        if not ranges and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            return self.end_headers()
+        start, end = 0, len(data) - 1
+        _match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "") if ranges else None
+        if _match and self.headers.get("If-Range", etag) == etag:
+            start = int(_match.group(1))
+            end = min(int(_match.group(2)), end) if _match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", etag)
+        if ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if head:
+            return
+        view = memoryview(data)
+        for offset in range(start, end + 1, CHUNK_SIZE):
+            self.wfile.write(view[offset : min(offset + CHUNK_SIZE, end + 1)])
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
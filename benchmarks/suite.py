@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from argparse import Namespace
+from typing import Any, Callable, Dict, List, Optional
+from otlet_cli import config
+from .fakepypi import FakePyPI
+
+MiB = 1024 * 1024
+# wheel tags of a project with many binary wheels, i.e. numpy
+PYTHON_TAGS = [
+    "cp37-cp37m",
+    "cp38-cp38",
+    "cp39-cp39",
+    "cp310-cp310",
+    "cp311-cp311",
+    "cp312-cp312",
+    "cp313-cp313",
+    "pp39-pypy39_pp73",
+]
+PLATFORM_TAGS = [
+    "manylinux_2_17_x86_64.manylinux2014_x86_64",
+    "manylinux_2_17_aarch64.manylinux2014_aarch64",
+    "musllinux_1_1_x86_64",
+    "musllinux_1_1_aarch64",
+    "macosx_10_9_x86_64",
+    "macosx_11_0_arm64",
+    "win32",
+    "win_amd64",
+]
+
+BENCHMARKS: Dict[str, Callable[["BenchmarkContext"], Dict[str, Any]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    """Register a benchmark function under name."""
+
+    def register(func: Callable) -> Callable:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+class BenchmarkContext:
+    """What every benchmark gets to work with: the fake PyPI, and how hard to try."""
+
+    def __init__(self, fakepypi: FakePyPI, repeat: int, quick: bool) -> None:
+        self.fakepypi = fakepypi
+        self.repeat = repeat
+        self.quick = quick
+        self.tmpdir = tempfile.mkdtemp(prefix="otlet-bench-")
+
+    def close(self) -> None:
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def configure(index_url: str) -> None:
+    """Set otlet's global configuration for in-process runs against the fake PyPI."""
+    config.update(
+        verbose=False,
+        no_cache=True,
+        refresh=False,
+        no_daemon=True,
+        offline=False,
+        store=False,
+        format="text",
+        index_url=index_url,
+        files_url=None,
+    )
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    """Return the wall time of repeat calls of func, running setup untimed before each."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def summarize(runs: List[float], **extra: Any) -> Dict[str, Any]:
+    return {
+        "unit": "s",
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+        "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        **extra,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Discard everything printed to stdout."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@benchmark("main")
+def bench_main(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """End-to-end 'otlet <package>' in a fresh interpreter, as a user would run it."""
+    results = {}
+    env = dict(
+        os.environ,
+        OTLET_INDEX_URL=ctx.fakepypi.index_url,
+        OTLET_CACHE_DIR=os.path.join(ctx.tmpdir, "cache"),
+        OTLET_NO_DAEMON="1",
+    )
+    env.pop("OTLET_SNAPSHOT", None)
+    projects = ["bench-small"] + sorted(name for name in ctx.fakepypi.projects if not name.startswith("bench-"))
+    for name in projects:
+        command = [sys.executable, "-m", "otlet_cli", name, "--no-cache"]
+        results[f"main/{name}"] = summarize(
+            measure(lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True), ctx.repeat)
+        )
+    return results
+
+
+@benchmark("print_releases")
+def bench_print_releases(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """Fetching and parsing projects with thousands of releases, and listing their releases."""
+    from otlet_cli import api, util
+
+    results = {}
+    for releases in (1000,) if ctx.quick else (1000, 5000):
+        name = f"bench-releases-{releases}"
+        results[f"fetch/{releases}-releases"] = summarize(
+            measure(lambda: api.OtletPackageObject(name), ctx.repeat)
+        )
+        pkg = api.OtletPackageObject(name)
+        for sort in ("version", "date"):
+            args = Namespace(
+                after_version=None, before_version=None, after_date=None, before_date=None,
+                sort=sort, latest=None, limit=None,
+            )
+            with quiet():
+                runs = measure(lambda: util.print_releases(pkg, args), ctx.repeat)
+            results[f"print_releases/{releases}-releases/{sort}"] = summarize(runs)
+        args = Namespace(
+            after_version=["0.5.0"], before_version=["9.0.0"], after_date=["2015-02-01"], before_date=None,
+            sort="version", latest=[10], limit=None,
+        )
+        with quiet():
+            runs = measure(lambda: util.print_releases(pkg, args), ctx.repeat)
+        results[f"print_releases/{releases}-releases/range"] = summarize(runs)
+    return results
+
+
+@benchmark("get_dists")
+def bench_get_dists(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """Listing and filtering the distributions of a release with hundreds of wheels."""
+    from otlet_cli import api, download
+    from otlet_cli.clparser.options import OtletArgumentParser
+
+    pkg = api.OtletPackageObject("bench-wheels")
+    results = {"get_dists/all": summarize(measure(lambda: download.get_dists(pkg), ctx.repeat * 10))}
+    selectors = {
+        "python_tag": "python_tag:cp311",
+        "platform_glob": "python_tag:cp3*,platform_tag:manylinux*x86_64",
+        "no_match": "platform_tag:solaris*",
+    }
+    for label, selector in selectors.items():
+        argv = ["download", "bench-wheels", "-w", selector]
+        opt_dict = OtletArgumentParser(argv).parse_args(argv).whl_options
+        results[f"get_dists/{label}"] = summarize(
+            measure(lambda: download.get_dists(pkg, opt_dict), ctx.repeat * 10),
+            matches=len(download.get_dists(pkg, opt_dict)),
+        )
+    return results
+
+
+@benchmark("download")
+def bench_download(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """Download throughput of download._download at several file sizes, over one and several connections."""
+    from otlet_cli import download
+
+    results = {}
+    for size in (1 * MiB, 16 * MiB) if ctx.quick else (1 * MiB, 16 * MiB, 64 * MiB):
+        url, sha256 = ctx.fakepypi.add_file(f"bench-download-{size}.whl", size)
+        dest = os.path.join(ctx.tmpdir, f"bench-download-{size}.whl")
+
+        def cleanup() -> None:
+            for path in (dest, dest + ".part", dest + ".part.json"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        for connections in (1, 4):
+            def run() -> None:
+                progress = download._download(url, dest, connections, digests={"sha256": sha256})
+                if progress.status != 0:
+                    raise RuntimeError(progress.error or "download failed")
+
+            runs = measure(run, ctx.repeat, setup=cleanup)
+            results[f"download/{size // MiB}MiB/{connections}-connections"] = summarize(
+                runs, throughput=round(size / MiB / statistics.median(runs), 1)
+            )
+        cleanup()
+    return results
+
+
+@benchmark("watch")
+def bench_watch(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """One 'otlet watch --once' pass over many unchanged projects, revalidated by ETag and, without one, by digest."""
+    from otlet_cli import watch
+
+    count = 50 if ctx.quick else 200
+    names = [f"bench-watch-{num}" for num in range(count)]
+    for name in names:
+        if watch.canonical_name(name) not in ctx.fakepypi.projects:
+            ctx.fakepypi.add_project(name, releases=100)
+    state: Dict[str, dict] = {}
+    watch.Watcher(names, state).run(lambda event: None, lambda: None, once=True)
+
+    def without_etags() -> None:
+        for entry in state.values():
+            entry["etag"] = None
+
+    results = {
+        f"watch/{count}-projects/etag": summarize(
+            measure(lambda: watch.Watcher(names, state).run(lambda event: None, lambda: None, once=True), ctx.repeat)
+        ),
+        f"watch/{count}-projects/digest": summarize(
+            measure(
+                lambda: watch.Watcher(names, state).run(lambda event: None, lambda: None, once=True),
+                ctx.repeat,
+                setup=without_etags,
+            )
+        ),
+    }
+    return results
+
+
+@benchmark("verify")
+def bench_verify(ctx: BenchmarkContext) -> Dict[str, Any]:
+    """'otlet verify' of a wheelhouse with thousands of files, hashed in one process and in one per core."""
+    from otlet_cli import verify
+
+    count = 20 if ctx.quick else 150
+    wheelhouse = os.path.join(ctx.tmpdir, "wheelhouse")
+    os.makedirs(wheelhouse, exist_ok=True)
+    tags = [f"{python}-{platform}" for python in PYTHON_TAGS for platform in PLATFORM_TAGS]
+    for num in range(count):
+        name = f"bench-verify-{num}"
+        latest = ctx.fakepypi.add_project(name, releases=3, wheels=tags, file_size=16 * 1024)
+        prefix = (f"{name}-{latest}-", f"{name.replace('-', '_')}-{latest}-")
+        for filename, (data, _) in ctx.fakepypi.files.items():
+            if filename.startswith(prefix):
+                with open(os.path.join(wheelhouse, filename), "wb") as f:
+                    f.write(data)
+    files = verify.scan(wheelhouse)
+
+    def run(processes: Optional[int]) -> None:
+        results = list(verify.verify_files(files, processes=processes))
+        if any(result.status != "ok" for result in results):
+            raise RuntimeError("verification failed")
+
+    return {
+        f"verify/{len(files)}-files/1-process": summarize(measure(lambda: run(1), ctx.repeat)),
+        f"verify/{len(files)}-files/process-per-core": summarize(measure(lambda: run(None), ctx.repeat)),
+    }
+
+
+def setup_projects(fakepypi: FakePyPI) -> None:
+    """Add the synthetic projects the benchmarks query."""
+    fakepypi.add_project("bench-small", releases=20, requires_dist=["requests>=2.0", "six; python_version < \"4\""])
+    fakepypi.add_project("bench-releases-1000", releases=1000)
+    fakepypi.add_project("bench-releases-5000", releases=5000)
+    fakepypi.add_project(
+        "bench-wheels",
+        releases=50,
+        wheels=[f"{python}-{platform}" for python in PYTHON_TAGS for platform in PLATFORM_TAGS],
+        file_size=1024,
+    )
+
+
+def run_benchmarks(names: Optional[List[str]] = None, repeat: int = 5, quick: bool = False) -> Dict[str, Any]:
+    """Run the named benchmarks (all of them by default) against a fresh fake PyPI, returning every result by name."""
+    results: Dict[str, Any] = {}
+    with FakePyPI() as fakepypi:
+        setup_projects(fakepypi)
+        configure(fakepypi.index_url)
+        ctx = BenchmarkContext(fakepypi, repeat, quick)
+        try:
+            for name in names or list(BENCHMARKS):
+                print(f"Running {name}...", file=sys.stderr)
+                for key, result in BENCHMARKS[name](ctx).items():
+                    print(f"  {key}: {round(result['median'] * 1000, 2)} ms", file=sys.stderr)
+                    results[key] = result
+        finally:
+            ctx.close()
+    return results
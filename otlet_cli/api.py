@@ -0,0 +1,96 @@
+import io
+from typing import Optional
+from urllib.error import HTTPError
+from otlet.api import PackageObject
+from otlet.exceptions import (
+    PyPIServiceDown,
+    PyPIPackageNotFound,
+    PyPIPackageVersionNotFound,
+)
+from . import util, cache, daemon, index, pool, snapshot, trace, config
+
+
+@trace.traced("fetch")
+def fetch_json(url: str, refresh: Optional[bool] = None) -> bytes:
+    """
+    Return the raw body of a PyPI JSON API response. When running offline, it
+    is read from the snapshot. If an 'otlet serve' daemon is running, it
+    answers from its memory cache. Otherwise the response is served from the
+    metadata cache when possible, and stale cache entries are revalidated with
+    a conditional request, so an unchanged project only costs a '304 Not
+    Modified' round trip over a pooled keep-alive connection.
+    """
+    if refresh is None:
+        refresh = config.get("refresh", False)
+    index_url = index.index_url()
+    _snapshot = snapshot.get_snapshot()
+    if _snapshot is not None and url.startswith(index_url):
+        return _snapshot.lookup(url[len(index_url):])
+    if not config.get("no_daemon") and url.startswith(index_url):
+        body = daemon.fetch(url[len(index_url):], refresh)
+        if body is not None:
+            util.verbose_print(fetch_json, f"Served {url} through the otlet daemon")
+            return body
+
+    _cache = cache.get_cache()
+    entry = _cache.get(url) if _cache else None
+    if entry and not refresh and entry.is_fresh(_cache.ttl):
+        util.verbose_print(fetch_json, f"Serving {url} from cache")
+        return entry.body
+
+    headers = {"Accept": "application/json"}
+    if entry and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    try:
+        util.verbose_print(fetch_json, f"Requesting {url}")
+        res = pool.get_pool().request(url, headers)
+    except HTTPError as err:
+        if err.code == 304 and entry:
+            util.verbose_print(fetch_json, f"{url} not modified, revalidating cache entry")
+            _cache.revalidated(entry)
+            return entry.body
+        raise
+    if _cache:
+        _cache.put(url, res.body, res.headers.get("ETag"))
+    return res.body
+
+
+class OtletPackageObject(PackageObject):
+    """
+    :class:`otlet.api.PackageObject` that fetches its data through :func:`fetch_json`.
+    refresh overrides the '--refresh' setting for this object only. The raw
+    response it was parsed from is kept as body.
+    """
+
+    def __init__(self, package_name: str, release: Optional[str] = None, refresh: Optional[bool] = None, **kwargs):
+        self.refresh = refresh
+        self.body = b""
+        # everything but the nested fetch span is spent parsing the response
+        with trace.span("PackageObject", "parse", package=package_name, release=release):
+            super().__init__(package_name, release, **kwargs)
+
+    def _attempt_request(self):
+        project_url = f"{index.index_url()}/{self.name}/json"
+        # relative file URLs in the response are resolved against source_url
+        self.source_url = project_url
+        try:
+            if not self.release:
+                self.body = fetch_json(project_url, self.refresh)
+                return io.BytesIO(self.body)
+            try:
+                self.source_url = f"{index.index_url()}/{self.name}/{self.release}/json"
+                self.body = fetch_json(self.source_url, self.refresh)
+                return io.BytesIO(self.body)
+            except HTTPError as err:
+                if err.code != 404:
+                    raise
+            # only check the project itself when the release lookup fails,
+            # to tell a missing version apart from a missing package
+            fetch_json(project_url, self.refresh)
+            raise PyPIPackageVersionNotFound(self.name, self.release)
+        except HTTPError as err:
+            if err.code == 404:
+                raise PyPIPackageNotFound(self.name) from err
+            if err.code == 503:
+                raise PyPIServiceDown from err
+            raise err
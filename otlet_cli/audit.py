@@ -0,0 +1,59 @@
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set
+from otlet.api import PackageObject, PackageVulnerabilitiesObject
+from . import util, batch
+
+
+class AuditResult(NamedTuple):
+    spec: "batch.PackageSpec"
+    pkg: Optional[PackageObject]
+    vulnerabilities: List[PackageVulnerabilitiesObject]
+    error: Optional[str]
+
+
+def known_vulnerabilities(
+    pkg: PackageObject, ignore: Optional[Set[str]] = None
+) -> List[PackageVulnerabilitiesObject]:
+    """
+    Return the vulnerabilities PyPI reports for pkg, leaving out withdrawn ones,
+    and any whose id or aliases are in ignore.
+    """
+    withdrawn = {v["id"] for v in pkg.http_response.get("vulnerabilities") or [] if v.get("withdrawn")}
+    ignore = ignore or set()
+    return [
+        vuln
+        for vuln in pkg.vulnerabilities or []
+        if vuln.id not in withdrawn and vuln.id not in ignore and not ignore.intersection(vuln.aliases)
+    ]
+
+
+def audit_packages(
+    specs: Iterable["batch.PackageSpec"], jobs: int = batch.DEFAULT_JOBS, ignore: Optional[Set[str]] = None
+) -> Iterator[AuditResult]:
+    """
+    Check every spec for known vulnerabilities, fetching them concurrently.
+    Pinned specs are checked at their pinned version, anything else at the
+    latest release. Results are yielded in input order.
+    """
+    for spec, pkg in batch.fetch_packages(specs, jobs):
+        if isinstance(pkg, Exception):
+            util.verbose_print(audit_packages, f"Unable to audit {spec.line}: {pkg}")
+            yield AuditResult(spec, None, [], str(pkg))
+            continue
+        yield AuditResult(spec, pkg, known_vulnerabilities(pkg, ignore), None)
+
+
+def fixed_version(pkg: PackageObject, vulnerabilities: List[PackageVulnerabilitiesObject]) -> Optional[str]:
+    """
+    Return the oldest release newer than pkg that is fixed for all of vulnerabilities,
+    going by the first fixed version PyPI lists for each. None if any of them is unfixed.
+    """
+    needed = []
+    for vuln in vulnerabilities:
+        try:
+            fixes = [v for v in vuln.fixed_in if v > pkg.info.version]
+        except TypeError:  # legacy versions can't be compared with PEP 440 ones
+            fixes = []
+        if not fixes:
+            return None
+        needed.append(min(fixes))
+    return str(max(needed)) if needed else None
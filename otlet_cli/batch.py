@@ -0,0 +1,78 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from otlet.api import PackageObject
+from otlet.exceptions import PyPIAPIError
+from . import util, api
+
+DEFAULT_JOBS = 8
+SPECRGX = re.compile(
+    r"^(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)"
+    r"\s*(?P<extras>\[[^\]]*\])?"
+    r"\s*(?P<constraints>[^;]*)"
+)
+
+
+class PackageSpec(NamedTuple):
+    line: str
+    name: str
+    version: Optional[str]
+
+
+def parse_spec(line: str) -> Optional[PackageSpec]:
+    """
+    Parse a single requirements-style line. Only exact pins ('==' or '===')
+    select a version; anything else resolves to the latest stable release.
+    Returns None for blank lines, comments, options and unsupported references.
+    """
+    line = line.split(" #")[0].strip()
+    if not line or line.startswith(("#", "-")) or "://" in line:
+        return None
+    _match = SPECRGX.match(line)
+    if not _match:
+        return None
+    version = None
+    constraints = _match.group("constraints").replace(" ", "")
+    pin = re.fullmatch(r"===?([^,*]+)", constraints)
+    if pin:
+        version = pin.group(1)
+    return PackageSpec(line, _match.group("name"), version)
+
+
+def read_specs(path: str) -> List[PackageSpec]:
+    """Read package specs from a requirements-style file, or stdin if path is '-'."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    specs = []
+    for line in lines:
+        spec = parse_spec(line)
+        if spec:
+            specs.append(spec)
+        elif line.strip() and not line.lstrip().startswith("#"):
+            util.verbose_print(read_specs, f"Skipping unsupported line: {line}")
+    return specs
+
+
+def _fetch(spec: PackageSpec) -> Union[PackageObject, PyPIAPIError]:
+    try:
+        return api.OtletPackageObject(spec.name, spec.version)
+    except PyPIAPIError as err:
+        return err
+
+
+def fetch_packages(
+    specs: Iterable[PackageSpec], jobs: int = DEFAULT_JOBS
+) -> Iterator[Tuple[PackageSpec, Union[PackageObject, PyPIAPIError]]]:
+    """
+    Fetch a :class:`PackageObject` for every spec through a bounded thread pool.
+    Results are yielded in input order as soon as they are available; lookup
+    errors are yielded in place of the package instead of being raised.
+    """
+    specs = list(specs)
+    util.verbose_print(fetch_packages, f"Fetching {len(specs)} packages with {jobs} workers")
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        yield from zip(specs, executor.map(_fetch, specs))
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+from typing import Iterator, NamedTuple, Optional, Tuple
+from . import trace, config
+
+DEFAULT_TTL = 600  # seconds a cached response is served without revalidation
+# temporary files older than this are left behind by a process that died while writing them
+STALE_TMP_AGE = 3600
+
+
+def cache_dir() -> str:
+    """Return the root otlet cache directory, honoring $OTLET_CACHE_DIR and $XDG_CACHE_HOME."""
+    if os.environ.get("OTLET_CACHE_DIR"):
+        return os.environ["OTLET_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "otlet")
+
+
+def cache_ttl() -> int:
+    """Return the TTL set with $OTLET_CACHE_TTL, or DEFAULT_TTL if it is unset or not a number of seconds."""
+    value = os.environ.get("OTLET_CACHE_TTL")
+    if not value:
+        return DEFAULT_TTL
+    try:
+        if int(value) >= 0:
+            return int(value)
+    except ValueError:
+        pass
+    print(f"otlet: ignoring invalid $OTLET_CACHE_TTL '{value}', expected a number of seconds", file=sys.stderr)
+    return DEFAULT_TTL
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    etag: Optional[str]
+    fetched: float
+    body: bytes
+    path: str
+
+    def is_fresh(self, ttl: int) -> bool:
+        return time.time() - self.fetched < ttl
+
+
+class MetadataCache:
+    """
+    On-disk cache of PyPI JSON API responses, keyed by request URL.
+
+    Each entry is stored as a single file whose first line is a JSON header
+    (url, etag, fetch time) followed by the raw response body. File mtimes
+    double as last-access times for size-based eviction.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None) -> None:
+        self.path = os.path.join(path or cache_dir(), "json")
+        self.ttl = cache_ttl() if ttl is None else ttl
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    @trace.traced("cache")
+    def get(self, url: str) -> Optional[CacheEntry]:
+        path = self._entry_path(url)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if header.get("url") != url:
+            return None
+        os.utime(path)  # mark as recently used
+        return CacheEntry(url, header.get("etag"), header["fetched"], body, path)
+
+    @trace.traced("cache")
+    def put(self, url: str, body: bytes, etag: Optional[str] = None) -> None:
+        path = self._entry_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = json.dumps({"url": url, "etag": etag, "fetched": time.time()})
+        # write to a temporary file first, so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.encode() + b"\n" + body)
+        os.replace(tmp, path)
+
+    def revalidated(self, entry: CacheEntry) -> None:
+        """Reset the TTL of an entry after the server confirmed it is unchanged."""
+        self.put(entry.url, entry.body, entry.etag)
+
+    def files(self, temporary: bool = False) -> Iterator[Tuple[str, os.stat_result]]:
+        """Yield every cache entry with its stat result, or with temporary, the files of entries being written."""
+        if not os.path.isdir(self.path):
+            return
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".tmp") != temporary:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    yield path, os.stat(path)
+                except OSError:
+                    continue
+
+    def stats(self) -> dict:
+        entries = list(self.files())
+        return {
+            "path": self.path,
+            "entries": len(entries),
+            "size": sum(st.st_size for _, st in entries),
+            "oldest": min((st.st_mtime for _, st in entries), default=None),
+            "newest": max((st.st_mtime for _, st in entries), default=None),
+        }
+
+    def prune(
+        self, max_size: Optional[int] = None, max_age: Optional[float] = None
+    ) -> Tuple[int, int]:
+        """
+        Evict entries not used within max_age seconds, then evict least recently
+        used entries until the cache is no larger than max_size bytes.
+        Returns the number of removed entries and bytes freed.
+        """
+        entries = sorted(self.files(), key=lambda e: e[1].st_mtime)
+        total = sum(st.st_size for _, st in entries)
+        now = time.time()
+        removed = freed = 0
+        for path, st in entries:
+            expired = max_age is not None and now - st.st_mtime > max_age
+            oversized = max_size is not None and total > max_size
+            if not (expired or oversized):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= st.st_size
+            removed += 1
+            freed += st.st_size
+        for path, st in self.files(temporary=True):
+            # only remove those no other process can still be writing
+            if now - st.st_mtime > STALE_TMP_AGE:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return removed, freed
+
+
+_metadata_cache: Optional[MetadataCache] = None
+
+
+def get_cache() -> Optional[MetadataCache]:
+    """Return the process-wide metadata cache, or None if caching is disabled."""
+    global _metadata_cache
+    if config.get("no_cache"):
+        return None
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+    return _metadata_cache
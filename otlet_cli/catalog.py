@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import mmap
+import time
+import struct
+import bisect
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+from . import util, cache, index
+
+CATALOG_FILE = "catalog.bin"
+CATALOG_FORMAT = 1
+# every character of a canonical project name, in byte order
+ALPHABET = "-0123456789abcdefghijklmnopqrstuvwxyz"
+PREFIXES = len(ALPHABET) ** 2
+SIMPLE_JSON = "application/vnd.pypi.simple.v1+json"
+
+
+def catalog_path() -> str:
+    return os.path.join(cache.cache_dir(), CATALOG_FILE)
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def simple_url() -> str:
+    """Return the URL of the simple index (PEP 503) next to the configured JSON API, i.e. 'https://pypi.org/simple/'."""
+    return re.sub(r"/pypi$", "", index.index_url()) + "/simple/"
+
+
+def _prefix_number(prefix: str) -> int:
+    return ALPHABET.index(prefix[0]) * len(ALPHABET) + ALPHABET.index(prefix[1])
+
+
+def write_catalog(names: Iterable[str], path: str, source: str, etag: Optional[str] = None) -> int:
+    """
+    Write the canonical form of names to a catalog file at path, returning
+    how many were written. The file starts with a JSON header line, followed
+    by a table of little-endian uint32 offsets of the first name with each
+    two-character prefix (plus one past the end), and then every name, sorted
+    and newline-terminated.
+    """
+    canonical = sorted({canonical_name(name) for name in names})
+    valid = [name for name in canonical if name and not name.strip(ALPHABET)]
+    if len(valid) != len(canonical):
+        util.verbose_print(write_catalog, f"Skipping {len(canonical) - len(valid)} names that are not valid project names")
+    data = "".join(name + "\n" for name in valid).encode()
+    starts = [0]
+    for name in valid:
+        starts.append(starts[-1] + len(name) + 1)
+    table = [
+        starts[bisect.bisect_left(valid, a + b)] for a in ALPHABET for b in ALPHABET
+    ] + [len(data)]
+    header = json.dumps(
+        {"format": CATALOG_FORMAT, "created": time.time(), "source": source, "etag": etag, "count": len(valid)}
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # write to a temporary file first, so completion never reads a partial catalog
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(header.encode() + b"\n" + struct.pack(f"<{PREFIXES + 1}I", *table) + data)
+    os.replace(tmp, path)
+    return len(valid)
+
+
+class Catalog:
+    """
+    Sorted on-disk list of every project name on the index, memory-mapped so
+    that opening it only reads the header. Prefix lookups narrow the search
+    to one two-character prefix through the offset table, then binary search
+    the names within it.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or catalog_path()
+        with open(self.path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = self._data.find(b"\n")
+        self.header = json.loads(self._data[:header_end])
+        if self.header.get("format") != CATALOG_FORMAT:
+            raise OSError(f"unsupported catalog format in {self.path}")
+        self._table_start = header_end + 1
+        self._names_start = self._table_start + (PREFIXES + 1) * 4
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _table(self, number: int) -> int:
+        return self._names_start + struct.unpack_from("<I", self._data, self._table_start + number * 4)[0]
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        """Return the byte range holding every name that could start with prefix."""
+        if len(prefix) < 2 or prefix[:2].strip(ALPHABET):
+            return self._names_start, len(self._data)
+        number = _prefix_number(prefix)
+        return self._table(number), self._table(number + 1)
+
+    def _lower_bound(self, key: bytes, lo: int, hi: int) -> int:
+        """Return the offset of the first name in lo:hi that is not less than key. lo and hi are name boundaries."""
+        data = self._data
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b"\n", lo, mid)
+            start = lo if start < 0 else start + 1
+            end = data.find(b"\n", start, hi)
+            if data[start:end] < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Return the names starting with prefix (in canonical form), in order."""
+        prefix = canonical_name(prefix)
+        key = prefix.encode()
+        lo, hi = self._range(prefix)
+        position = self._lower_bound(key, lo, hi)
+        names = []
+        while position < hi and (limit is None or len(names) < limit):
+            end = self._data.find(b"\n", position, hi)
+            name = self._data[position:end]
+            if not name.startswith(key):
+                break
+            names.append(name.decode())
+            position = end + 1
+        return names
+
+    def __contains__(self, name: str) -> bool:
+        key = canonical_name(name).encode()
+        lo, hi = self._range(key.decode())
+        position = self._lower_bound(key, lo, hi)
+        return self._data[position : position + len(key) + 1] == key + b"\n"
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        """
+        Return up to limit names similar to name, best match first. Only
+        names of similar length that start with the first or second
+        character of name are compared.
+        """
+        import difflib
+
+        key = canonical_name(name)
+        if not key:
+            return []
+        candidates = set()
+        for first in {key[0], key[1:2]} - {""}:
+            lo = self._lower_bound(first.encode(), self._names_start, len(self._data))
+            hi = self._lower_bound(first.encode() + b"\x7f", lo, len(self._data))
+            candidates.update(
+                line.decode()
+                for line in self._data[lo:hi].split(b"\n")
+                if abs(len(line) - len(key)) <= 2
+            )
+        return difflib.get_close_matches(key, sorted(candidates), limit, 0.75)
+
+
+def fetch_names(etag: Optional[str] = None) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Download every project name from the simple index, preferring its JSON
+    form (PEP 691) over HTML. Returns the names and the response's ETag, or
+    no names if the index answered '304 Not Modified' for etag.
+    """
+    from urllib.error import HTTPError
+    from . import pool
+
+    url = simple_url()
+    headers = {"Accept": f"{SIMPLE_JSON}, text/html;q=0.1"}
+    if etag:
+        headers["If-None-Match"] = etag
+    util.verbose_print(fetch_names, f"Requesting {url}")
+    try:
+        res = pool.get_pool().request(url, headers)
+    except HTTPError as err:
+        if err.code == 304:
+            return None, etag
+        raise
+    if res.headers.get("Content-Type", "").startswith(SIMPLE_JSON):
+        names = [project["name"] for project in json.loads(res.body)["projects"]]
+    else:
+        names = re.findall(r"<a[^>]*>([^<]+)</a>", res.body.decode("utf-8", "replace"))
+    util.verbose_print(fetch_names, f"Received {len(names)} project names ({round(len(res.body) / 1.049e6, 1)} MiB)")
+    return names, res.headers.get("ETag")
+
+
+def sync(path: Optional[str] = None, force: bool = False) -> Tuple[int, bool]:
+    """
+    Update the catalog at path from the simple index. Unless force is set, an
+    existing catalog from the same index is revalidated with its ETag.
+    Returns the number of names in the catalog, and whether it changed.
+    """
+    path = path or catalog_path()
+    source = simple_url()
+    etag = None
+    count = 0
+    if not force and os.path.exists(path):
+        try:
+            current = Catalog(path)
+        except (OSError, ValueError):
+            current = None
+        if current is not None:
+            if current.header.get("source") == source:
+                etag = current.header.get("etag")
+            count = len(current)
+            current.close()
+    names, new_etag = fetch_names(etag)
+    if names is None:
+        util.verbose_print(sync, "Catalog is up to date")
+        os.utime(path)
+        return count, False
+    return write_catalog(names, path, source, new_etag), True
+
+
+COMPLETION_SCRIPTS = {
+    "bash": """_otlet() {
+    local cur=${COMP_WORDS[COMP_CWORD]}
+    [[ $cur == -* ]] && return
+    if [[ $COMP_CWORD -eq 1 ]]; then
+        COMPREPLY=($(compgen -W "%(subcommands)s" -- "$cur") $(otlet catalog complete "$cur" 2>/dev/null))
+    elif [[ $COMP_CWORD -eq 2 && " %(package_subcommands)s " == *" ${COMP_WORDS[1]} "* ]]; then
+        COMPREPLY=($(otlet catalog complete "$cur" 2>/dev/null))
+    fi
+}
+complete -o default -F _otlet otlet""",
+    "zsh": """_otlet() {
+    [[ $PREFIX == -* ]] && return
+    if (( CURRENT == 2 )); then
+        compadd -- %(subcommands)s ${(f)"$(otlet catalog complete "$PREFIX" 2>/dev/null)"}
+    elif (( CURRENT == 3 )) && [[ " %(package_subcommands)s " == *" ${words[2]} "* ]]; then
+        compadd -- ${(f)"$(otlet catalog complete "$PREFIX" 2>/dev/null)"}
+    else
+        _files
+    fi
+}
+compdef _otlet otlet""",
+}
+
+
+def completion_script(shell: str, subcommands: dict) -> str:
+    """
+    Return the completion script for shell, completing sub-commands and
+    package names (through 'otlet catalog complete', so without network access).
+    """
+    return COMPLETION_SCRIPTS[shell] % {
+        "subcommands": " ".join(subcommands),
+        "package_subcommands": " ".join(
+            name for name, subcommand in subcommands.items() if "package" in subcommand["arguments"]
+        ),
+    }
+
+
+def get_catalog() -> Optional[Catalog]:
+    """Return the catalog, or None if it hasn't been synced (or can't be read)."""
+    try:
+        return Catalog()
+    except (OSError, ValueError):
+        return None
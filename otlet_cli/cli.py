@@ -25,20 +25,25 @@ CLI tool for returning PyPI package information, using the otlet wrapper
 # OR OTHER DEALINGS IN THE SOFTWARE.
 
 import os
+import re
 import sys
+import time
 import signal
 import textwrap
-import urllib
 from argparse import Namespace
-from typing import Optional, List
-import arrow
-from otlet import exceptions
-from otlet.api import PackageDependencyObject
-from otlet.markers import DEPENDENCY_ENVIRONMENT_MARKERS
+from typing import Optional, List, TYPE_CHECKING
+from urllib.error import URLError
 
-from . import util, __version__, config
+from . import util, output, trace, __version__, config
 from .clparser.options import OtletArgumentParser
 
+if TYPE_CHECKING:
+    from otlet.api import PackageDependencyObject
+
+# otlet, arrow and anything else that is only needed to talk to PyPI or format
+# its answers is imported lazily, so '--help', '--version' and argument errors
+# return without importing them.
+
 if os.name == "nt":
     # if running on windows, ANSI escape codes for coloring
     # need to be manually enabled.
@@ -47,10 +52,35 @@ if os.name == "nt":
     k.SetConsoleMode(k.GetStdHandle(-11), 7)
 
 def init_args() -> Optional[Namespace]:
+    from . import index
+
     parser = OtletArgumentParser()
     args = parser.parse_args()
 
     config["verbose"] = args.verbose
+    if getattr(args, "timings", False) or getattr(args, "trace", None):
+        trace.enable(getattr(args, "timings", False), args.trace[0] if getattr(args, "trace", None) else None)
+    config["no_cache"] = getattr(args, "no_cache", False)
+    config["refresh"] = getattr(args, "refresh", False)
+    config["no_daemon"] = getattr(args, "no_daemon", False) or bool(os.environ.get("OTLET_NO_DAEMON"))
+    # $OTLET_SNAPSHOT makes every command read from the snapshot, except for the one creating it
+    config["offline"] = getattr(args, "offline", False) or (
+        bool(os.environ.get("OTLET_SNAPSHOT")) and args.subcommand != "snapshot"
+    )
+    config["store"] = getattr(args, "store", False)
+    config["format"] = getattr(args, "format", "text")
+    # command line arguments take precedence over the environment, which takes precedence over the config file
+    settings = index.read_config_file()
+    config["index_url"] = (
+        (args.index_url[0] if getattr(args, "index_url", None) else None)
+        or os.environ.get("OTLET_INDEX_URL")
+        or settings.get("index-url")
+    )
+    config["files_url"] = (
+        (args.files_url[0] if getattr(args, "files_url", None) else None)
+        or os.environ.get("OTLET_FILES_URL")
+        or settings.get("files-url")
+    )
     util.verbose_print(init_args, "Command line arguments successfully parsed.")
     util.verbose_print(init_args, args.__dict__)
     return args
@@ -62,24 +92,38 @@ def main():
         signal.SIGINT, lambda *_: (_ for _ in ()).throw(SystemExit(0))
     )  # no yucky exception on KeyboardInterrupt (^C)
     args = init_args()
+
     try:
         util.verbose_print(main, "Running util.check_args()")
         pkg, check_return = util.check_args(args)
         if check_return != 2:
             util.verbose_print(main, "util.check_args() returned a non-two code, exiting otlet.")
             return check_return
-    except exceptions.PyPIAPIError as err:
+    except Exception as err:
+        # imported here, so commands that never query PyPI (i.e. 'otlet cache') don't load otlet
+        from otlet import exceptions
+
+        if not isinstance(err, exceptions.PyPIAPIError):
+            raise
         print("otlet: " + str(err), file=sys.stderr)
+        if isinstance(err, exceptions.PyPIPackageNotFound) and getattr(args, "package", None):
+            util.print_suggestions(args.package[0])
         return 1
 
+    if output.is_structured():
+        output.emit(output.package_record(pkg))
+        return 0
+
     def generate_release_date(dto) -> str:
         util.verbose_print(generate_release_date, "Humanizing PackageObject.upload_time value")
         if dto:
+            import arrow
+
             ar_date = arrow.get(dto).to("local")
             return f"{ar_date.humanize()} ({ar_date.strftime('%Y-%m-%d at %H:%M')})"
         return "Unknown"
 
-    def generate_dep_list(deps: List[PackageDependencyObject]) -> str:
+    def generate_dep_list(deps: List["PackageDependencyObject"]) -> str:
         util.verbose_print(generate_dep_list, "Generating formatted list of package dependencies")
         dstr = ""
         if not deps:
@@ -92,6 +136,8 @@ def main():
         return dstr
 
     def get_notice_count():
+        from otlet.markers import DEPENDENCY_ENVIRONMENT_MARKERS
+
         util.verbose_print(get_notice_count, f"Checking for any notices on {pkg.release_name}")
         count = 0
         if pkg.vulnerabilities:
@@ -108,7 +154,8 @@ def main():
         return ""
 
     util.verbose_print(main, f"Generating formatted package information for {pkg.release_name}")
-    msg = textwrap.dedent(
+    with trace.span("main", "render"):
+        msg = textwrap.dedent(
         f"""Info for package {pkg.release_name}
 {get_notice_count()}
     Summary: {pkg.info.summary}
@@ -122,19 +169,69 @@ def main():
     Python Version(s): {pkg.info.requires_python or "Not Specified"}
     Dependencies: {pkg.dependency_count} \n {generate_dep_list(pkg.dependencies)}
     """
-    )
-    print(msg)
+        )
+        print(msg)
     return 0
 
 
+def print_startup_profile(argv: List[str]) -> int:
+    """
+    Run otlet with argv in a child interpreter started with '-X importtime',
+    then report the total startup cost and the slowest imports of that run.
+    """
+    import subprocess
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "otlet_cli", *argv],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        _match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if _match:
+            timings.append(
+                (int(_match.group(2)), int(_match.group(1)), len(_match.group(3)) // 2, _match.group(4))
+            )
+        elif not line.startswith("import time:"):
+            print(line, file=sys.stderr)  # the command's own error output
+
+    print(
+        f"\nStartup profile: {len(timings)} modules imported in "
+        f"{round(sum(t[1] for t in timings) / 1000, 1)} ms ({round(elapsed * 1000, 1)} ms wall time)",
+        file=sys.stderr,
+    )
+    print("\n[cumulative]\t[self]\t\t[module]", file=sys.stderr)
+    for cumulative, own, depth, name in sorted(timings, reverse=True)[:20]:
+        print(
+            f"{round(cumulative / 1000, 1)} ms\t{round(own / 1000, 1)} ms\t\t{'  ' * depth}{name}",
+            file=sys.stderr,
+        )
+    return proc.returncode
+
+
 def run_cli():
+    if "--startup-profile" in sys.argv:
+        raise SystemExit(
+            print_startup_profile([_ for _ in sys.argv[1:] if _ != "--startup-profile"])
+        )
     try:
         code = main()
-    except urllib.error.URLError:
+    except URLError:
         print(
             "Unable to connect to PyPI... Check connection and try again.",
             file=sys.stderr,
         )
         raise SystemExit(1)
+    except BrokenPipeError:
+        # stdout was piped into a command that exited early, i.e. 'head'.
+        # point it at devnull, so flushing it on exit doesn't fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(1)
+    finally:
+        trace.report()
     util.verbose_print(run_cli, f"Exiting with code {code}")
     raise SystemExit(code)
@@ -2,7 +2,6 @@ import re
 import sys
 from argparse import Action, SUPPRESS
 from .. import __version__
-from otlet import __version__ as api_version
 
 
 class OtletWheelDownloadOptsAction(Action):
@@ -57,6 +56,7 @@ class OtletVersionAction(Action):
     def __call__(self, parser, *args, **kwargs):
         import os
         import textwrap
+        from otlet import __version__ as api_version
 
         WHITE = (
             "\u001b[38;5;255m"
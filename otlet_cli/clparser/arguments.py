@@ -7,6 +7,68 @@ VERBOSE_ARGUMENT: Dict[str, Any] = {
     "action": "store_true",
 }
 
+NO_CACHE_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--no-cache"],
+    "help": "do not read from or write to the local metadata cache",
+    "action": "store_true",
+}
+
+REFRESH_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--refresh"],
+    "help": "revalidate cached metadata with PyPI, even if it has not expired yet",
+    "action": "store_true",
+}
+
+NO_DAEMON_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--no-daemon"],
+    "help": "query PyPI directly, even if an 'otlet serve' daemon is running",
+    "action": "store_true",
+}
+
+OFFLINE_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--offline"],
+    "help": "read package metadata from the local snapshot (see 'otlet snapshot') instead of PyPI",
+    "action": "store_true",
+}
+
+INDEX_URL_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--index-url"],
+    "metavar": "URL",
+    "help": "base URL of the PyPI JSON API to query, i.e. a mirror (Default: https://pypi.org/pypi)",
+    "nargs": 1,
+    "action": "store",
+}
+
+FILES_URL_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--files-url"],
+    "metavar": "URL",
+    "help": "download distribution files hosted on files.pythonhosted.org from this URL instead",
+    "nargs": 1,
+    "action": "store",
+}
+
+TIMINGS_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--timings"],
+    "help": "print the time spent in each phase (network, parsing, filtering, etc.) when done",
+    "action": "store_true",
+}
+
+TRACE_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--trace"],
+    "metavar": "FILE",
+    "help": "write a trace of every timed operation to FILE, for chrome://tracing or Perfetto",
+    "nargs": 1,
+    "action": "store",
+}
+
+FORMAT_ARGUMENT: Dict[str, Any] = {
+    "opts": ["--format"],
+    "help": "output as formatted 'text', a 'json' document, or 'ndjson' (one JSON record per line) (Default: text)",
+    "choices": ["text", "json", "ndjson"],
+    "default": "text",
+    "action": "store",
+}
+
 PACKAGE_ARGUMENT: Dict[str, Any] = {
     "opts": [],
     "metavar": ("package_name"),
@@ -50,6 +112,11 @@ ARGUMENT_LIST: Dict[str, Any] = {
         "help": "print version and exit",
         "action": OtletVersionAction,
     },
+    "startup_profile": {
+        "opts": ["--startup-profile"],
+        "help": "report how long each module took to import, after running the command",
+        "action": "store_true",
+    },
 }
 
 RELEASES_ARGUMENT_LIST: Dict[str, Any] = {
@@ -63,7 +130,6 @@ RELEASES_ARGUMENT_LIST: Dict[str, Any] = {
         "opts": ["-bd", "--before-date"],
         "metavar": ("DATE"),
         "help": "Return releases before specified date (YYYY-MM-DD)",
-        "default": ["9999-12-31"],
         "nargs": 1,
         "action": "store",
     },
@@ -71,7 +137,6 @@ RELEASES_ARGUMENT_LIST: Dict[str, Any] = {
         "opts": ["-ad", "--after-date"],
         "metavar": ("DATE"),
         "help": "Return releases after specified date (YYYY-MM-DD)",
-        "default": ["1970-01-01"],
         "nargs": 1,
         "action": "store",
     },
@@ -79,7 +144,6 @@ RELEASES_ARGUMENT_LIST: Dict[str, Any] = {
         "opts": ["-bv", "--before-version"],
         "metavar": ("VERSION"),
         "help": "Return releases before specified version",
-        "default": ["100!0"],
         "nargs": 1,
         "action": "store",
     },
@@ -90,6 +154,29 @@ RELEASES_ARGUMENT_LIST: Dict[str, Any] = {
         "nargs": 1,
         "action": "store",
     },
+    "sort": {
+        "opts": ["-s", "--sort"],
+        "help": "Order releases by 'version' or upload 'date' (Default: version)",
+        "choices": ["version", "date"],
+        "default": "version",
+        "action": "store",
+    },
+    "limit": {
+        "opts": ["--limit"],
+        "metavar": ("N"),
+        "help": "Return only the first N matching releases",
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "latest": {
+        "opts": ["--latest"],
+        "metavar": ("N"),
+        "help": "Return only the last N matching releases, i.e. the N newest",
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
 }
 
 DOWNLOAD_ARGUMENTS_LIST: Dict[str, Any] = {
@@ -116,4 +203,351 @@ DOWNLOAD_ARGUMENTS_LIST: Dict[str, Any] = {
         "help": "List all available wheels for a project.",
         "action": "store_true",
     },
+    "target": {
+        "opts": ["-t", "--target"],
+        "metavar": ("TARGET"),
+        "help": "Automatically pick the most compatible wheel for TARGET, i.e. 'cp311-manylinux_2_28_x86_64', or 'native' for this interpreter",
+        "action": "store",
+    },
+    "store": {
+        "opts": ["--store"],
+        "help": "Reuse files from, and add downloaded files to, the local content-addressed store",
+        "action": "store_true",
+    },
+    "connections": {
+        "opts": ["-c", "--connections"],
+        "metavar": ("N"),
+        "help": "Number of parallel connections to download large files with (Default: 4)",
+        "default": [4],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "buffer_size": {
+        "opts": ["--buffer-size"],
+        "metavar": ("SIZE"),
+        "help": "Size of each read from the network, i.e. '1M' (Default: 256K)",
+        "default": ["256K"],
+        "nargs": 1,
+        "action": "store",
+    },
+}
+
+CACHE_ARGUMENTS_LIST: Dict[str, Any] = {
+    "cache_action": {
+        "opts": [],
+        "metavar": ("ACTION"),
+        "choices": ["stats", "prune"],
+        "help": "'stats' to show cache usage, 'prune' to evict old entries",
+        "nargs": 1,
+        "type": str,
+    },
+    "max_size": {
+        "opts": ["--max-size"],
+        "metavar": ("SIZE"),
+        "help": "Evict least recently used entries until the cache is below SIZE, i.e. '200M' (Default: 100M)",
+        "default": ["100M"],
+        "nargs": 1,
+        "action": "store",
+    },
+    "max_age": {
+        "opts": ["--max-age"],
+        "metavar": ("DAYS"),
+        "help": "Evict entries that have not been used in DAYS days",
+        "type": float,
+        "nargs": 1,
+        "action": "store",
+    },
+}
+
+BATCH_ARGUMENTS_LIST: Dict[str, Any] = {
+    "file": {
+        "opts": ["-f", "--file"],
+        "metavar": ("FILE"),
+        "help": "Requirements-style file to read package specs from ('-' for stdin)",
+        "required": True,
+        "nargs": 1,
+        "action": "store",
+    },
+    "jobs": {
+        "opts": ["-j", "--jobs"],
+        "metavar": ("N"),
+        "help": "Number of packages to fetch concurrently (Default: 8)",
+        "default": [8],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "download": {
+        "opts": ["--download"],
+        "metavar": ("DIR"),
+        "help": "Download the best matching distribution of every package into DIR, instead of printing package info",
+        "nargs": "?",
+        "const": ".",
+        "action": "store",
+    },
+    "dist_type": DOWNLOAD_ARGUMENTS_LIST["dist_type"],
+    "whl_options": DOWNLOAD_ARGUMENTS_LIST["whl_options"],
+    "target": DOWNLOAD_ARGUMENTS_LIST["target"],
+    "store": DOWNLOAD_ARGUMENTS_LIST["store"],
+    "connections": DOWNLOAD_ARGUMENTS_LIST["connections"],
+    "buffer_size": DOWNLOAD_ARGUMENTS_LIST["buffer_size"],
+}
+
+DEPS_ARGUMENTS_LIST: Dict[str, Any] = {
+    "tree": {
+        "opts": ["--tree"],
+        "help": "print dependencies as a tree, instead of a flat list of every distinct release",
+        "action": "store_true",
+    },
+    "depth": {
+        "opts": ["--depth"],
+        "metavar": ("N"),
+        "help": "only follow dependencies up to N levels deep (Default: all of them)",
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "jobs": BATCH_ARGUMENTS_LIST["jobs"],
+}
+
+AUDIT_ARGUMENTS_LIST: Dict[str, Any] = {
+    "file": BATCH_ARGUMENTS_LIST["file"],
+    "jobs": BATCH_ARGUMENTS_LIST["jobs"],
+    "max_vulns": {
+        "opts": ["--max-vulns"],
+        "metavar": ("N"),
+        "help": "exit with status 1 if more than N vulnerabilities are found in total (Default: 0)",
+        "default": [0],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "ignore": {
+        "opts": ["--ignore"],
+        "metavar": ("ID"),
+        "help": "leave out the vulnerability with this id or alias (i.e. 'PYSEC-2023-74' or a CVE id), may be given several times",
+        "action": "append",
+    },
+}
+
+DIFF_ARGUMENTS_LIST: Dict[str, Any] = {
+    "old_version": {
+        "opts": [],
+        "metavar": ("old_version"),
+        "nargs": 1,
+        "type": str,
+        "help": "The version to compare from",
+    },
+    "new_version": {
+        "opts": [],
+        "metavar": ("new_version"),
+        "nargs": 1,
+        "type": str,
+        "help": "The version to compare to",
+    },
+}
+
+INSPECT_ARGUMENTS_LIST: Dict[str, Any] = {
+    "whl_options": DOWNLOAD_ARGUMENTS_LIST["whl_options"],
+    "target": DOWNLOAD_ARGUMENTS_LIST["target"],
+    "entry_points": {
+        "opts": ["--entry-points"],
+        "help": "Also list the wheel's entry points, i.e. its console scripts",
+        "action": "store_true",
+    },
+    "files": {
+        "opts": ["--files"],
+        "help": "Also list every file in the wheel, with its size",
+        "action": "store_true",
+    },
+}
+
+STORE_ARGUMENTS_LIST: Dict[str, Any] = {
+    "store_action": {
+        "opts": [],
+        "metavar": ("ACTION"),
+        "choices": ["stats", "gc"],
+        "help": "'stats' to show store usage, 'gc' to evict old entries",
+        "nargs": 1,
+        "type": str,
+    },
+    "max_size": {
+        "opts": ["--max-size"],
+        "metavar": ("SIZE"),
+        "help": "Evict least recently used files until the store is below SIZE, i.e. '10G'",
+        "nargs": 1,
+        "action": "store",
+    },
+    "max_age": CACHE_ARGUMENTS_LIST["max_age"],
+}
+
+CATALOG_ARGUMENTS_LIST: Dict[str, Any] = {
+    "catalog_action": {
+        "opts": [],
+        "metavar": ("ACTION"),
+        "choices": ["sync", "info", "complete", "completion"],
+        "help": "'sync' to download every project name from the index, 'info' to show the catalog, 'complete' to list names starting with PREFIX, 'completion' to print a shell completion script",
+        "nargs": 1,
+        "type": str,
+    },
+    "word": {
+        "opts": [],
+        "metavar": ("PREFIX|SHELL"),
+        "help": "Name prefix for 'complete', or 'bash'/'zsh' for 'completion'",
+        "nargs": "?",
+        "default": "",
+        "type": str,
+    },
+    "limit": {
+        "opts": ["--limit"],
+        "metavar": ("N"),
+        "help": "Return at most N names for 'complete' (Default: 100)",
+        "default": [100],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "force": {
+        "opts": ["--force"],
+        "help": "Download the full list again on 'sync', even if the index reports it unchanged",
+        "action": "store_true",
+    },
+}
+
+SERVE_ARGUMENTS_LIST: Dict[str, Any] = {
+    "socket": {
+        "opts": ["--socket"],
+        "metavar": ("PATH"),
+        "help": "Unix socket to listen on (Default: $OTLET_DAEMON, or 'serve.sock' in the otlet cache directory)",
+        "nargs": 1,
+        "action": "store",
+    },
+    "port": {
+        "opts": ["-p", "--port"],
+        "metavar": ("PORT"),
+        "help": "Listen on 127.0.0.1:PORT over HTTP instead of a Unix socket",
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "ttl": {
+        "opts": ["--ttl"],
+        "metavar": ("SECONDS"),
+        "help": "Seconds a package is kept in memory before it is fetched again (Default: 600)",
+        "default": [600],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "max_entries": {
+        "opts": ["--max-entries"],
+        "metavar": ("N"),
+        "help": "Number of packages kept in memory, least recently used ones are evicted first (Default: 1024)",
+        "default": [1024],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+}
+
+SNAPSHOT_ARGUMENTS_LIST: Dict[str, Any] = {
+    "snapshot_action": {
+        "opts": [],
+        "metavar": ("ACTION"),
+        "choices": ["create", "info"],
+        "help": "'create' to snapshot the packages in a requirements-style file, 'info' to describe the current snapshot",
+        "nargs": 1,
+        "type": str,
+    },
+    "file": {
+        "opts": ["-f", "--file"],
+        "metavar": ("FILE"),
+        "help": "File listing one package spec per line (required for 'create', '-' for stdin)",
+        "nargs": 1,
+        "action": "store",
+    },
+    "output": {
+        "opts": ["-o", "--output"],
+        "metavar": ("DIR"),
+        "help": "Snapshot directory (Default: $OTLET_SNAPSHOT, or 'snapshot' in the otlet cache directory)",
+        "nargs": 1,
+        "action": "store",
+    },
+    "jobs": BATCH_ARGUMENTS_LIST["jobs"],
+}
+
+WATCH_ARGUMENTS_LIST: Dict[str, Any] = {
+    "packages": {
+        "opts": [],
+        "metavar": ("package"),
+        "nargs": "*",
+        "type": str,
+        "help": "Packages to watch, in addition to those read from -f/--file",
+    },
+    "file": {
+        "opts": ["-f", "--file"],
+        "metavar": ("FILE"),
+        "help": "Requirements-style file to read the packages to watch from ('-' for stdin)",
+        "nargs": 1,
+        "action": "store",
+    },
+    "interval": {
+        "opts": ["--interval"],
+        "metavar": ("SECONDS"),
+        "help": "Shortest time between two checks of a package, used for packages that release often or just changed (Default: 300)",
+        "default": [300],
+        "type": float,
+        "nargs": 1,
+        "action": "store",
+    },
+    "max_interval": {
+        "opts": ["--max-interval"],
+        "metavar": ("SECONDS"),
+        "help": "Longest time between two checks of a package, used for packages that rarely release (Default: 3600)",
+        "default": [3600],
+        "type": float,
+        "nargs": 1,
+        "action": "store",
+    },
+    "state": {
+        "opts": ["--state"],
+        "metavar": ("FILE"),
+        "help": "File to keep the releases seen so far in, so restarts only report what changed meanwhile (Default: 'watch.json' in the otlet cache directory)",
+        "nargs": 1,
+        "action": "store",
+    },
+    "once": {
+        "opts": ["--once"],
+        "help": "Check every package once and exit, i.e. from cron",
+        "action": "store_true",
+    },
+    "jobs": BATCH_ARGUMENTS_LIST["jobs"],
+}
+
+VERIFY_ARGUMENTS_LIST: Dict[str, Any] = {
+    "directory": {
+        "opts": [],
+        "metavar": ("directory"),
+        "nargs": 1,
+        "type": str,
+        "help": "Directory of wheels and sdists to verify, searched recursively",
+    },
+    "jobs": {
+        "opts": ["-j", "--jobs"],
+        "metavar": ("N"),
+        "help": "Number of projects to fetch published digests of concurrently (Default: 8)",
+        "default": [8],
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
+    "processes": {
+        "opts": ["-p", "--processes"],
+        "metavar": ("N"),
+        "help": "Number of processes hashing local files (Default: one per CPU core)",
+        "type": int,
+        "nargs": 1,
+        "action": "store",
+    },
 }
@@ -1,51 +1,222 @@
 import sys
 from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
 from .arguments import *
 
-if "releases" in sys.argv:
-    RELEASES_ARGUMENT_LIST["package"] = PACKAGE_ARGUMENT
-    RELEASES_ARGUMENT_LIST["verbose"] = VERBOSE_ARGUMENT
-elif "download" in sys.argv:
-    DOWNLOAD_ARGUMENTS_LIST["package"] = PACKAGE_ARGUMENT
-    DOWNLOAD_ARGUMENTS_LIST["package_version"] = PACKAGE_VERSION_ARGUMENT
-    DOWNLOAD_ARGUMENTS_LIST["verbose"] = VERBOSE_ARGUMENT
-else:
-    ARGUMENT_LIST["package"] = PACKAGE_ARGUMENT
-    ARGUMENT_LIST["package_version"] = PACKAGE_VERSION_ARGUMENT
-    ARGUMENT_LIST["verbose"] = VERBOSE_ARGUMENT
+COMMON_ARGUMENTS: Dict[str, Any] = {
+    "verbose": VERBOSE_ARGUMENT,
+    "no_cache": NO_CACHE_ARGUMENT,
+    "refresh": REFRESH_ARGUMENT,
+    "no_daemon": NO_DAEMON_ARGUMENT,
+    "offline": OFFLINE_ARGUMENT,
+    "index_url": INDEX_URL_ARGUMENT,
+    "files_url": FILES_URL_ARGUMENT,
+    "format": FORMAT_ARGUMENT,
+    "timings": TIMINGS_ARGUMENT,
+    "trace": TRACE_ARGUMENT,
+}
+
+# every sub-command, with its help text and the full table of arguments it accepts
+SUBCOMMANDS: Dict[str, Dict[str, Any]] = {
+    "releases": {
+        "help": "List releases for a specified package",
+        "arguments": {**RELEASES_ARGUMENT_LIST, "package": PACKAGE_ARGUMENT, **COMMON_ARGUMENTS},
+    },
+    "download": {
+        "help": "Download package distribution files from PyPI CDN",
+        "arguments": {
+            **DOWNLOAD_ARGUMENTS_LIST,
+            "package": PACKAGE_ARGUMENT,
+            "package_version": PACKAGE_VERSION_ARGUMENT,
+            **COMMON_ARGUMENTS,
+        },
+    },
+    "deps": {
+        "help": "Resolve the transitive dependencies of a package",
+        "arguments": {
+            **DEPS_ARGUMENTS_LIST,
+            "package": PACKAGE_ARGUMENT,
+            "package_version": PACKAGE_VERSION_ARGUMENT,
+            **COMMON_ARGUMENTS,
+        },
+    },
+    "inspect": {
+        "help": "Show a wheel's metadata without downloading it",
+        "arguments": {
+            **INSPECT_ARGUMENTS_LIST,
+            "package": PACKAGE_ARGUMENT,
+            "package_version": PACKAGE_VERSION_ARGUMENT,
+            **COMMON_ARGUMENTS,
+        },
+    },
+    "diff": {
+        "help": "Compare dependencies and metadata between two releases of a package",
+        "arguments": {"package": PACKAGE_ARGUMENT, **DIFF_ARGUMENTS_LIST, **COMMON_ARGUMENTS},
+    },
+    "cache": {
+        "help": "Inspect or prune the local PyPI metadata cache",
+        "arguments": {**CACHE_ARGUMENTS_LIST, "verbose": VERBOSE_ARGUMENT, "format": FORMAT_ARGUMENT},
+    },
+    "batch": {
+        "help": "Query many packages at once from a requirements-style file",
+        "arguments": {**BATCH_ARGUMENTS_LIST, **COMMON_ARGUMENTS},
+    },
+    "audit": {
+        "help": "Check every package in a requirements-style file for known vulnerabilities",
+        "arguments": {**AUDIT_ARGUMENTS_LIST, **COMMON_ARGUMENTS},
+    },
+    "verify": {
+        "help": "Check every distribution file in a directory against the sha256 digest PyPI publishes for it",
+        "arguments": {**VERIFY_ARGUMENTS_LIST, **COMMON_ARGUMENTS},
+    },
+    "store": {
+        "help": "Inspect or garbage-collect the local distribution file store",
+        "arguments": {**STORE_ARGUMENTS_LIST, "verbose": VERBOSE_ARGUMENT, "format": FORMAT_ARGUMENT},
+    },
+    "catalog": {
+        "help": "Keep a local list of every project name, for shell completion and spelling suggestions",
+        "arguments": {
+            **CATALOG_ARGUMENTS_LIST,
+            "verbose": VERBOSE_ARGUMENT,
+            "index_url": INDEX_URL_ARGUMENT,
+            "format": FORMAT_ARGUMENT,
+        },
+    },
+    "watch": {
+        "help": "Poll many packages for new, yanked and removed releases",
+        "arguments": {
+            **WATCH_ARGUMENTS_LIST,
+            "verbose": VERBOSE_ARGUMENT,
+            "index_url": INDEX_URL_ARGUMENT,
+            "format": FORMAT_ARGUMENT,
+            "timings": TIMINGS_ARGUMENT,
+            "trace": TRACE_ARGUMENT,
+        },
+    },
+    "snapshot": {
+        "help": "Save package metadata to disk for querying without network access",
+        "arguments": {**SNAPSHOT_ARGUMENTS_LIST, "verbose": VERBOSE_ARGUMENT, "no_cache": NO_CACHE_ARGUMENT, "refresh": REFRESH_ARGUMENT, "index_url": INDEX_URL_ARGUMENT, "format": FORMAT_ARGUMENT, "timings": TIMINGS_ARGUMENT, "trace": TRACE_ARGUMENT},
+    },
+    "serve": {
+        "help": "Run a daemon that answers otlet queries from a warm in-memory cache",
+        "arguments": {
+            **SERVE_ARGUMENTS_LIST,
+            "verbose": VERBOSE_ARGUMENT,
+            "index_url": INDEX_URL_ARGUMENT,
+            "files_url": FILES_URL_ARGUMENT,
+        },
+    },
+}
+
+
+# arguments of the default 'otlet <package> [version]' invocation, also listed in the top-level help
+TOP_LEVEL_ARGUMENTS: Dict[str, Any] = {
+    **ARGUMENT_LIST,
+    "package": PACKAGE_ARGUMENT,
+    "package_version": PACKAGE_VERSION_ARGUMENT,
+    **COMMON_ARGUMENTS,
+}
+# options that take a value, which must not be mistaken for a sub-command or package name
+VALUE_OPTIONS = {
+    opt
+    for arg in TOP_LEVEL_ARGUMENTS.values()
+    if arg.get("action", "store") in ("store", "append") and arg.get("nargs") != 0
+    for opt in arg["opts"]
+}
+COMMON_OPTIONS = {opt for arg in COMMON_ARGUMENTS.values() for opt in arg["opts"]}
+
+
+def subcommand_index(argv: List[str]) -> Optional[int]:
+    """Return the position of the sub-command named by argv, if any. Only the first positional argument can name one."""
+    skip = False
+    for num, arg in enumerate(argv):
+        if skip:
+            skip = False
+        elif arg == "--":
+            return None
+        elif arg.startswith("-"):
+            skip = arg in VALUE_OPTIONS
+        else:
+            return num if arg in SUBCOMMANDS else None
+    return None
+
+
+def find_subcommand(argv: List[str]) -> Optional[str]:
+    """Return the sub-command named by argv, if any."""
+    num = subcommand_index(argv)
+    return None if num is None else argv[num]
+
+
+def move_common_options(argv: List[str]) -> List[str]:
+    """
+    Move options given before the sub-command (i.e. 'otlet --format json releases six')
+    behind it, since only the sub-command's parser knows the options common to all of them.
+    """
+    num = subcommand_index(argv)
+    if not num:
+        return argv
+    before: List[str] = []
+    moved: List[str] = []
+    skip = False
+    for arg in argv[:num]:
+        if skip:
+            moved.append(arg)
+            skip = False
+        elif arg.split("=", 1)[0] in COMMON_OPTIONS:
+            moved.append(arg)
+            skip = arg in VALUE_OPTIONS
+        else:
+            before.append(arg)
+    return before + [argv[num]] + moved + argv[num + 1 :]
 
 
 class OtletArgumentParser(ArgumentParser):
-    def __init__(self):
+    def __init__(self, argv: Optional[List[str]] = None):
         super().__init__(
             prog="otlet",
             description="Retrieve information about packages available on PyPI",
             epilog="(c) 2022-present Noah Tanner, released under the terms of the MIT License",
         )
-        self.active_parsers = [(ARGUMENT_LIST, self)]
-        scinit = [
-            _ for _ in ["releases", "download", "--help", "-h"] if _ in sys.argv
-        ]  # i did this because i can
-        if scinit:
+        if argv is None:
+            argv = sys.argv[1:]
+        # only the sub-command that is actually used gets its arguments set up,
+        # all of them are only needed to list them in the top-level help
+        self.subcommand = find_subcommand(argv)
+        self.set_defaults(subcommand=None)
+        if self.subcommand:
+            self.active_parsers = [(ARGUMENT_LIST, self)]
             self.subparsers = self.add_subparsers(
                 parser_class=ArgumentParser, metavar="[ sub-commands ]"
             )
-            self.releases_subparser = self.subparsers.add_parser(
-                "releases",
-                description="List releases for a specified package",
-                help="List releases for a specified package",
-                epilog=self.epilog,
+            self.active_parsers.append(
+                (SUBCOMMANDS[self.subcommand]["arguments"], self.add_subcommand(self.subcommand))
             )
-            self.download_subparser = self.subparsers.add_parser(
-                "download",
-                description="Download package distribution files from PyPI CDN",
-                help="List releases for a specified package",
-                epilog=self.epilog,
+        elif "-h" in argv or "--help" in argv:
+            self.active_parsers = [(TOP_LEVEL_ARGUMENTS, self)]
+            self.subparsers = self.add_subparsers(
+                parser_class=ArgumentParser, metavar="[ sub-commands ]"
             )
-            self.active_parsers.append((RELEASES_ARGUMENT_LIST, self.releases_subparser))
-            self.active_parsers.append((DOWNLOAD_ARGUMENTS_LIST, self.download_subparser))
+            for name in SUBCOMMANDS:
+                self.add_subcommand(name)
+        else:
+            self.active_parsers = [(TOP_LEVEL_ARGUMENTS, self)]
         self.init_args(self.active_parsers)
 
+    def parse_known_args(self, args=None, namespace=None):
+        if self.subcommand:
+            args = move_common_options(sys.argv[1:] if args is None else list(args))
+        return super().parse_known_args(args, namespace)
+
+    def add_subcommand(self, name: str) -> ArgumentParser:
+        subparser = self.subparsers.add_parser(
+            name,
+            description=SUBCOMMANDS[name]["help"],
+            help=SUBCOMMANDS[name]["help"],
+            epilog=self.epilog,
+        )
+        subparser.set_defaults(subcommand=name)
+        return subparser
+
     def init_args(self, parsers):
         for arg_list, parser in parsers:
             for key, arg in arg_list.items():
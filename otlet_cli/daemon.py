@@ -0,0 +1,75 @@
+import os
+import io
+import socket
+import http.client
+from typing import Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from . import util, cache, index
+
+DEFAULT_TIMEOUT = 60
+
+
+def daemon_address() -> str:
+    """
+    Return where 'otlet serve' listens by default: $OTLET_DAEMON if set (a
+    Unix socket path, or 'http://127.0.0.1:PORT'), otherwise a socket in the
+    otlet cache directory.
+    """
+    return os.environ.get("OTLET_DAEMON") or os.path.join(cache.cache_dir(), "serve.sock")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: float = DEFAULT_TIMEOUT) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def connect(address: Optional[str] = None) -> Optional[http.client.HTTPConnection]:
+    """Return a connection to the daemon at address, or None if no daemon can be listening there."""
+    address = address or daemon_address()
+    if address.startswith("http://"):
+        parts = urlsplit(address)
+        return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=DEFAULT_TIMEOUT)
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(address):
+        return None
+    return UnixHTTPConnection(address)
+
+
+def fetch(path: str, refresh: bool = False) -> Optional[bytes]:
+    """
+    Fetch a PyPI JSON API path (i.e. '/six/json') through a running 'otlet serve'
+    daemon. Returns None if no daemon is reachable, or if it queries a different
+    index, so the caller can fetch it itself.
+    """
+    conn = connect()
+    if conn is None:
+        return None
+    headers = {"X-Otlet-Index": index.index_url()}
+    if refresh:
+        headers["Cache-Control"] = "no-cache"
+    try:
+        conn.request("GET", "/pypi" + path, headers=headers)
+        res = conn.getresponse()
+        body = res.read()
+    except (http.client.HTTPException, OSError) as err:
+        # a stale socket or a daemon that is not responding: don't use it
+        util.verbose_print(fetch, f"otlet daemon unavailable ({err}), querying PyPI directly")
+        return None
+    finally:
+        conn.close()
+    if res.status == 409:
+        util.verbose_print(fetch, f"otlet daemon queries {body.decode(errors='replace')}, querying the index directly")
+        return None
+    if res.status == 502:
+        raise URLError(body.decode(errors="replace"))
+    if res.status >= 300:
+        raise HTTPError(path, res.status, res.reason, res.headers, io.BytesIO(body))
+    return body
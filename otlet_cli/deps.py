@@ -0,0 +1,209 @@
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from urllib.error import URLError
+from otlet.api import PackageObject, PackageDependencyObject
+from otlet.exceptions import PyPIAPIError
+from otlet.packaging.version import Version
+from . import util, api, releases, trace
+
+DEFAULT_JOBS = 8
+T = TypeVar("T")
+
+
+def canonical_name(name: str) -> str:
+    """Return the canonical form of a dependency name, keeping its extras, i.e. 'coverage[toml]'."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def expand_constraints(constraints: Optional[List[str]]) -> List[str]:
+    """
+    Rewrite version constraints into the operators :meth:`Version.fits_constraints`
+    understands: '~=1.4.5' becomes '>=1.4.5' and '<1.5', '==2.*' becomes
+    '>=2' and '<3'. Exclusions of whole release series ('!=2.*') are dropped.
+    """
+    expanded = []
+    for constraint in constraints or []:
+        _match = re.fullmatch(r"(~=|===?|!=)?\s*([^*]+?)(\.\*)?", constraint)
+        if not _match or constraint.startswith(("<", ">")):
+            expanded.append(constraint)
+            continue
+        op, version, wildcard = _match.groups()
+        parts = version.split(".")
+        if op == "~=" and len(parts) > 1:
+            upper = parts[:-1]
+            upper[-1] = str(int(upper[-1]) + 1) if upper[-1].isdigit() else upper[-1]
+            expanded += [">=" + version, "<" + ".".join(upper)]
+        elif wildcard and op in ("==", None) and parts[-1].isdigit():
+            expanded += [">=" + version, "<" + ".".join(parts[:-1] + [str(int(parts[-1]) + 1)])]
+        elif wildcard or op == "===":
+            if op == "===":
+                expanded.append("==" + version)
+        else:
+            expanded.append(constraint)
+    return expanded
+
+
+def best_version(pkg: PackageObject, constraints: Optional[List[str]]) -> Optional[str]:
+    """
+    Return the newest release of pkg that fits constraints, as pip would pick it:
+    yanked releases are never chosen, and pre-releases only if no final release fits.
+    """
+    expanded = expand_constraints(constraints)
+    candidates = [r for r in reversed(releases.ReleaseIndex(pkg.releases or {}).by_version) if not r.yanked]
+    for allow_pre in (False, True):
+        for rel in candidates:
+            if not isinstance(rel.version, Version) or (rel.version.is_prerelease and not allow_pre):
+                continue
+            try:
+                if not expanded or rel.version.fits_constraints(expanded):
+                    return rel.name
+            except Exception:  # constraints otlet's version parser can't evaluate
+                util.verbose_print(best_version, f"Unable to evaluate {constraints} for {pkg.name}")
+                return None
+    return None
+
+
+def _resolved(value: T) -> "Future[T]":
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+class DependencyNode:
+    """A resolved release of a package, and the releases its own dependencies resolve to."""
+
+    def __init__(
+        self,
+        name: str,
+        version: Optional[str],
+        pkg: Optional[PackageObject] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.pkg = pkg
+        self.error = error
+        # (requirement, resolved node) for every dependency, in the order the package lists them
+        self.children: List[Tuple[PackageDependencyObject, "DependencyNode"]] = []
+        self.expanded = False
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return (canonical_name(self.name), self.version)
+
+    def walk(self) -> Iterator[Tuple[Optional["DependencyNode"], "DependencyNode"]]:
+        """Yield (parent, node) for every edge below this node, visiting each node's children once."""
+        seen = {self.key}
+        stack: List[DependencyNode] = [self]
+        while stack:
+            node = stack.pop()
+            for _, child in node.children:
+                yield node, child
+                if child.key not in seen:
+                    seen.add(child.key)
+                    stack.append(child)
+
+
+class DependencyResolver:
+    """
+    Resolves the transitive dependencies of a package, one level at a time,
+    fetching the metadata of every package on a level concurrently.
+
+    Each project's metadata, and each resolved (name, version) node, is
+    fetched once and shared, no matter how many packages depend on it. Only
+    dependencies that apply to this interpreter and platform are followed:
+    otlet drops those whose environment markers don't match
+    :data:`otlet.markers.DEPENDENCY_ENVIRONMENT_MARKERS` (or that belong to
+    extras which were not requested) while parsing each package.
+    """
+
+    def __init__(self, jobs: int = DEFAULT_JOBS) -> None:
+        self.jobs = max(1, jobs)
+        self._memo: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def _memoized(self, key: tuple, factory: Callable[[], T]) -> T:
+        # the first caller of a key computes it, concurrent callers wait for its result
+        with self._lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = self._memo[key] = Future()
+        if owner:
+            try:
+                future.set_result(factory())
+            except BaseException as err:
+                future.set_exception(err)
+        return future.result()
+
+    def _project(self, name: str) -> PackageObject:
+        return self._memoized(("project", canonical_name(name)), lambda: api.OtletPackageObject(name))
+
+    def _release(self, name: str, version: str) -> DependencyNode:
+        def fetch() -> DependencyNode:
+            project = self._project(name)
+            if str(project.version) == version:
+                # the project response already describes its latest release
+                return DependencyNode(name, version, project)
+            return DependencyNode(name, version, api.OtletPackageObject(name, version))
+
+        return self._memoized(("release", canonical_name(name), version), fetch)
+
+    def resolve_requirement(self, dep: PackageDependencyObject) -> DependencyNode:
+        """Return the node of the newest release fitting dep, or a node describing why there is none."""
+        try:
+            version = best_version(self._project(dep.name), dep.version_constraints)
+            if version is None:
+                return DependencyNode(
+                    dep.name, None, error=f"no release matches {', '.join(dep.version_constraints or [])}"
+                )
+            return self._release(dep.name, version)
+        except (PyPIAPIError, URLError) as err:
+            util.verbose_print(self.resolve_requirement, f"Unable to resolve {dep.name}: {err}")
+            return DependencyNode(dep.name, None, error=str(err) or type(err).__name__)
+
+    @trace.traced("resolve")
+    def resolve(self, pkg: PackageObject, depth: Optional[int] = None) -> DependencyNode:
+        """
+        Return the dependency tree of pkg, down to depth levels below it (all of
+        them if None). Nodes reached through several paths are the same object.
+        """
+        root = DependencyNode(pkg.name, str(pkg.version), pkg)
+        with self._lock:
+            self._memo[("release", canonical_name(pkg.name), root.version)] = _resolved(root)
+            if not pkg.release:
+                # pkg is the project response, which a cycle back to it would fetch again
+                self._memo.setdefault(("project", canonical_name(pkg.name)), _resolved(pkg))
+        level = [root]
+        current = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while level and (depth is None or current < depth):
+                edges = []
+                for node in level:
+                    # a node shared by several parents on this level is still expanded only once
+                    if node.expanded or node.pkg is None:
+                        continue
+                    node.expanded = True
+                    for dep in node.pkg.dependencies or []:
+                        edges.append((node, dep, executor.submit(self.resolve_requirement, dep)))
+                util.verbose_print(self.resolve, f"Resolving {len(edges)} requirements on level {current + 1}")
+                level = []
+                for node, dep, future in edges:
+                    child = future.result()
+                    node.children.append((dep, child))
+                    if not child.expanded:
+                        level.append(child)
+                current += 1
+        return root
+
+
+def flatten(root: DependencyNode) -> List[Tuple[DependencyNode, List[DependencyNode]]]:
+    """Return every distinct node below root with the nodes requiring it, sorted by name and version."""
+    required_by: Dict[Tuple[str, Optional[str]], Tuple[DependencyNode, List[DependencyNode]]] = {}
+    for parent, node in root.walk():
+        entry = required_by.setdefault(node.key, (node, []))
+        if parent is not None and parent not in entry[1]:
+            entry[1].append(parent)
+    return [required_by[key] for key in sorted(required_by, key=lambda k: (k[0], k[1] or ""))]
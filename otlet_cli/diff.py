@@ -0,0 +1,79 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from otlet.api import PackageObject, PackageDependencyObject
+from . import util, api
+
+
+def fetch_releases(name: str, old: str, new: str) -> Tuple[PackageObject, PackageObject]:
+    """Fetch two releases of a package concurrently. Lookup errors are raised as they would be for one."""
+    util.verbose_print(fetch_releases, f"Fetching {name} {old} and {new}")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(api.OtletPackageObject, name, version) for version in (old, new)]
+        return futures[0].result(), futures[1].result()
+
+
+def _dependencies(pkg: PackageObject) -> Dict[str, PackageDependencyObject]:
+    return {re.sub(r"[-_.]+", "-", dep.name).lower(): dep for dep in pkg.dependencies or []}
+
+
+def _requirement(dep: PackageDependencyObject) -> Dict[str, Any]:
+    return {
+        "name": dep.name,
+        "version_constraints": sorted(dep.version_constraints or []),
+        "markers": dep.markers or {},
+        "extras": sorted(dep.requires_extras or []),
+    }
+
+
+def diff_releases(old: PackageObject, new: PackageObject) -> Dict[str, Any]:
+    """
+    Compare two releases of a package. Returns a record listing the
+    dependencies added, removed and changed (by constraints, markers or
+    extras) between them, and the changes to 'requires_python', yanked
+    status and known vulnerabilities. Like everywhere else in otlet, only
+    dependencies whose environment markers match this platform are compared.
+    """
+    old_deps, new_deps = _dependencies(old), _dependencies(new)
+    changed: List[Dict[str, Any]] = []
+    for key in sorted(old_deps.keys() & new_deps.keys()):
+        before, after = _requirement(old_deps[key]), _requirement(new_deps[key])
+        if {**before, "name": None} != {**after, "name": None}:
+            changed.append({"name": after["name"], "old": before, "new": after})
+
+    old_vulns = {vuln.id: vuln for vuln in old.vulnerabilities or []}
+    new_vulns = {vuln.id: vuln for vuln in new.vulnerabilities or []}
+    return {
+        "name": new.name,
+        "old_version": old.version,
+        "new_version": new.version,
+        "dependencies": {
+            "added": [_requirement(new_deps[key]) for key in sorted(new_deps.keys() - old_deps.keys())],
+            "removed": [_requirement(old_deps[key]) for key in sorted(old_deps.keys() - new_deps.keys())],
+            "changed": changed,
+        },
+        "requires_python": {"old": old.info.requires_python, "new": new.info.requires_python},
+        "yanked": {
+            "old": bool(old.info.yanked),
+            "new": bool(new.info.yanked),
+            "new_reason": new.info.yanked_reason if new.info.yanked else None,
+        },
+        "vulnerabilities": {
+            "fixed": sorted(old_vulns.keys() - new_vulns.keys()),
+            "introduced": sorted(new_vulns.keys() - old_vulns.keys()),
+            "unfixed": sorted(old_vulns.keys() & new_vulns.keys()),
+        },
+    }
+
+
+def format_requirement(requirement: Dict[str, Any]) -> str:
+    """Format a requirement record like otlet's dependency lists, i.e. 'idna (<4, >=2.5)'."""
+    text = requirement["name"]
+    if requirement["version_constraints"]:
+        text += f" ({', '.join(requirement['version_constraints'])})"
+    if requirement["markers"]:
+        # otlet keeps the operator only for version markers, others are compared for equality
+        text += "; " + " and ".join(
+            f"{k} {v}" if v[:1] in "<>=!~" else f'{k} == "{v}"' for k, v in requirement["markers"].items()
+        )
+    return text
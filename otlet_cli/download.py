@@ -1,13 +1,16 @@
 import re
 import os
 import sys
+import json
 import time
-from hashlib import md5
-from urllib.request import urlopen
-from typing import Optional
+import hashlib
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.error import HTTPError
 from otlet import PackageObject
 import threading
-from . import util
+from . import util, index, output, pool, store, tags, trace
 
 # The following regex patterns were taken/modified from version 1.4.1 of the 'wheel_filename' package
 # located at 'https://github.com/jwodder/wheel-filename'.
@@ -20,102 +23,588 @@ WHLRGX = re.compile(
     r"-(?P<platform_tag>[\w\d]+(?:\.[\w\d]+)*)"
     r"\.[Ww][Hh][Ll]"
 )
-msg_board = {"_download": {"bytes_read": 0}}
+DEFAULT_JOBS = 4
+DEFAULT_CONNECTIONS = 4
+DEFAULT_BUFFER_SIZE = 256 * 1024
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024  # files are never split into segments smaller than this
+SAVE_STATE_INTERVAL = 8 * 1024 * 1024  # bytes per segment between progress checkpoints
+# exit status of an interrupted download (128 + SIGINT, like shells report a command stopped by ^C),
+# so scripts can tell it apart from a finished one
+INTERRUPTED_EXIT_CODE = 130
 
 
-def get_dists(pkg: PackageObject, opt_dict: Optional[dict] = None) -> dict:
+class Distribution(NamedTuple):
+    """A single distribution file of a release, as returned by :func:`get_dists`."""
+
+    filename: str
+    download_url: str
+    dist_type: str
+    size: int
+    sha256: Optional[str]
+    build_tag: Optional[str] = None
+    python_tag: Optional[str] = None
+    abi_tag: Optional[str] = None
+    platform_tag: Optional[str] = None
+
+    @property
+    def converted_size(self) -> float:
+        if self.size > 1048576:
+            return round(self.size / 1.049e6, 1)
+        return round(self.size / 1024, 1)
+
+    @property
+    def size_measurement(self) -> str:
+        return "MiB" if self.size > 1048576 else "KiB"
+
+
+WHEEL_TAGS = ("build_tag", "python_tag", "abi_tag", "platform_tag")
+
+
+def parse_wheel_filename(filename: str) -> Optional[Tuple[Optional[str], ...]]:
+    """
+    Split a wheel filename into (project, version, build_tag, python_tag, abi_tag, platform_tag),
+    or return None if it is not a wheel. Well-formed names are split on '-' directly,
+    anything else falls back to WHLRGX.
+    """
+    if filename[-4:].lower() != ".whl":
+        return None
+    parts: List[Optional[str]] = filename[:-4].split("-")  # type: ignore
+    if len(parts) == 5:
+        parts.insert(2, None)
+    if len(parts) == 6 and all(parts[i] for i in (0, 1, 3, 4, 5)) and (
+        parts[2] is None or parts[2][:1].isdigit()
+    ):
+        return tuple(parts)
+    _match = WHLRGX.match(filename)
+    if not _match:
+        return None
+    return _match.group("project", "version", *WHEEL_TAGS)
+
+
+class DistributionIndex:
+    """
+    Distributions of a release, indexed by the values of their wheel tags. A
+    '-w' selector pattern is only matched against each distinct tag value once,
+    and the matching distributions are then found by set operations. Compressed
+    tag sets (i.e. 'py2.py3') are indexed by each of their components as well.
+    """
+
+    def __init__(self, distributions: Dict[int, Distribution]) -> None:
+        self.distributions = distributions
+        self.tags: Dict[str, Dict[str, Set[int]]] = {opt: {} for opt in WHEEL_TAGS}
+        # distributions that every pattern for a given tag lets through
+        self.unconstrained: Dict[str, Set[int]] = {opt: set() for opt in WHEEL_TAGS}
+        for num, dist in distributions.items():
+            for opt in WHEEL_TAGS:
+                value = getattr(dist, opt)
+                if dist.dist_type != "bdist_wheel" or not value or value.lower() in ("none", "any"):
+                    self.unconstrained[opt].add(num)
+                    continue
+                for _value in {value, *value.split(".")}:
+                    self.tags[opt].setdefault(_value, set()).add(num)
+
+    @trace.traced("filter")
+    def select(self, opt_dict: dict) -> Dict[int, Distribution]:
+        selected = set(self.distributions)
+        for opt, pattern in opt_dict.items():
+            matches = set(self.unconstrained[opt])
+            for value, nums in self.tags[opt].items():
+                if pattern.match(value):
+                    matches |= nums
+            selected &= matches
+        return {num: dist for num, dist in self.distributions.items() if num in selected}
+
+
+@trace.traced("filter")
+def get_dists(pkg: PackageObject, opt_dict: Optional[dict] = None) -> Dict[int, Distribution]:
     util.verbose_print(get_dists, f"Generating list of distributions, matching given criteria: {opt_dict}")
     distributions = {}
     for num, url in enumerate(pkg.urls):
-        _match = WHLRGX.match(url.filename)
-        if not _match:
-            distributions[num + 1] = {
-                "filename": url.filename,
-                "download_url": url.url,
-                "dist_type": url.packagetype,
-                "converted_size": round(url.size / 1.049e6, 1)
-                if url.size > 1048576
-                else round(url.size / 1024, 1),
-                "size_measurement": "MiB" if url.size > 1048576 else "KiB",
-            }
-            continue
-        distributions[num + 1] = {
-            "filename": url.filename,
-            "download_url": url.url,
-            "dist_type": "bdist_wheel",
-            "build_tag": _match.group("build_tag"),
-            "python_tag": _match.group("python_tag"),
-            "abi_tag": _match.group("abi_tag"),
-            "platform_tag": _match.group("platform_tag"),
-            "converted_size": round(url.size / 1.049e6, 1)
-            if url.size > 1048576
-            else round(url.size / 1024, 1),
-            "size_measurement": "MiB" if url.size > 1048576 else "KiB",
-        }
+        parsed = parse_wheel_filename(url.filename)
+        distributions[num + 1] = Distribution(
+            url.filename,
+            index.file_url(url.url, getattr(pkg, "source_url", None)),
+            "bdist_wheel" if parsed else url.packagetype,
+            url.size,
+            getattr(url.digests, "sha256", None),
+            *(parsed[2:] if parsed else ()),
+        )
 
     if not opt_dict:
         return distributions
 
     util.verbose_print(get_dists, "Removing packages not matching given criteria")
-    for key, dist in distributions.copy().items():
-        if dist["dist_type"] != "bdist_wheel":  # ignore non-wheels for obvious reasons
-            continue
-        for opt, pattern in opt_dict.items():
-            if (
-                not dist[opt]
-                or dist[opt].lower() == "none"
-                or dist[opt].lower() == "any"
-            ):
+    return DistributionIndex(distributions).select(opt_dict)
+
+
+class DownloadProgress:
+    """
+    Progress and outcome of one download, safe to read from any thread while
+    the download's own threads update it. status is 2 until the download
+    finishes, then 0 if it succeeded or 1 if it failed (with error set).
+
+    Listeners added with :meth:`add_listener` are called with the progress
+    object and an event ('start', 'progress' or 'finish') on the thread that
+    caused it, so they should return quickly. Use :meth:`wait` to block until
+    the download finishes.
+    """
+
+    def __init__(self, filename: Optional[str] = None, total: Optional[int] = None) -> None:
+        self.filename = filename
+        self.total = total
+        self.bytes_read = 0
+        self.status = 2
+        self.error: Optional[str] = None
+        self.from_store: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._resumed = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._listeners: List[Callable[["DownloadProgress", str], None]] = []
+
+    def add_listener(self, listener: Callable[["DownloadProgress", str], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, event: str) -> None:
+        for listener in self._listeners:
+            listener(self, event)
+
+    def start(self, total: Optional[int], resumed: int = 0) -> None:
+        """Record that the transfer started, with resumed bytes already on disk from an earlier run."""
+        with self._lock:
+            self.total = total
+            self.bytes_read = self._resumed = resumed
+            self.started = time.monotonic()
+        self._notify("start")
+
+    def add(self, count: int) -> None:
+        with self._lock:
+            self.bytes_read += count
+        self._notify("progress")
+
+    def finish(self, status: int, error: Optional[str] = None, from_store: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.from_store = from_store
+            self.finished = time.monotonic()
+        self._done.set()
+        self._notify("finish")
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the download finished, or timeout seconds passed. Returns whether it finished."""
+        return self._done.wait(timeout)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second transferred by this run, not counting bytes resumed from an earlier one."""
+        elapsed = self.elapsed
+        return (self.bytes_read - self._resumed) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the download is expected to finish, if the file size and throughput are known yet."""
+        if self.done():
+            return 0.0
+        throughput = self.throughput
+        if not self.total or not throughput:
+            return None
+        return max(0.0, (self.total - self.bytes_read) / throughput)
+
+
+def _probe(url: str) -> dict:
+    """
+    Return the size, byte range support and validators (ETag, Last-Modified) of a remote file.
+    Servers that reject HEAD requests are asked for the file's first byte instead.
+    """
+    try:
+        with pool.get_pool().open(url, method="HEAD") as res:
+            res.read()
+        size = res.headers.get("Content-Length")
+        accepts_ranges = res.headers.get("Accept-Ranges", "").lower() == "bytes"
+    except HTTPError as err:
+        util.verbose_print(_probe, f"HEAD request failed ({err.code} {err.reason}), probing with a ranged GET")
+        # closed without reading the body, in case the server ignores the range and sends everything
+        with pool.get_pool().open(url, {"Range": "bytes=0-0"}) as res:
+            pass
+        _match = re.fullmatch(r"bytes 0-0/(\d+)", res.headers.get("Content-Range") or "")
+        accepts_ranges = res.status == 206 and _match is not None
+        size = _match.group(1) if accepts_ranges else res.headers.get("Content-Length")  # type: ignore
+    return {
+        "url": url,
+        "size": int(size) if size else None,
+        "accepts_ranges": accepts_ranges,
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+    }
+
+
+def _load_state(dest: str, remote: dict) -> Optional[dict]:
+    """
+    Load the saved progress of a previous, interrupted download of dest.
+    The state is only reused if the remote file is unchanged since then.
+    """
+    try:
+        with open(dest + ".part.json") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(dest + ".part") or not remote["accepts_ranges"]:
+        return None
+    for key in ("size", "etag", "last_modified"):
+        if state.get(key) != remote[key]:
+            util.verbose_print(_load_state, f"Remote file changed ({key}), discarding partial download")
+            return None
+    return state
+
+
+def _save_state(dest: str, state: dict, lock: threading.Lock) -> None:
+    path = dest + ".part.json"
+    with lock:
+        # write to a temporary file first, so an interrupted save keeps the previous state
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+class _OrderedHasher:
+    """
+    Computes digests of a file while it is being written, possibly out of order
+    by several segment workers. Data written at the current hash position is
+    hashed straight from memory; anything written ahead of it is read back from
+    the file once the gap before it has been filled.
+    """
+
+    def __init__(
+        self, path: str, algorithms: List[str], buffer_size: int, segments: Optional[list] = None
+    ) -> None:
+        self.path = path
+        self.hashes = {algo: hashlib.new(algo) for algo in algorithms}
+        self.buffer_size = buffer_size
+        self.segments = segments
+        self.position = 0
+        self.lock = threading.Lock()
+
+    @trace.traced("hash")
+    def _hash(self, data: bytes) -> None:
+        for _hash in self.hashes.values():
+            _hash.update(data)
+        self.position += len(data)
+
+    def _catch_up(self) -> None:
+        if not self.segments:
+            return
+        for start, end, written in self.segments:
+            if self.position > end:
                 continue
-            is_match = pattern.match(dist[opt])
-            if not is_match:
-                distributions.pop(key)
-                break
+            stop = start + written
+            if self.position < stop:
+                with open(self.path, "rb") as f:
+                    f.seek(self.position)
+                    while self.position < stop:
+                        self._hash(f.read(min(self.buffer_size, stop - self.position)))
+            if stop <= end:
+                break  # segment is still being written, its worker takes it from here
+
+    def update(self, offset: int, data: bytes) -> None:
+        """Record that data was written at offset. Must be called after the segment's progress was updated."""
+        with self.lock:
+            if offset == self.position:
+                self._hash(data)
+            self._catch_up()
+
+    def catch_up(self) -> None:
+        with self.lock:
+            self._catch_up()
 
-    return distributions
+    def hexdigests(self) -> dict:
+        with self.lock:
+            self._catch_up()
+            return {algo: _hash.hexdigest() for algo, _hash in self.hashes.items()}
 
 
-def _download(url: str, dest: str) -> None:
-    """Download a binary file from a given URL. Do not use this function directly."""
-    # download file and store bytes
+def _write_all(f: BinaryIO, data: bytes) -> None:
+    """Write all of data to the unbuffered file f, which may write less than asked for in one call."""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view) :]
+
+
+@trace.traced("download")
+def _download_segment(
+    dest: str,
+    state: dict,
+    segment: List[int],
+    buffer_size: int,
+    hasher: _OrderedHasher,
+    progress: DownloadProgress,
+    cancel: threading.Event,
+    errors: List[Exception],
+    lock: threading.Lock,
+) -> None:
+    """
+    Download the remaining bytes of segment ([start, end, bytes_written]) into
+    the same offsets of the preallocated .part file, recording progress in
+    segment (guarded by lock, which also guards saving state).
+    """
+    start, end, written = segment
+    headers = {"Range": f"bytes={start + written}-{end}"}
+    if state["etag"] or state["last_modified"]:
+        # have the server send a 200 instead of a 206 if the file changed since state was created
+        headers["If-Range"] = state["etag"] or state["last_modified"]
+    try:
+        # unbuffered, so the hasher can read back what was written right away
+        with pool.get_pool().open(state["url"], headers) as res, open(dest + ".part", "r+b", buffering=0) as f:
+            if res.status != 206:
+                raise IOError(f"Server ignored range request for bytes {start + written}-{end}")
+            _match = re.fullmatch(r"bytes (\d+)-(\d+)/(?:\d+|\*)", res.headers.get("Content-Range") or "")
+            if not _match or int(_match.group(1)) != start + written or int(_match.group(2)) > end:
+                raise IOError(
+                    f"Server sent range '{res.headers.get('Content-Range')}' for bytes {start + written}-{end}"
+                )
+            f.seek(start + written)
+            since_save = 0
+            while not cancel.is_set():
+                # never read past the segment, into the next one
+                j = res.read(min(buffer_size, end + 1 - segment[0] - segment[2]))
+                if not j:
+                    break
+                _write_all(f, j)
+                with lock:
+                    offset = segment[0] + segment[2]
+                    segment[2] += len(j)
+                progress.add(len(j))
+                hasher.update(offset, j)
+                since_save += len(j)
+                if since_save >= SAVE_STATE_INTERVAL:
+                    _save_state(dest, state, lock)
+                    since_save = 0
+    except Exception as err:  # reported back to _download, which finishes the progress
+        errors.append(err)
+
+
+@trace.traced("download")
+def _download(
+    url: str,
+    dest: str,
+    connections: int = DEFAULT_CONNECTIONS,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    cancel: Optional[threading.Event] = None,
+    digests: Optional[dict] = None,
+    progress: Optional[DownloadProgress] = None,
+    size: Optional[int] = None,
+) -> DownloadProgress:
+    """
+    Download a binary file from a given URL. Use :func:`download` to run it in the background.
+
+    The file is verified against digests ({algorithm: hexdigest}, i.e. the
+    'sha256' PyPI publishes for each file), falling back to the MD5 ETag
+    returned by the PyPI CDN if no digests are given. size is the published
+    size of the file, if known. Progress and the final status are reported
+    through progress, which is returned.
+    """
     util.verbose_print(_download, "Beginning download...")
-    msg_board["_download"]["status"] = 2
-    request_obj = urlopen(url)
-    f = open(dest + ".part", "wb")
-    while True:
-        j = request_obj.read(1024 * 3)  # read one 3K chunk at a time
-        if j == b"":
-            break
-        f.write(j)
-        msg_board["_download"]["bytes_read"] += 1024 * 3
+    if progress is None:
+        progress = DownloadProgress()
+    if progress.filename is None:
+        progress.filename = os.path.basename(dest)
+    if cancel is None:
+        cancel = threading.Event()
+    digests = {algo: value.lower() for algo, value in (digests or {}).items() if value}
+    _store = store.get_store()
+    if _store and "sha256" in digests:
+        method = _store.link(digests["sha256"], dest, size)
+        if method:
+            progress.finish(0, from_store=method)
+            return progress
+
+    remote = _probe(url)
+    if not digests and re.fullmatch(r'"?[0-9a-f]{32}"?', remote["etag"] or ""):
+        digests = {"md5": remote["etag"].strip('"')}
+    # always compute the sha256 when the store is in use, since it is keyed by it
+    algorithms = list(digests) + (["sha256"] if _store and "sha256" not in digests else [])
+
+    state = _load_state(dest, remote)
+    lock = threading.Lock()
+    if state:
+        state["url"] = url
+        progress.start(remote["size"], sum(seg[2] for seg in state["segments"]))
+        util.verbose_print(_download, f"Resuming download at {progress.bytes_read} bytes")
+    elif remote["accepts_ranges"] and remote["size"]:
+        # split the file into equally sized ranges, each fetched over its own connection
+        size = remote["size"]
+        count = max(1, min(connections, size // MIN_SEGMENT_SIZE))
+        bounds = [size * i // count for i in range(count + 1)]
+        state = dict(
+            remote, segments=[[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]
+        )
+        util.verbose_print(_download, f"Downloading {size} bytes over {count} connection(s)")
+        with open(dest + ".part", "wb") as f:
+            f.truncate(size)  # preallocate, so each segment can write at its own offset
+        _save_state(dest, state, lock)
+        progress.start(size)
+
+    if state:
+        hasher = _OrderedHasher(
+            dest + ".part", algorithms, buffer_size, state["segments"]
+        )
+        hasher.catch_up()  # hash whatever a previous run already downloaded
+        errors: List[Exception] = []
+        threads = [
+            threading.Thread(
+                target=_download_segment,
+                args=(dest, state, segment, buffer_size, hasher, progress, cancel, errors, lock),
+            )
+            for segment in state["segments"]
+            if segment[0] + segment[2] <= segment[1]
+        ]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        _save_state(dest, state, lock)
+        # a response may end early without an error, which would leave part of the file zero-filled
+        missing = sum(seg[1] + 1 - seg[0] - seg[2] for seg in state["segments"])
+        if errors or cancel.is_set() or missing:
+            if errors:
+                reason = f"Download failed: {errors[0]}"
+            elif cancel.is_set():
+                reason = "Download interrupted."
+            else:
+                reason = f"Download failed: the server sent {missing} bytes less than requested."
+            util.verbose_print(_download, f"{reason} Progress saved to {dest}.part.json")
+            progress.finish(1, reason + " Run the same command again to resume.")
+            return progress
+        os.remove(dest + ".part.json")
+    else:
+        # fall back to a single stream if the server does not support range requests
+        util.verbose_print(_download, "Downloading over a single connection")
+        hasher = _OrderedHasher(dest + ".part", algorithms, buffer_size)
+        progress.start(remote["size"])
+        with pool.get_pool().open(url) as request_obj, open(dest + ".part", "wb") as f:
+            while not cancel.is_set():
+                j = request_obj.read(buffer_size)
+                if not j:
+                    break
+                f.write(j)
+                hasher.update(hasher.position, j)
+                progress.add(len(j))
+        if cancel.is_set():
+            progress.finish(1, "Download interrupted.")
+            return progress
+        if remote["size"] is not None and hasher.position != remote["size"]:
+            os.remove(dest + ".part")
+            progress.finish(1, f"Download failed: received {hasher.position} of {remote['size']} bytes.")
+            return progress
     util.verbose_print(_download, "File written successfully. Closing.")
-    f.close()
 
     # enforce that we downloaded the correct file, and no corruption took place
-    util.verbose_print(_download, "Performing MD5 hash verification on downloaded file.")
-    with open(dest + ".part", "rb") as f:
-        data_hash = md5(f.read()).hexdigest()
-    cloud_hash = request_obj.headers["ETag"].strip('"')
-    if data_hash != cloud_hash:
-        msg_board["_download"][
-            "error"
-        ] = "The file was corrupted during download. Please try again..."
-        msg_board["_download"]["status"] = 1
-        return
+    if not digests:
+        util.verbose_print(_download, "No digest available for this file, skipping hash verification.")
+    else:
+        util.verbose_print(_download, f"Verifying {', '.join(digests)} digest(s) of downloaded file.")
+    computed = hasher.hexdigests()
+    if any(computed[algo] != value for algo, value in digests.items()):
+        os.remove(dest + ".part")  # start from scratch next time
+        progress.finish(1, "The file was corrupted during download. Please try again...")
+        return progress
 
     os.rename(dest + ".part", dest)  # remove temp tag
-    util.verbose_print(_download, "Download finished successfully. Killing thread.")
-    msg_board["_download"]["status"] = 0
+    if _store:
+        _store.add(dest, computed["sha256"])
+    util.verbose_print(_download, "Download finished successfully.")
+    progress.finish(0)
+    return progress
+
+
+def _run_download(
+    url: str,
+    dest: str,
+    connections: int,
+    buffer_size: int,
+    cancel: Optional[threading.Event],
+    digests: Optional[dict],
+    progress: DownloadProgress,
+    size: Optional[int] = None,
+) -> DownloadProgress:
+    try:
+        return _download(url, dest, connections, buffer_size, cancel, digests, progress, size)
+    except Exception as err:
+        # unexpected errors still finish the progress, so nobody waits on it forever
+        if not progress.done():
+            progress.finish(1, f"Download failed: {err}")
+        raise
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def download(
+    url: str,
+    dest: str,
+    connections: int = DEFAULT_CONNECTIONS,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    digests: Optional[dict] = None,
+    cancel: Optional[threading.Event] = None,
+    progress: Optional[DownloadProgress] = None,
+    size: Optional[int] = None,
+) -> "Future[DownloadProgress]":
+    """
+    Download url to dest in the background, as described for :func:`_download`,
+    and return a future for its :class:`DownloadProgress`. Pass a progress
+    object to follow the download while it runs, and set cancel to interrupt
+    it (it can be resumed later). Up to DEFAULT_JOBS downloads run at once.
+
+    Failed downloads resolve to a progress with status 1; the future only
+    raises for unexpected errors, i.e. an :class:`URLError` if the file's
+    server can't be reached.
+    """
+    global _executor
+    if progress is None:
+        progress = DownloadProgress()
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_JOBS, thread_name_prefix="otlet-download")
+    return _executor.submit(_run_download, url, dest, connections, buffer_size, cancel, digests, progress, size)
+
+
+def format_progress(progress: DownloadProgress, total: Optional[int] = None) -> str:
+    """Format how much of a download is done, i.e. '1.2 / 10.8 MiB, 3.4 MiB/s, 3s left'."""
+    total = total or progress.total or 0
+    unit, scale = ("MiB", 1.049e6) if total > 1048576 else ("KiB", 1024)
+    text = f"{round(progress.bytes_read / scale, 1)} / {round(total / scale, 1)} {unit}"
+    if progress.throughput:
+        text += f", {round(progress.throughput / 1.049e6, 1)} MiB/s"
+    if progress.eta is not None and not progress.done():
+        text += f", {int(progress.eta)}s left"
+    return text
 
 
 def download_dist(
     pkg: PackageObject, 
     dest: Optional[str] = None, 
     dist_type: Optional[str] = None, 
-    opt_dict: Optional[dict] = None
+    opt_dict: Optional[dict] = None,
+    connections: int = DEFAULT_CONNECTIONS,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    target: Optional[str] = None,
 ) -> int:
     """
-    Download a specified package's distribution file.
+    Download a specified package's distribution file. If a target
+    (see :func:`tags.parse_target`) is given, the most compatible wheel
+    for it is chosen automatically instead of prompting the user.
     """
 
     if opt_dict: 
@@ -126,9 +615,26 @@ def download_dist(
     util.verbose_print(download_dist, f"dist_type: {dist_type}")
     util.verbose_print(download_dist, "Running function get_dists()")
     dists = get_dists(pkg, opt_dict)
-    dist_types = [x for x in dists.items() if x[1]["dist_type"] == dist_type]
+    dist_types = [x for x in dists.items() if x[1].dist_type == dist_type]
     dist_type_count = len(dist_types)
-    if any((not dist_type, dist_type_count > 1)) and len(dists) > 1:
+    if target:
+        ranked = tags.rank_dists(dists, target)
+        if not ranked:
+            print(
+                f"No wheels found for {pkg.release_name} that are compatible with '{target}'.",
+                file=sys.stderr,
+            )
+            return 1
+        dl_number = ranked[0][0]
+        util.verbose_print(download_dist, f"Best match for '{target}' is {ranked[0][1].filename}")
+    elif output.is_structured() and len(dists) > 1:
+        # never prompt in machine-readable mode, pick what 'batch --download' would
+        best = select_dist(pkg, dist_type, opt_dict)
+        if not best:
+            print(f"No distributions found for {pkg.release_name}, matching the given criteria.", file=sys.stderr)
+            return 1
+        dl_number = next(num for num, dist in dists.items() if dist.filename == best.filename)
+    elif any((not dist_type, dist_type_count > 1)) and len(dists) > 1:
         util.print_distributions(pkg, dists, dist_type)
         while True:
             try:
@@ -158,37 +664,195 @@ def download_dist(
     # search for requested distribution type in pkg.urls
     # and download distribution
     if dest is None:
-        dest = dists[dl_number]["filename"]
+        dest = dists[dl_number].filename
 
     ### Download distribution from PyPI CDN
-    util.verbose_print(download_dist, "Creating new thread")
-    th = threading.Thread(
-        target=_download, args=(dists[dl_number]["download_url"], dest)
-    )
-    util.verbose_print(download_dist, f"Spinning up new thread ({th.name}, {th.ident}) to perform download")
-    th.start()
+    dist = dists[dl_number]
+    cancel = threading.Event()
+    progress = DownloadProgress(dist.filename, dist.size)
+    future = download(dist.download_url, dest, connections, buffer_size, {"sha256": dist.sha256}, cancel, progress, dist.size or None)
+    util.verbose_print(download_dist, f"Downloading {dist.download_url} in the background")
     l = ["/", "|", "\\", "-"]
     count = 0
-    while th.is_alive():
-        size_read = (
-            round(msg_board["_download"]["bytes_read"] / 1.049e6, 1)
-            if dists[dl_number]["size_measurement"] == "MiB"
-            else round(msg_board["_download"]["bytes_read"] / 1024, 1)
-        )
+    try:
+        # redraw the spinner every 100 ms, or right away once the download finishes
+        while not progress.wait(0.1):
+            if output.is_structured():
+                continue  # keep stdout clean for the result record
+            print(
+                f"[{l[count]}] [{format_progress(progress, dist.size)}] Downloading {pkg.release_name} ({dist.dist_type})...",
+                end="\r",
+            )
+            count = (count + 1) % len(l)
+        future.result()
+    except (KeyboardInterrupt, SystemExit):
+        # let the download checkpoint its progress, so the next run can resume
+        cancel.set()
+        progress.wait()
+        if not output.is_structured():
+            print("\33[2K", end="\r")
+        print(progress.error or "Download interrupted.", file=sys.stderr)
+        raise SystemExit(INTERRUPTED_EXIT_CODE)
+    if output.is_structured():
+        output.emit(output.download_record(dist, dest, progress))
+        return progress.status
+    print("\33[2K", end="\r")
+    if progress.from_store:
         print(
-            f"[{l[count]}] [{size_read} / {dists[dl_number]['converted_size']} {dists[dl_number]['size_measurement']}] Downloading {pkg.release_name} ({dists[dl_number]['dist_type']})...",
-            end="\r",
+            f"Copied {pkg.release_name} ({dist.dist_type}) to {dest} from the local store ({progress.from_store})!"
         )
-        count += 1
-        if count == len(l):
-            count = 0
-        time.sleep(0.1)
-    print("\33[2K", end="\r")
-    if msg_board["_download"]["status"] == 0:
+    elif progress.status == 0:
         print(
-            f"Downloaded {pkg.release_name} ({dists[dl_number]['dist_type']}) to {dest}!"
+            f"Downloaded {pkg.release_name} ({dist.dist_type}) to {dest}!"
         )
     else:
-        print(msg_board["_download"]["error"])
-        return msg_board["_download"]["status"]
+        print(progress.error)
+        return progress.status
     return 0
+
+
+def select_dist(
+    pkg: PackageObject,
+    dist_type: Optional[str] = None,
+    opt_dict: Optional[dict] = None,
+    target: Optional[str] = None,
+) -> Optional[Distribution]:
+    """
+    Non-interactively pick the distribution file of pkg that best matches the
+    given criteria. With a target, this is the most compatible wheel for it.
+    Otherwise wheels are preferred over other distribution types, and
+    wheels whose tags actually match opt_dict over 'none'/'any' wheels.
+    """
+    if target:
+        ranked = tags.rank_dists(get_dists(pkg, opt_dict), target)
+        return ranked[0][1] if ranked else None
+    if opt_dict:
+        dist_type = "bdist_wheel"
+    candidates = [
+        dist
+        for dist in get_dists(pkg, opt_dict).values()
+        if not dist_type or dist.dist_type == dist_type
+    ]
+
+    def specificity(dist: Distribution) -> Tuple[bool, int]:
+        if dist.dist_type != "bdist_wheel":
+            return (False, 0)
+        return (
+            True,
+            sum(
+                1
+                for opt in (opt_dict or {})
+                if getattr(dist, opt) and getattr(dist, opt).lower() not in ("none", "any")
+            ),
+        )
+
+    return max(candidates, key=specificity, default=None)
+
+
+def download_dists(
+    packages: Iterable[Tuple[str, PackageObject]],
+    dest_dir: str = ".",
+    dist_type: Optional[str] = None,
+    opt_dict: Optional[dict] = None,
+    jobs: int = 4,
+    connections: int = 1,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    target: Optional[str] = None,
+) -> int:
+    """
+    Download the best matching distribution of each (spec, package) pair into
+    dest_dir through a bounded pool of workers, with a single progress line
+    for all downloads.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    cancel = threading.Event()
+    progresses: List[DownloadProgress] = []
+    unreported: List[Tuple[str, Distribution, DownloadProgress]] = []
+    writer = output.RecordWriter(flush=True) if output.is_structured() else None
+    total_size = 0
+    code = 0
+
+    def report_finished() -> None:
+        # write a record for every download that finished since the last call
+        for item in [_ for _ in unreported if _[2].done()]:
+            spec, dist, progress = item
+            writer.write(output.download_record(dist, os.path.join(dest_dir, dist.filename), progress, spec))
+            unreported.remove(item)
+
+    def run(dist: Distribution, progress: DownloadProgress) -> None:
+        try:
+            _run_download(
+                dist.download_url,
+                os.path.join(dest_dir, dist.filename),
+                connections,
+                buffer_size,
+                cancel,
+                {"sha256": dist.sha256},
+                progress,
+                dist.size or None,
+            )
+        except Exception:
+            pass  # recorded in progress, reported below like any other failure
+        if progress.status == 0 and not writer:
+            print("\33[2K", end="\r")
+            if progress.from_store:
+                print(f"Copied {dist.filename} from the local store ({progress.from_store})")
+            else:
+                print(f"Downloaded {dist.filename}")
+
+    executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+    futures = []
+    try:
+        for spec, pkg in packages:
+            dist = select_dist(pkg, dist_type, opt_dict, target)
+            if not dist:
+                print(f"No distributions found for {pkg.release_name}, matching the given criteria.", file=sys.stderr)
+                code = 1
+                continue
+            util.verbose_print(download_dists, f"Selected {dist.filename} for {spec}")
+            progress = DownloadProgress(dist.filename, dist.size)
+            progresses.append(progress)
+            unreported.append((spec, dist, progress))
+            total_size += dist.size
+            futures.append(executor.submit(run, dist, progress))
+
+        l = ["/", "|", "\\", "-"]
+        count = 0
+        # redraw every 100 ms, or right away once the last download finishes
+        while wait(futures, timeout=0.1).not_done:
+            if writer:
+                report_finished()
+                continue
+            done = sum(1 for progress in progresses if progress.done())
+            size_read = sum(progress.bytes_read for progress in progresses)
+            throughput = sum(progress.throughput for progress in progresses if not progress.done())
+            print(
+                f"[{l[count]}] [{round(size_read / 1.049e6, 1)} / {round(total_size / 1.049e6, 1)} MiB, {round(throughput / 1.049e6, 1)} MiB/s] Downloading {len(progresses)} files ({done} done)...",
+                end="\r",
+            )
+            count = (count + 1) % len(l)
+    except (KeyboardInterrupt, SystemExit):
+        # stop every download and let them checkpoint, so the next run can resume
+        cancel.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if writer:
+            report_finished()
+            writer.close()
+        else:
+            print("\33[2K", end="\r")
+        print("Downloads interrupted. Run the same command again to resume.", file=sys.stderr)
+        raise SystemExit(INTERRUPTED_EXIT_CODE)
+    executor.shutdown(wait=True)
+
+    failed = [progress for progress in progresses if progress.status != 0]
+    if writer:
+        report_finished()
+        writer.close()
+        return 1 if failed or code else 0
+    print("\33[2K", end="\r")
+    for progress in failed:
+        print(f"{progress.filename}: {progress.error or 'Download interrupted.'}", file=sys.stderr)
+    print(f"Downloaded {len(progresses) - len(failed)} of {len(progresses)} files to {dest_dir}.")
+    return 1 if failed or code else 0
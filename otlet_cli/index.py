@@ -0,0 +1,42 @@
+import os
+import configparser
+from typing import Dict, Optional
+from urllib.parse import urljoin
+from . import config
+
+PYPI_JSON_URL = "https://pypi.org/pypi"
+PYPI_FILES_URL = "https://files.pythonhosted.org"
+
+
+def config_file() -> str:
+    """Return the path of the otlet config file, honoring $OTLET_CONFIG and $XDG_CONFIG_HOME."""
+    if os.environ.get("OTLET_CONFIG"):
+        return os.environ["OTLET_CONFIG"]
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "otlet", "otlet.ini")
+
+
+def read_config_file(path: Optional[str] = None) -> Dict[str, str]:
+    """Return the settings in the '[otlet]' section of the config file, or nothing if there is none."""
+    parser = configparser.ConfigParser()
+    parser.read(path or config_file())  # a missing file is simply skipped
+    return dict(parser["otlet"]) if parser.has_section("otlet") else {}
+
+
+def index_url() -> str:
+    """Return the base URL of the JSON API to query, i.e. 'https://pypi.org/pypi'."""
+    return (config.get("index_url") or PYPI_JSON_URL).rstrip("/")
+
+
+def file_url(url: str, base: Optional[str] = None) -> str:
+    """
+    Return where to download a distribution file listed as url in the metadata
+    fetched from base. Relative URLs (as served by some mirrors) are resolved
+    against base, and files on PyPI's CDN are fetched from the configured
+    files URL instead, if there is one.
+    """
+    url = urljoin(base or index_url() + "/", url)
+    files_url = config.get("files_url")
+    if files_url and url.startswith(PYPI_FILES_URL + "/"):
+        url = files_url.rstrip("/") + url[len(PYPI_FILES_URL):]
+    return url
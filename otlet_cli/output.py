@@ -0,0 +1,239 @@
+import sys
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+from . import config
+
+if TYPE_CHECKING:
+    from otlet.api import PackageObject, PackageVulnerabilitiesObject
+    from .audit import AuditResult
+    from .deps import DependencyNode
+    from .download import Distribution, DownloadProgress
+    from .releases import Release
+    from .verify import VerifyResult
+
+FORMATS = ["text", "json", "ndjson"]
+
+
+def is_structured() -> bool:
+    """Return True if output should be JSON/NDJSON records instead of formatted text."""
+    return config.get("format", "text") != "text"
+
+
+def _default(obj: Any) -> Any:
+    # datetimes, parsed versions and digest namespaces from otlet objects
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, SimpleNamespace):
+        return vars(obj)
+    return str(obj)
+
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False)
+
+
+def encode(record: Dict[str, Any]) -> str:
+    """Serialize a record to compact JSON."""
+    return _encoder.encode(record)
+
+
+class RecordWriter:
+    """
+    Writes records to stdout as soon as they are produced. In 'ndjson' mode
+    each record is a line of its own; in 'json' mode the records form a
+    single array, which is still written incrementally.
+    """
+
+    def __init__(self, flush: bool = False) -> None:
+        self.ndjson = config.get("format") == "ndjson"
+        self.flush = flush
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        text = _encoder.encode(record)
+        if self.ndjson:
+            sys.stdout.write(text + "\n")
+        else:
+            sys.stdout.write(("[" if not self.count else ",\n") + text)
+        self.count += 1
+        if self.flush:
+            sys.stdout.flush()
+
+    def close(self) -> None:
+        if not self.ndjson:
+            sys.stdout.write("]\n" if self.count else "[]\n")
+        sys.stdout.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def emit(record: Dict[str, Any]) -> None:
+    """Write a single record as one JSON document (or NDJSON line)."""
+    sys.stdout.write(_encoder.encode(record) + "\n")
+
+
+def emit_all(records: Iterable[Dict[str, Any]], flush: bool = False) -> int:
+    """Stream every record in records to stdout, returning how many were written."""
+    with RecordWriter(flush) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def notices(pkg: "PackageObject") -> List[Dict[str, Any]]:
+    """Return the notices shown by '--notices' as records."""
+    from otlet.markers import DEPENDENCY_ENVIRONMENT_MARKERS
+
+    _notices: List[Dict[str, Any]] = []
+    if pkg.vulnerabilities:
+        _notices.append({"type": "vulnerabilities", "count": len(pkg.vulnerabilities)})
+    if pkg.info.yanked:
+        _notices.append({"type": "yanked", "reason": pkg.info.yanked_reason})
+    python_version = DEPENDENCY_ENVIRONMENT_MARKERS["python_full_version"]
+    if pkg.info.requires_python and not python_version.fits_constraints(pkg.info.requires_python):
+        _notices.append(
+            {
+                "type": "incompatible_python",
+                "requires_python": pkg.info.requires_python,
+                "python_version": str(python_version),
+            }
+        )
+    return _notices
+
+
+def package_record(pkg: "PackageObject") -> Dict[str, Any]:
+    info = pkg.info
+    return {
+        "name": pkg.name,
+        "version": pkg.version,
+        "summary": info.summary,
+        "upload_time": pkg.upload_time,
+        "home_page": info.home_page,
+        "package_url": info.package_url,
+        "project_urls": info.project_urls,
+        "author": info.author,
+        "author_email": info.author_email,
+        "maintainer": info.maintainer,
+        "maintainer_email": info.maintainer_email,
+        "license": info.license,
+        "requires_python": info.requires_python,
+        "yanked": bool(info.yanked),
+        "yanked_reason": info.yanked_reason,
+        "extras": list(info.possible_extras or []),
+        "dependencies": [
+            {
+                "name": dep.name,
+                "version_constraints": dep.version_constraints,
+                "markers": dep.markers,
+                "extras": dep.requires_extras,
+            }
+            for dep in pkg.dependencies or []
+        ],
+        "vulnerability_count": len(pkg.vulnerabilities or []),
+        "notices": notices(pkg),
+    }
+
+
+def release_record(pkg: "PackageObject", release: "Release") -> Dict[str, Any]:
+    return {
+        "name": pkg.name,
+        "version": release.name,
+        "upload_time": release.upload_time,
+        "yanked": release.yanked,
+    }
+
+
+def distribution_record(pkg: "PackageObject", num: int, dist: "Distribution") -> Dict[str, Any]:
+    return {"name": pkg.name, "version": pkg.version, "num": num, **dist._asdict()}
+
+
+def vulnerability_record(pkg: "PackageObject", vuln: "PackageVulnerabilitiesObject") -> Dict[str, Any]:
+    return {"name": pkg.name, "version": pkg.version, **vuln._asdict()}
+
+
+def audit_record(result: "AuditResult") -> Dict[str, Any]:
+    from .audit import fixed_version
+
+    record: Dict[str, Any] = {"spec": result.spec.line, "name": result.spec.name}
+    if result.error is not None:
+        record["error"] = result.error
+        return record
+    record["version"] = result.pkg.version
+    record["vulnerabilities"] = [
+        {"id": vuln.id, "aliases": vuln.aliases, "fixed_in": vuln.fixed_in, "link": vuln.link, "details": vuln.details}
+        for vuln in result.vulnerabilities
+    ]
+    record["fixed_in"] = fixed_version(result.pkg, result.vulnerabilities) if result.vulnerabilities else None
+    return record
+
+
+def dependency_record(node: "DependencyNode", required_by: List["DependencyNode"]) -> Dict[str, Any]:
+    record: Dict[str, Any] = {
+        "name": node.name,
+        "version": node.version,
+        "required_by": [f"{parent.name} {parent.version}" for parent in required_by],
+    }
+    if node.error:
+        record["error"] = node.error
+    return record
+
+
+def dependency_tree_record(
+    node: "DependencyNode", requirement: Optional[Any] = None, _expanded: Optional[set] = None
+) -> Dict[str, Any]:
+    """
+    Describe the dependency tree below node as nested records. A release that
+    appears more than once only lists its dependencies the first time, and is
+    marked 'repeated' everywhere else.
+    """
+    expanded = set() if _expanded is None else _expanded
+    record: Dict[str, Any] = {"name": node.name, "version": node.version}
+    if requirement is not None:
+        record["version_constraints"] = requirement.version_constraints
+    if node.error:
+        record["error"] = node.error
+    if node.children:
+        if node.key in expanded:
+            record["repeated"] = True
+        else:
+            expanded.add(node.key)
+            record["dependencies"] = [
+                dependency_tree_record(child, dep, expanded) for dep, child in node.children
+            ]
+    return record
+
+
+def download_record(
+    dist: "Distribution", path: str, progress: "DownloadProgress", spec: Optional[str] = None
+) -> Dict[str, Any]:
+    """Describe the outcome of downloading dist to path, as tracked by its progress."""
+    record: Dict[str, Any] = {"filename": dist.filename, "path": path, "size": dist.size, "sha256": dist.sha256}
+    if spec is not None:
+        record = {"spec": spec, **record}
+    if progress.status == 0:
+        record["source"] = "store" if progress.from_store else "download"
+        if not progress.from_store:
+            record["seconds"] = round(progress.elapsed, 3)
+    else:
+        record["error"] = progress.error or "Download interrupted."
+    return record
+
+
+def verify_record(result: "VerifyResult") -> Dict[str, Any]:
+    record: Dict[str, Any] = {
+        "path": result.file.path,
+        "project": result.file.project,
+        "version": result.file.version,
+        "size": result.file.size,
+        "status": result.status,
+        "expected": result.expected,
+        "actual": result.actual,
+    }
+    if result.error is not None:
+        record["error"] = result.error
+    return record
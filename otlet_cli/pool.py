@@ -0,0 +1,201 @@
+import io
+import gzip
+import base64
+import threading
+import http.client
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit, unquote
+from urllib.request import getproxies, proxy_bypass
+from . import util, trace
+
+MAX_REDIRECTS = 5
+DEFAULT_TIMEOUT = 30
+
+
+class Response(NamedTuple):
+    url: str
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections, kept per host, so repeated requests skip
+    the TCP and TLS handshakes. Each connection serves one request at a time;
+    at most maxsize idle connections are kept for every host.
+
+    Errors are raised like :func:`urllib.request.urlopen` would: an
+    :class:`HTTPError` for error (and '304 Not Modified') responses, and an
+    :class:`URLError` if the server can't be reached.
+    """
+
+    def __init__(self, maxsize: int = 8, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        proxy = None if proxy_bypass(host) else getproxies().get(scheme)
+        if not proxy:
+            if scheme == "https":
+                return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+        _proxy = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+        headers = {}
+        if _proxy.username:
+            credentials = f"{unquote(_proxy.username)}:{unquote(_proxy.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+        if scheme == "https":
+            # tunnel through the proxy, TLS is still negotiated with the host itself
+            conn = http.client.HTTPSConnection(_proxy.hostname, _proxy.port or 80, timeout=self.timeout)
+            conn.set_tunnel(host, port, headers)
+        else:
+            conn = http.client.HTTPConnection(_proxy.hostname, _proxy.port or 80, timeout=self.timeout)
+            conn.proxy_headers = headers  # type: ignore
+        return conn
+
+    def _acquire(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        util.verbose_print(self._acquire, f"Opening new connection to {key[1]}:{key[2]}")
+        return self._connect(*key)
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def open(
+        self, url: str, headers: Optional[Dict[str, str]] = None, method: str = "GET"
+    ) -> "PooledResponse":
+        """
+        Send a request for url over a pooled connection, following redirects,
+        and return the response with its body still unread. Close it (or use
+        it as a context manager) to hand the connection back to the pool.
+        """
+        headers = headers or {}
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                raise URLError(f"unknown url type: '{url}'")
+            key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+            res = PooledResponse(self, key, *self._send(key, method, target, url, headers), url)
+            if res.status in (301, 302, 303, 307, 308) and res.headers.get("Location"):
+                res.read()
+                res.close()
+                url = urljoin(url, res.headers["Location"])
+                continue
+            if res.status >= 300:
+                body = res.read()
+                res.close()
+                raise HTTPError(url, res.status, res.reason, res.headers, io.BytesIO(body))
+            return res
+        raise URLError(f"too many redirects for '{url}'")
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Send a GET request for url over a pooled connection, and return the whole (decompressed) response."""
+        with trace.span("request", "network", url=url):
+            res = self.open(url, {"Accept-Encoding": "gzip", **(headers or {})})
+            with res:
+                body = res.read()
+        if body and res.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return Response(res.url, res.status, res.headers, body)
+
+    def _send(
+        self, key: Tuple[str, str, int], method: str, target: str, url: str, headers: Dict[str, str]
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        conn = self._acquire(key)
+        for attempt in range(2):
+            reused = conn.sock is not None
+            if getattr(conn, "proxy_headers", None) is not None:
+                # plain http through a proxy takes the absolute url
+                target = url
+                headers = {**headers, **conn.proxy_headers}  # type: ignore
+            try:
+                conn.request(method, target, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.HTTPException, OSError) as err:
+                conn.close()
+                if reused and not attempt:
+                    # the server closed an idle keep-alive connection, try again once
+                    continue
+                raise URLError(err) from err
+        raise URLError(f"unable to connect to '{url}'")  # not reached
+
+    def close(self) -> None:
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+class PooledResponse:
+    """
+    A response received over a pooled connection. Its connection goes back to
+    the pool when the response is closed after its body was read completely,
+    and is discarded otherwise.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        key: Tuple[str, str, int],
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+    ) -> None:
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        try:
+            return self.response.read(amt)
+        except (http.client.HTTPException, OSError) as err:
+            self.conn.close()
+            raise URLError(err) from err
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        if self.response.isclosed() and not self.response.will_close:
+            self.pool._release(self.key, self.conn)
+        else:
+            self.conn.close()
+        self.conn = None  # type: ignore
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+    return _pool
@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Union
+from otlet.packaging.version import parse, Version, LegacyVersion
+from . import trace
+
+
+class Release(NamedTuple):
+    name: str
+    version: Union[Version, LegacyVersion]
+    upload_time: Optional[datetime]
+    yanked: bool
+
+
+class ReleaseIndex:
+    """
+    All releases of a package, with versions parsed and upload times computed
+    once, and kept in two sorted arrays, so version and date ranges can be
+    answered with binary searches instead of comparing every release.
+    """
+
+    def __init__(self, releases: dict) -> None:
+        entries = []
+        for name, files in releases.items():
+            entries.append(
+                Release(
+                    name,
+                    parse(name),
+                    # a release's upload time is that of its first uploaded file
+                    min((f.upload_time for f in files), default=None) if files else None,
+                    bool(files) and all(f.yanked for f in files),
+                )
+            )
+        self.by_version = sorted(entries, key=lambda r: r.version)
+        self.versions = [r.version for r in self.by_version]
+        self.by_date = sorted(
+            (r for r in entries if r.upload_time), key=lambda r: r.upload_time
+        )
+        self.dates = [r.upload_time for r in self.by_date]
+
+    def __len__(self) -> int:
+        return len(self.by_version)
+
+    @trace.traced("filter")
+    def query(
+        self,
+        after_version: Optional[str] = None,
+        before_version: Optional[str] = None,
+        after_date: Optional[datetime] = None,
+        before_date: Optional[datetime] = None,
+        sort: str = "version",
+    ) -> List[Release]:
+        """
+        Return releases strictly between after_version and before_version, and
+        uploaded between after_date and before_date (inclusive), sorted by
+        'version' or 'date'. Releases without an upload time are left out as
+        soon as a date bound is given.
+        """
+        low_version = parse(after_version) if after_version else None
+        high_version = parse(before_version) if before_version else None
+        lo = bisect_right(self.versions, low_version) if low_version is not None else 0
+        hi = bisect_left(self.versions, high_version) if high_version is not None else len(self.versions)
+        by_version = self.by_version[lo:hi]
+        if after_date is None and before_date is None:
+            return by_version if sort == "version" else self._date_sorted(by_version)
+
+        lo = bisect_left(self.dates, after_date) if after_date else 0
+        hi = bisect_right(self.dates, before_date) if before_date else len(self.dates)
+        by_date = self.by_date[lo:hi]
+
+        # walk the smaller of both ranges, and check the other range's bounds on each release
+        if len(by_date) <= len(by_version):
+            matches = [
+                r
+                for r in by_date
+                if (low_version is None or r.version > low_version)
+                and (high_version is None or r.version < high_version)
+            ]
+            return matches if sort == "date" else sorted(matches, key=lambda r: r.version)
+        matches = [
+            r
+            for r in by_version
+            if r.upload_time
+            and (not after_date or r.upload_time >= after_date)
+            and (not before_date or r.upload_time <= before_date)
+        ]
+        return matches if sort == "version" else self._date_sorted(matches)
+
+    @staticmethod
+    def _date_sorted(releases: List[Release]) -> List[Release]:
+        # releases without any files have no upload time, list them first as the oldest
+        return sorted(releases, key=lambda r: r.upload_time or datetime.min)
@@ -0,0 +1,240 @@
+import os
+import re
+import sys
+import time
+import signal
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.error import URLError
+from urllib.parse import unquote, urlsplit
+from otlet.api import PackageObject
+from otlet.exceptions import PyPIAPIError, PyPIPackageNotFound, PyPIPackageVersionNotFound, PyPIServiceDown
+from . import util, api, cache, daemon, index, output, pool, releases, __version__, config
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = cache.DEFAULT_TTL
+
+
+class PackageCache:
+    """
+    Thread-safe LRU cache of parsed :class:`api.OtletPackageObject`s, keyed by
+    (name, version) and kept for ttl seconds. 'Not found' errors are cached
+    as well, and concurrent lookups of the same package share a single fetch.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: int = DEFAULT_TTL) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, Any]]" = OrderedDict()
+        # for packages being fetched: the lock serializing their fetches, and how many requests wait on it
+        self._fetching: Dict[Tuple[str, Optional[str]], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Tuple[str, Optional[str]]) -> Optional[Any]:
+        # must be called with self._lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() > entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, name: str, version: Optional[str] = None, refresh: bool = False) -> PackageObject:
+        key = (re.sub(r"[-_.]+", "-", name).lower(), version)
+        with self._lock:
+            value = None if refresh else self._lookup(key)
+            if value is not None:
+                self.hits += 1
+            else:
+                fetching = self._fetching.get(key)
+                if fetching is None:
+                    fetching = self._fetching[key] = [threading.Lock(), 0]
+                fetching[1] += 1
+        if value is None:
+            try:
+                with fetching[0]:
+                    with self._lock:
+                        # another request may have fetched it while this one waited
+                        value = None if refresh else self._lookup(key)
+                    if value is None:
+                        value = self._fetch(name, version, refresh)
+            finally:
+                with self._lock:
+                    # the lock goes once no request waits on it anymore, so later ones can't fetch alongside them
+                    fetching[1] -= 1
+                    if not fetching[1]:
+                        del self._fetching[key]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _fetch(self, name: str, version: Optional[str], refresh: bool) -> Any:
+        key = (re.sub(r"[-_.]+", "-", name).lower(), version)
+        util.verbose_print(self._fetch, f"Fetching {name} {version or ''}")
+        try:
+            value: Any = api.OtletPackageObject(name, version, refresh=refresh)
+        except (PyPIPackageNotFound, PyPIPackageVersionNotFound) as err:
+            value = err
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "index_url": index.index_url(),
+            }
+
+
+def _distributions(pkg: PackageObject) -> list:
+    from . import download
+
+    return [output.distribution_record(pkg, num, dist) for num, dist in download.get_dists(pkg).items()]
+
+
+# the queries the daemon answers besides raw JSON API responses, by endpoint name
+QUERIES: Dict[str, Callable[[PackageObject], Any]] = {
+    "info": output.package_record,
+    "releases": lambda pkg: [
+        output.release_record(pkg, rel) for rel in releases.ReleaseIndex(pkg.releases).query()
+    ],
+    "distributions": _distributions,
+    "notices": lambda pkg: {"name": pkg.name, "version": pkg.version, "notices": output.notices(pkg)},
+}
+
+
+class OtletRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers 'GET /pypi/<name>[/<version>]/json' with the raw PyPI JSON API
+    response, as used by the otlet command, and 'GET /<query>/<name>[/<version>]'
+    for every query in :data:`QUERIES` with the records '--format json' prints.
+    'GET /stats' reports the state of the in-memory cache. Clients send the
+    index they query in 'X-Otlet-Index', and are turned away with a 409 if
+    it is not the one the daemon queries.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep connections alive between requests
+    server_version = f"otlet/{__version__}"
+
+    def do_GET(self) -> None:
+        segments = [unquote(_) for _ in urlsplit(self.path).path.strip("/").split("/")]
+        refresh = "no-cache" in self.headers.get("Cache-Control", "")
+        packages: PackageCache = self.server.packages  # type: ignore
+        client_index = self.headers.get("X-Otlet-Index")
+        if client_index and client_index.rstrip("/") != index.index_url():
+            self.send_body(409, index.index_url().encode())
+            return
+        try:
+            if segments[0] == "pypi" and segments[-1] == "json" and len(segments) in (3, 4):
+                pkg = packages.get(segments[1], segments[2] if len(segments) == 4 else None, refresh)
+                self.send_body(200, pkg.body)
+            elif segments[0] in QUERIES and len(segments) in (2, 3):
+                if segments[0] == "releases" and len(segments) == 3:
+                    raise PyPIPackageVersionNotFound(segments[1], segments[2])
+                pkg = packages.get(segments[1], segments[2] if len(segments) == 3 else None, refresh)
+                self.send_body(200, output.encode(QUERIES[segments[0]](pkg)).encode())
+            elif segments == ["stats"]:
+                self.send_body(200, output.encode(packages.stats()).encode())
+            else:
+                self.send_body(404, output.encode({"error": f"unknown endpoint '{self.path}'"}).encode())
+        except (PyPIPackageNotFound, PyPIPackageVersionNotFound) as err:
+            self.send_body(404, output.encode({"error": str(err)}).encode())
+        except PyPIServiceDown as err:
+            self.send_body(503, output.encode({"error": str(err)}).encode())
+        except (PyPIAPIError, URLError) as err:
+            self.send_body(502, f"Unable to reach PyPI: {err}".encode())
+
+    def send_body(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if status not in (409, 502) else "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        util.verbose_print(self.log_message, format % args)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # unix socket peers have no address, but the request handler expects one
+        return request, ("local", 0)
+
+
+def _already_running(path: str) -> bool:
+    conn = daemon.connect(path)
+    if conn is None:
+        return False
+    try:
+        conn.request("GET", "/stats")
+        conn.getresponse().read()
+        return True
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def serve(
+    path: Optional[str] = None,
+    port: Optional[int] = None,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    ttl: int = DEFAULT_TTL,
+) -> int:
+    """
+    Run the otlet daemon until interrupted, listening on the Unix socket at path
+    (see :func:`daemon.daemon_address`), or on 127.0.0.1:port if a port is given.
+    """
+    # the daemon itself must never try to query a daemon
+    config["no_daemon"] = True
+    address = path or daemon.daemon_address()
+    if port is None and address.startswith("http://"):
+        port = urlsplit(address).port
+    if port is not None:
+        server: Any = ThreadingHTTPServer(("127.0.0.1", port), OtletRequestHandler)
+        address = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        if _already_running(address):
+            print(f"otlet: a daemon is already listening on {address}", file=sys.stderr)
+            return 1
+        if os.path.lexists(address):
+            os.remove(address)  # left behind by a daemon that didn't shut down cleanly
+        os.makedirs(os.path.dirname(os.path.abspath(address)), exist_ok=True)
+        umask = os.umask(0o177)  # only the current user may connect to the socket
+        try:
+            server = ThreadingUnixHTTPServer(address, OtletRequestHandler)
+        finally:
+            os.umask(umask)
+    server.packages = PackageCache(max_entries, ttl)
+
+    signal.signal(signal.SIGTERM, lambda *_: (_ for _ in ()).throw(SystemExit(0)))
+    print(f"otlet daemon listening on {address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        pool.get_pool().close()
+        if port is None and os.path.exists(address):
+            os.remove(address)
+    print("otlet daemon stopped.", file=sys.stderr)
+    return 0
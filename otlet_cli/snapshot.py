@@ -0,0 +1,160 @@
+import io
+import os
+import re
+import json
+import time
+import zlib
+import tempfile
+import threading
+from email.message import Message
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.error import HTTPError
+from . import util, cache, config
+
+INDEX_FILE = "index.json"
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_dir() -> str:
+    """Return the snapshot directory, honoring $OTLET_SNAPSHOT."""
+    return os.environ.get("OTLET_SNAPSHOT") or os.path.join(cache.cache_dir(), "snapshot")
+
+
+def snapshot_key(name: str, version: Optional[str] = None) -> str:
+    """Return the index key of a project (or one of its releases) by canonical name, i.e. 'zope-interface/5.4.0'."""
+    key = re.sub(r"[-_.]+", "-", name).lower()
+    return f"{key}/{version}" if version else key
+
+
+class Snapshot:
+    """
+    Read-only snapshot of PyPI JSON API responses for a set of projects.
+
+    A snapshot directory holds a single data file with every response body
+    zlib-compressed back to back, and an index mapping each project (and
+    pinned release) by canonical name to the offset and length of its body,
+    so any lookup costs a dictionary access and a single read.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or snapshot_dir()
+        with open(os.path.join(self.path, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get("format") != SNAPSHOT_FORMAT:
+            raise OSError(f"unsupported snapshot format in {self.path}")
+        self.created: float = index["created"]
+        self.entries: Dict[str, List[int]] = index["entries"]
+        self._data = open(os.path.join(self.path, index["data"]), "rb")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._data.seek(entry[0])
+            data = self._data.read(entry[1])
+        return zlib.decompress(data)
+
+    def lookup(self, path: str) -> bytes:
+        """
+        Return the body stored for a PyPI JSON API path, i.e. '/six/json' or
+        '/six/1.16.0/json'. Raises a 404 :class:`HTTPError` like PyPI would if
+        the snapshot doesn't contain it.
+        """
+        segments = path.strip("/").split("/")
+        key = snapshot_key(segments[0], segments[1] if len(segments) == 3 else None)
+        body = self.get(key)
+        if body is None:
+            util.verbose_print(self.lookup, f"'{key}' is not in the snapshot at {self.path}")
+            raise HTTPError(path, 404, "Not in snapshot", Message(), io.BytesIO())
+        return body
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "created": self.created,
+            "projects": sum(1 for key in self.entries if "/" not in key),
+            "entries": len(self.entries),
+            "size": sum(length for _, length in self.entries.values()),
+        }
+
+
+def create_snapshot(
+    path: Optional[str], targets: Iterable[Tuple[str, Optional[str]]], jobs: int = 8
+) -> Tuple[dict, List[Tuple[str, Exception]]]:
+    """
+    Fetch the JSON metadata of every (name, version) in targets and write it to
+    a new snapshot at path, replacing any snapshot there. A project is always
+    stored as a whole; pinned versions are stored in addition to it.
+    Returns the stats of the new snapshot, and the keys that could not be fetched.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import api, index
+
+    path = path or snapshot_dir()
+    index_url = index.index_url()
+    urls: Dict[str, str] = {}
+    for name, version in targets:
+        urls[snapshot_key(name)] = f"{index_url}/{name}/json"
+        if version:
+            urls[snapshot_key(name, version)] = f"{index_url}/{name}/{version}/json"
+
+    def fetch(url: str):
+        try:
+            return api.fetch_json(url)
+        except Exception as err:
+            return err
+
+    os.makedirs(path, exist_ok=True)
+    # every snapshot gets a data file of its own, so replacing the index swaps both at once
+    data_name = f"packages-{int(time.time() * 1000)}.dat"
+    entries: Dict[str, List[int]] = {}
+    errors: List[Tuple[str, Exception]] = []
+    util.verbose_print(create_snapshot, f"Fetching {len(urls)} responses with {jobs} workers")
+    with open(os.path.join(path, data_name), "wb") as data, ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for key, body in zip(urls, executor.map(fetch, urls.values())):
+            if isinstance(body, Exception):
+                errors.append((key, body))
+                continue
+            compressed = zlib.compress(body, 6)
+            entries[key] = [data.tell(), len(compressed)]
+            data.write(compressed)
+
+    old = None
+    index_path = os.path.join(path, INDEX_FILE)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path) as f:
+                old = json.load(f).get("data")
+        except (OSError, ValueError):
+            pass
+    fd, tmp = tempfile.mkstemp(dir=path, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"format": SNAPSHOT_FORMAT, "created": time.time(), "data": data_name, "entries": entries}, f)
+    os.chmod(tmp, 0o644)  # mkstemp creates files only readable by the owner
+    os.replace(tmp, index_path)
+    if old and old != data_name:
+        try:
+            os.remove(os.path.join(path, old))
+        except OSError:
+            pass
+    return Snapshot(path).stats(), errors
+
+
+_snapshot: Optional[Snapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> Optional[Snapshot]:
+    """
+    Return the snapshot to read from if running offline, otherwise None.
+    Raises :class:`OSError` if there is no usable snapshot.
+    """
+    global _snapshot
+    if not config.get("offline"):
+        return None
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = Snapshot()
+    return _snapshot
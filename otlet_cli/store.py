@@ -0,0 +1,204 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+from typing import Iterator, Optional, Tuple
+from . import util, cache, config
+
+FICLONE = 0x40049409  # linux ioctl for creating a copy-on-write clone (reflink) of a file
+# name of the file in each entry recording the size and mtime its stored file was last verified at
+VERIFIED = ".verified"
+
+
+def store_dir() -> str:
+    return os.environ.get("OTLET_STORE_DIR") or os.path.join(cache.cache_dir(), "store")
+
+
+def link_file(src: str, dest: str, hardlink: bool = False) -> str:
+    """
+    Materialize src at dest without duplicating its data where possible.
+    Tries a hardlink (only if hardlink is True, since both names then share
+    one file), then a reflink, then falls back to a plain copy. Returns the
+    method that was used.
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    if hardlink:
+        try:
+            os.link(src, dest)
+            return "hardlink"
+        except OSError:
+            pass
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dest)
+    return "copy"
+
+
+def file_sha256(path: str, buffer_size: int = 1024 * 1024) -> str:
+    _hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            _hash.update(block)
+    return _hash.hexdigest()
+
+
+class WheelStore:
+    """
+    Content-addressed store of downloaded distribution files, keyed by sha256.
+
+    Each file lives at '<path>/<sha256[:2]>/<sha256>/<filename>'. The mtime of
+    the entry directory records when the entry was last used.
+
+    Files are copied (or reflinked) into and out of the store, never hardlinked,
+    so editing a downloaded file never changes its stored copy, which is made
+    read-only. A stored file is still checked before each use, and evicted
+    instead of served if it was modified anyway. It is only hashed again if its
+    size or mtime changed since it was last verified.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or store_dir()
+
+    def _entry_dir(self, sha256: str) -> str:
+        return os.path.join(self.path, sha256[:2], sha256)
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Return the path of the stored file with the given digest, if present."""
+        entry = self._entry_dir(sha256.lower())
+        try:
+            # skip copies still being added, and the verification record
+            files = [name for name in os.listdir(entry) if not name.endswith(".tmp") and name != VERIFIED]
+        except OSError:
+            return None
+        if not files:
+            return None
+        os.utime(entry)  # mark as recently used
+        return os.path.join(entry, files[0])
+
+    def add(self, path: str, sha256: str) -> None:
+        """Add a copy of an already verified file to the store."""
+        entry = self._entry_dir(sha256.lower())
+        if self.get(sha256):
+            return
+        os.makedirs(entry, exist_ok=True)
+        # copy under a temporary name first, so the entry never holds a partial file
+        fd, tmp = tempfile.mkstemp(dir=entry, suffix=".tmp")
+        os.close(fd)
+        try:
+            method = link_file(path, tmp)
+            os.chmod(tmp, 0o444)
+            stored = os.path.join(entry, os.path.basename(path))
+            os.replace(tmp, stored)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._mark_verified(stored)
+        util.verbose_print(self.add, f"Added {os.path.basename(path)} to store ({method})")
+
+    def link(self, sha256: str, dest: str, size: Optional[int] = None) -> Optional[str]:
+        """
+        Materialize the stored file with the given digest at dest, after checking
+        it still has that digest (and size, if given). Returns the method used,
+        or None on a miss.
+        """
+        stored = self.get(sha256)
+        if not stored:
+            return None
+        if (size is not None and os.path.getsize(stored) != size) or not self._verify(stored, sha256):
+            util.verbose_print(self.link, f"Stored {os.path.basename(stored)} was modified, evicting it")
+            shutil.rmtree(os.path.dirname(stored), ignore_errors=True)
+            return None
+        method = link_file(stored, dest)
+        util.verbose_print(self.link, f"Linked {dest} from store ({method})")
+        return method
+
+    @staticmethod
+    def _stamp(stored: str) -> str:
+        st = os.stat(stored)
+        return f"{st.st_size} {st.st_mtime_ns}"
+
+    def _mark_verified(self, stored: str) -> None:
+        try:
+            with open(os.path.join(os.path.dirname(stored), VERIFIED), "w") as f:
+                f.write(self._stamp(stored))
+        except OSError:
+            pass  # the file is just hashed again on its next use
+
+    def _verify(self, stored: str, sha256: str) -> bool:
+        """Return whether stored still has the given digest, hashing it only if it changed since last verified."""
+        try:
+            with open(os.path.join(os.path.dirname(stored), VERIFIED)) as f:
+                if f.read() == self._stamp(stored):
+                    return True
+        except OSError:
+            pass
+        if file_sha256(stored) != sha256.lower():
+            return False
+        self._mark_verified(stored)
+        return True
+
+    def entries(self) -> Iterator[Tuple[str, float, int]]:
+        """Yield (entry directory, last use time, size) for every stored file."""
+        if not os.path.isdir(self.path):
+            return
+        for prefix in os.listdir(self.path):
+            prefix_dir = os.path.join(self.path, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for sha256 in os.listdir(prefix_dir):
+                entry = os.path.join(prefix_dir, sha256)
+                try:
+                    size = sum(
+                        os.stat(os.path.join(entry, name)).st_size
+                        for name in os.listdir(entry)
+                    )
+                    yield entry, os.stat(entry).st_mtime, size
+                except OSError:
+                    continue
+
+    def stats(self) -> dict:
+        entries = list(self.entries())
+        return {
+            "path": self.path,
+            "entries": len(entries),
+            "size": sum(size for _, _, size in entries),
+        }
+
+    def gc(
+        self, max_size: Optional[int] = None, max_age: Optional[float] = None
+    ) -> Tuple[int, int]:
+        """
+        Evict entries not used within max_age seconds, then evict least recently
+        used entries until the store is no larger than max_size bytes.
+        Returns the number of removed entries and bytes freed.
+        """
+        entries = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        now = time.time()
+        removed = freed = 0
+        for entry, last_used, size in entries:
+            expired = max_age is not None and now - last_used > max_age
+            oversized = max_size is not None and total > max_size
+            if not (expired or oversized):
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+
+def get_store() -> Optional[WheelStore]:
+    """Return the wheel store if it is enabled (with '--store' or $OTLET_STORE), otherwise None."""
+    if config.get("store") or os.environ.get("OTLET_STORE"):
+        return WheelStore()
+    return None
@@ -0,0 +1,163 @@
+import os
+import re
+import sys
+import platform
+import sysconfig
+from typing import Dict, Iterator, List, Optional, Tuple
+from . import util, trace
+
+Tag = Tuple[str, str, str]  # (interpreter, abi, platform)
+
+# legacy manylinux names, and the glibc version each of them is equivalent to (PEP 600)
+LEGACY_MANYLINUX = {(2, 17): "manylinux2014", (2, 12): "manylinux2010", (2, 5): "manylinux1"}
+MACOS_ARCHES = {
+    "x86_64": ["x86_64", "intel", "fat64", "fat32", "universal2", "universal"],
+    "arm64": ["arm64", "universal2"],
+}
+
+
+def _linux_platforms(plat: str) -> List[str]:
+    _match = re.fullmatch(r"(manylinux|musllinux)_(\d+)_(\d+)_(\w+)", plat)
+    if not _match:
+        _legacy = {v: k for k, v in LEGACY_MANYLINUX.items()}
+        name, _, arch = plat.partition("_")
+        if name not in _legacy:
+            return [plat]
+        major, minor = _legacy[name]
+        return _linux_platforms(f"manylinux_{major}_{minor}_{arch}")
+    kind, major, minor, arch = _match.group(1), int(_match.group(2)), int(_match.group(3)), _match.group(4)
+    platforms = []
+    lowest = 5 if kind == "manylinux" else 0
+    for _minor in range(minor, lowest - 1, -1):
+        platforms.append(f"{kind}_{major}_{_minor}_{arch}")
+        if kind == "manylinux" and (major, _minor) in LEGACY_MANYLINUX:
+            platforms.append(f"{LEGACY_MANYLINUX[(major, _minor)]}_{arch}")
+    return platforms + [f"linux_{arch}"]
+
+
+def _macos_platforms(plat: str) -> List[str]:
+    _match = re.fullmatch(r"macosx_(\d+)_(\d+)_(\w+)", plat)
+    if not _match:
+        return [plat]
+    major, minor, arch = int(_match.group(1)), int(_match.group(2)), _match.group(3)
+    arches = MACOS_ARCHES.get(arch, [arch])
+    versions = []
+    if major >= 11:
+        # from macOS 11 on, only the major version is relevant for compatibility
+        versions += [(_major, 0) for _major in range(major, 10, -1)]
+        major, minor = 10, 16
+    versions += [(10, _minor) for _minor in range(minor, 3, -1)]
+    return [
+        f"macosx_{_major}_{_minor}_{_arch}"
+        for _major, _minor in versions
+        for _arch in arches
+        # arm64 only exists from macOS 11 on, older releases can only run universal2 wheels there
+        if _major >= 11 or arch != "arm64" or _arch == "universal2"
+    ]
+
+
+def compatible_platforms(plat: str) -> List[str]:
+    """Expand a platform tag into every platform tag a wheel could have to run there, best first."""
+    if plat.startswith(("manylinux", "musllinux")):
+        return _linux_platforms(plat)
+    if plat.startswith("macosx"):
+        return _macos_platforms(plat)
+    return [plat]
+
+
+def native_target() -> Tuple[str, str, str]:
+    """Return (interpreter, abi, platform) of the running interpreter."""
+    impl = {"cpython": "cp", "pypy": "pp"}.get(sys.implementation.name, "py")
+    interpreter = f"{impl}{sys.version_info[0]}{sys.version_info[1]}"
+    abi = interpreter
+    soabi = sysconfig.get_config_var("SOABI") or ""
+    _match = re.match(r"cpython-(\d+)(\w*)", soabi)
+    if _match:
+        abi = f"cp{_match.group(1)}{_match.group(2)}"
+    plat = sysconfig.get_platform().replace("-", "_").replace(".", "_")
+    if plat.startswith("linux"):
+        try:
+            glibc = re.match(r"glibc (\d+)\.(\d+)", os.confstr("CS_GNU_LIBC_VERSION") or "")
+        except (AttributeError, ValueError, OSError):
+            glibc = None
+        if glibc:
+            plat = f"manylinux_{glibc.group(1)}_{glibc.group(2)}_{platform.machine()}"
+    elif plat.startswith("macosx"):
+        release = platform.mac_ver()[0].split(".")
+        plat = f"macosx_{release[0]}_{release[1] if len(release) > 1 and int(release[0]) < 11 else 0}_{platform.machine()}"
+    return interpreter, abi, plat
+
+
+def parse_target(target: str) -> Tuple[str, str, str]:
+    """
+    Parse a target like 'cp311-manylinux_2_28_x86_64' or 'cp311-cp311t-win_amd64'
+    into (interpreter, abi, platform). 'native' describes the running interpreter.
+    """
+    if target == "native":
+        return native_target()
+    parts = target.split("-")
+    if len(parts) == 2:
+        parts.insert(1, parts[0])
+    if len(parts) != 3 or not re.fullmatch(r"[a-z]+\d+", parts[0]):
+        raise ValueError(f"invalid target '{target}', expected i.e. 'cp311-manylinux_2_28_x86_64' or 'native'")
+    return parts[0], parts[1], parts[2]
+
+
+def supported_tags(interpreter: str, abi: str, plat: str) -> Iterator[Tag]:
+    """Yield every tag a wheel for the given target may carry, in order of preference (as in PEP 425)."""
+    _match = re.fullmatch(r"([a-z]+)(\d)(\d*)", interpreter)
+    if not _match:
+        raise ValueError(f"invalid interpreter tag '{interpreter}'")
+    impl, major, minor = _match.group(1), _match.group(2), int(_match.group(3) or 0)
+    platforms = compatible_platforms(plat)
+
+    for _abi in [abi, "abi3", "none"] if impl == "cp" else [abi, "none"]:
+        for _plat in platforms:
+            yield interpreter, _abi, _plat
+    if impl == "cp":
+        # the stable ABI of older versions is forward compatible
+        for _minor in range(minor - 1, 1, -1):
+            for _plat in platforms:
+                yield f"cp{major}{_minor}", "abi3", _plat
+    for _interp in [f"py{major}{minor}", f"py{major}"] + [f"py{major}{m}" for m in range(minor - 1, -1, -1)]:
+        for _plat in platforms:
+            yield _interp, "none", _plat
+    yield interpreter, "none", "any"
+    yield f"py{major}{minor}", "none", "any"
+    yield f"py{major}", "none", "any"
+    for _minor in range(minor - 1, -1, -1):
+        yield f"py{major}{_minor}", "none", "any"
+
+
+@trace.traced("filter")
+def rank_dists(dists: dict, target: str) -> list:
+    """
+    Return the wheels of dists (as returned by download.get_dists()) that are
+    installable on target as (num, dist) pairs, best match first. Ties are
+    broken in favor of the highest build number.
+    """
+    priorities: Dict[Tag, int] = {}
+    for tag in supported_tags(*parse_target(target)):
+        priorities.setdefault(tag, len(priorities))
+    util.verbose_print(rank_dists, f"{len(priorities)} tags are supported by target '{target}'")
+
+    ranked = []
+    for num, dist in dists.items():
+        if dist.dist_type != "bdist_wheel":
+            continue
+        priority: Optional[int] = min(
+            (
+                priorities[(py, abi, plat)]
+                for py in dist.python_tag.split(".")
+                for abi in dist.abi_tag.split(".")
+                for plat in dist.platform_tag.split(".")
+                if (py, abi, plat) in priorities
+            ),
+            default=None,
+        )
+        if priority is None:
+            continue
+        build = re.match(r"\d*", dist.build_tag or "").group()
+        ranked.append((priority, -int(build or 0), num, dist))
+    ranked.sort(key=lambda r: r[:3])
+    return [(num, dist) for _, _, num, dist in ranked]
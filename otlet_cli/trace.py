@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import functools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# the phases spans are grouped by in the '--timings' summary
+CATEGORIES = ["network", "fetch", "cache", "parse", "resolve", "filter", "render", "download", "hash"]
+
+_START = time.perf_counter_ns()
+
+
+class Tracer:
+    """
+    Collects timed spans (and instant events, i.e. verbose messages) from every
+    thread. Appending to a list is atomic, so recording an event takes no lock.
+    """
+
+    def __init__(self, summary: bool = False, path: Optional[str] = None) -> None:
+        self.summary = summary
+        self.path = path
+        # (name, category, start, end, thread id, args), with times in ns since startup
+        self.events: List[Tuple[str, str, int, Optional[int], int, Optional[Dict[str, Any]]]] = []
+
+    def add(
+        self, name: str, category: str, start: int, end: Optional[int], args: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.events.append((name, category, start - _START, end - _START if end else None, threading.get_ident(), args))
+
+    def self_times(self) -> Dict[str, List[int]]:
+        """
+        Return the [count, total, self] time of every category. The self time of
+        a span leaves out time spent in spans nested in it on the same thread, so
+        the self times of all categories add up to the time spent in any span.
+        """
+        times: Dict[str, List[int]] = {}
+        by_thread: Dict[int, list] = {}
+        for event in self.events:
+            if event[3] is not None:
+                by_thread.setdefault(event[4], []).append(event)
+        for events in by_thread.values():
+            # parents start first, and enclose their children
+            events.sort(key=lambda e: (e[2], -e[3]))
+            stack: List[list] = []
+            for name, category, start, end, _, _ in events:
+                while stack and stack[-1][1] <= start:
+                    stack.pop()
+                if stack:
+                    times[stack[-1][0]][2] -= end - start
+                entry = times.setdefault(category, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += end - start
+                entry[2] += end - start
+                stack.append([category, end])
+        return times
+
+    def print_summary(self) -> None:
+        wall = time.perf_counter_ns() - _START
+        times = self.self_times()
+        print("\n[phase]\t\t[spans]\t[total]\t\t[self]", file=sys.stderr)
+        for category in CATEGORIES + sorted(set(times) - set(CATEGORIES)):
+            if category not in times:
+                continue
+            count, total, own = times[category]
+            print(
+                f"{category:<16}{count}\t{total / 1e6:>8.1f} ms\t{own / 1e6:>8.1f} ms",
+                file=sys.stderr,
+            )
+        print(
+            f"\nTotal: {wall / 1e6:.1f} ms since startup; spans on worker threads overlap",
+            file=sys.stderr,
+        )
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Write every event in the Chrome trace event format, as read by chrome://tracing and Perfetto."""
+        import json
+
+        pid = os.getpid()
+        events = []
+        for name, category, start, end, tid, args in self.events:
+            event: Dict[str, Any] = {"name": name, "cat": category, "ts": start / 1000, "pid": pid, "tid": tid}
+            if end is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=(end - start) / 1000)
+            if args:
+                event["args"] = args
+            events.append(event)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+_tracer: Optional[Tracer] = None
+
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: Optional[Dict[str, Any]]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.tracer.add(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, category: str, **args: Any):
+    """
+    Time the enclosed block as a span named name, in one of :data:`CATEGORIES`.
+    When tracing is disabled this returns a shared no-op context manager.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(_tracer, name, category, args or None)
+
+
+def traced(category: str, name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorate a function to record every call of it as a span."""
+
+    def decorator(func: F) -> F:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, label, category, None):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def instant(name: str, category: str = "log", **args: Any) -> None:
+    """Record a point in time, i.e. a verbose message, if tracing is enabled."""
+    if _tracer is not None:
+        _tracer.add(name, category, time.perf_counter_ns(), None, args or None)
+
+
+def elapsed() -> float:
+    """Return the milliseconds since otlet started."""
+    return (time.perf_counter_ns() - _START) / 1e6
+
+
+def enable(summary: bool = False, path: Optional[str] = None) -> Tracer:
+    """Start recording spans, to be summarized and/or written to path by :func:`report`."""
+    global _tracer
+    _tracer = Tracer(summary, path)
+    return _tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def report() -> None:
+    """Print the '--timings' summary and write the '--trace' file, as requested when tracing was enabled."""
+    if _tracer is None:
+        return
+    if _tracer.path:
+        _tracer.write_chrome_trace(_tracer.path)
+        print(f"Trace written to {_tracer.path}", file=sys.stderr)
+    if _tracer.summary:
+        _tracer.print_summary()
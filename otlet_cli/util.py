@@ -1,45 +1,55 @@
 import os
+import re
 import sys
 import textwrap
 import argparse
 from datetime import datetime
-from typing import Optional, Tuple
-from otlet.api import PackageObject
-from otlet.packaging.version import parse, Version
-from otlet.markers import DEPENDENCY_ENVIRONMENT_MARKERS
-from . import download, config
+from typing import Optional, Tuple, TYPE_CHECKING
+from . import cache, output, trace, config
 
+if TYPE_CHECKING:
+    from otlet.api import PackageObject
+
+# Modules that pull in otlet (and with it http.client, email, etc.) are imported
+# inside the functions that need them, so light commands like 'otlet cache',
+# '--help' or '--version' start without paying for them.
+
+
+@trace.traced("render")
+def print_releases(pkg: "PackageObject", args: argparse.Namespace):
+    from . import releases
 
-def print_releases(pkg: PackageObject, args: argparse.Namespace):
     verbose_print(print_releases, "Printing all available releases matching the following criteria:")
-    class BottomVersion(Version):
-        def __init__(self) -> None:
-            super().__init__("0")
-        @property
-        def epoch(self) -> int:
-            return -2
-
-    if args.after_version:
-        bottom_version = Version(args.after_version[0])
-    else:
-        bottom_version = BottomVersion()
-    verbose_print(print_releases, f"after version: {bottom_version}")
-    top_version = Version(args.before_version[0])
-    verbose_print(print_releases, f"before version: {top_version}")
-    bottom_date = datetime.fromisoformat(args.after_date[0] + "T23:59:59")
+    verbose_print(print_releases, f"after version: {args.after_version}, before version: {args.before_version}")
+    bottom_date = (
+        datetime.fromisoformat(args.after_date[0] + "T23:59:59") if args.after_date else None
+    )
     verbose_print(print_releases, f"after date: {bottom_date}")
-    top_date = datetime.fromisoformat(args.before_date[0] + "T00:00:00")
+    top_date = (
+        datetime.fromisoformat(args.before_date[0] + "T00:00:00") if args.before_date else None
+    )
     verbose_print(print_releases, f"before date: {top_date}")
 
-    for rel, obj in pkg.releases.items():
-        _rel = parse(rel)
-        if top_version <= _rel or bottom_version >= _rel:
-            continue
-        if top_date < obj.upload_time or bottom_date > obj.upload_time:
-            continue
+    index = releases.ReleaseIndex(pkg.releases)
+    matches = index.query(
+        args.after_version[0] if args.after_version else None,
+        args.before_version[0] if args.before_version else None,
+        bottom_date,
+        top_date,
+        args.sort,
+    )
+    verbose_print(print_releases, f"{len(matches)} of {len(index)} releases match")
+    if args.latest:
+        matches = matches[-args.latest[0]:] if args.latest[0] > 0 else []
+    if args.limit:
+        matches = matches[: args.limit[0]]
 
-        text = f"({obj.upload_time.date()}) {rel}"
-        if obj.yanked:
+    if output.is_structured():
+        output.emit_all(output.release_record(pkg, rel) for rel in matches)
+        return 0
+    for rel in matches:
+        text = f"({rel.upload_time.date() if rel.upload_time else 'unknown'}) {rel.name}"
+        if rel.yanked:
             text = "\u001b[9m\u001b[1m" + text + "\u001b[0m"
             text += "\u001b[1m\u001b[33m (yanked)\u001b[0m"
         print(text)
@@ -47,18 +57,33 @@ def print_releases(pkg: PackageObject, args: argparse.Namespace):
     return 0
 
 
+@trace.traced("render")
 def print_distributions(
-    pkg: PackageObject,
+    pkg: "PackageObject",
     distributions: Optional[dict] = None,
     dist_type: Optional[str] = None,
     opt_dict: Optional[dict] = None,
+    target: Optional[str] = None,
 ):
+    from . import download, tags
+
     if distributions is None:
         verbose_print(print_distributions, "No distribution list supplied. Running download.get_dists()")
         distributions = download.get_dists(pkg, opt_dict)
+    if target:
+        # only list wheels compatible with target, most compatible first
+        distributions = dict(tags.rank_dists(distributions, target))
+        dist_type = "bdist_wheel"
     if not distributions:
         print(f"No distributions found for {pkg.release_name}", file=sys.stderr)
         return 1
+    if output.is_structured():
+        output.emit_all(
+            output.distribution_record(pkg, num, dist)
+            for num, dist in distributions.items()
+            if not dist_type or dist.dist_type == dist_type
+        )
+        return 0
 
     last_num = 0
     if (distributions) and not dist_type or dist_type == "bdist_wheel":
@@ -67,12 +92,12 @@ def print_distributions(
             "\n[num] [size]\t[build] | [python_tag] | [abi_tag] | [platform_tag]"
         )
         for num, whl in distributions.items():
-            if whl["dist_type"] != "bdist_wheel":
+            if whl.dist_type != "bdist_wheel":
                 continue
             print(
                 f"\u2500\u2500\u2500\u2500\u2500\n{num} "
-                f"({whl['converted_size']} {whl['size_measurement']})"
-                f"\t{whl['build_tag']} | {whl['python_tag']} | {whl['abi_tag']} | {whl['platform_tag']}"
+                f"({whl.converted_size} {whl.size_measurement})"
+                f"\t{whl.build_tag} | {whl.python_tag} | {whl.abi_tag} | {whl.platform_tag}"
             )
             last_num += 1
         print()
@@ -85,27 +110,34 @@ def print_distributions(
             "\n[num] [size]\t[distribution_type] | [filename]"
         )
         for num, dist in distributions.items():
-            if dist["dist_type"] == "bdist_wheel" or (
-                dist_type and dist["dist_type"] != dist_type
+            if dist.dist_type == "bdist_wheel" or (
+                dist_type and dist.dist_type != dist_type
             ):
                 continue
             print(
                 f"\u2500\u2500\u2500\u2500\u2500\n{num} "
-                f"({dist['converted_size']} {dist['size_measurement']})"
-                f"\t{dist['dist_type']} | {dist['filename']}"
+                f"({dist.converted_size} {dist.size_measurement})"
+                f"\t{dist.dist_type} | {dist.filename}"
             )
 
     print()
     return 0
 
 
-def print_vulns(pkg: PackageObject):
+@trace.traced("render")
+def print_vulns(pkg: "PackageObject"):
+    if output.is_structured():
+        output.emit_all(output.vulnerability_record(pkg, vuln) for vuln in pkg.vulnerabilities or [])
+        return 0
     if pkg.vulnerabilities is None:
         print("\u001b[32mNo vulnerabilities found for this release! :)\u001b[0m")
         return 0
 
     VULNERABILITY_COUNT = len(pkg.vulnerabilities)
-    os.system("clear" if os.name != "nt" else "cls")
+    # only page through vulnerabilities when someone is there to press ENTER
+    interactive = sys.stdin.isatty() and sys.stdout.isatty()
+    if interactive:
+        os.system("clear" if os.name != "nt" else "cls")
 
     for vuln in pkg.vulnerabilities:
         print(
@@ -125,13 +157,20 @@ def print_vulns(pkg: PackageObject):
         msg += f"\n\u001b[1mFixed in version(s):\u001b[0m '{', '.join([str(_) for _ in vuln.fixed_in]).strip(', ')}'\n"
         msg += f"(See more: '{vuln.link}')\n"
         print(msg)
-        input("== Press ENTER for next page ==")
-        os.system("clear" if os.name != "nt" else "cls")
+        if interactive:
+            input("== Press ENTER for next page ==")
+            os.system("clear" if os.name != "nt" else "cls")
 
     return 0
 
 
-def print_notices(pkg: PackageObject):
+@trace.traced("render")
+def print_notices(pkg: "PackageObject"):
+    from otlet.markers import DEPENDENCY_ENVIRONMENT_MARKERS
+
+    if output.is_structured():
+        output.emit({"name": pkg.name, "version": pkg.version, "notices": output.notices(pkg)})
+        return 0
     print(f"Notices for package '{pkg.release_name}':\n")
     count = 0
     if pkg.vulnerabilities:
@@ -162,27 +201,644 @@ def print_notices(pkg: PackageObject):
     return 0
 
 
-def check_args(args: argparse.Namespace) -> Tuple[PackageObject, int]:
+@trace.traced("render")
+def print_deps(pkg: "PackageObject", args: argparse.Namespace):
+    from . import deps
+
+    verbose_print(print_deps, f"Resolving dependencies of {pkg.release_name} with {args.jobs[0]} workers")
+    root = deps.DependencyResolver(args.jobs[0]).resolve(pkg, args.depth[0] if args.depth else None)
+    flat = deps.flatten(root)
+    code = 1 if any(node.error for node, _ in flat) else 0
+    if output.is_structured():
+        if args.tree:
+            output.emit(output.dependency_tree_record(root))
+        else:
+            output.emit_all(output.dependency_record(node, parents) for node, parents in flat)
+        return code
+
+    if not args.tree:
+        for node, parents in flat:
+            if node.error:
+                print(f"otlet: {node.name} (required by {parents[0].name}): {node.error}", file=sys.stderr)
+            else:
+                print(f"{node.name}=={node.version}")
+        return code
+
+    expanded = {root.key}
+
+    def print_children(node: "deps.DependencyNode", prefix: str) -> None:
+        for num, (dep, child) in enumerate(node.children):
+            last = num == len(node.children) - 1
+            text = child.name
+            if dep.version_constraints:
+                text += f" ({', '.join(dep.version_constraints)})"
+            if child.error:
+                text += f"\u001b[31m error: {child.error}\u001b[0m"
+            else:
+                text += f" \u001b[1m{child.version}\u001b[0m"
+            repeated = bool(child.children) and child.key in expanded
+            if repeated:
+                # its dependencies are already listed further up
+                text += "\u001b[2m (*)\u001b[0m"
+            print(prefix + ("└── " if last else "├── ") + text)
+            if child.children and not repeated:
+                expanded.add(child.key)
+                print_children(child, prefix + ("    " if last else "│   "))
+
+    print(f"{root.name} \u001b[1m{root.version}\u001b[0m")
+    print_children(root, "")
+    return code
+
+
+@trace.traced("render")
+def print_inspect(pkg: "PackageObject", args: argparse.Namespace):
+    from . import download, wheel
+
+    dist = download.select_dist(pkg, "bdist_wheel", args.whl_options, args.target)
+    if not dist:
+        print(f"No wheels found for {pkg.release_name}, matching the given criteria.", file=sys.stderr)
+        return 1
+    verbose_print(print_inspect, f"Inspecting {dist.filename}")
+    record = wheel.inspect_wheel(pkg, dist, args.entry_points, args.files)
+    if output.is_structured():
+        output.emit(record)
+        return 0
+
+    print(f"Metadata for {dist.filename}\n")
+    for key, value in (record["metadata"] or {}).items():
+        if key == "description":
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            print(f"    {key.replace('_', ' ').title()}: {item}")
+    if args.entry_points:
+        print("\nEntry points:")
+        if not record["entry_points"]:
+            print("    None")
+        for group, entry_points in record["entry_points"].items():
+            print(f"    [{group}]")
+            for name, target in entry_points.items():
+                print(f"\t{name} = {target}")
+    if args.files:
+        print(f"\nFiles ({len(record['files'])}):")
+        for file in record["files"]:
+            print(f"    {file['path']} ({round(file['size'] / 1024, 1)} KiB)")
+    print(
+        f"\nRead {round(record['bytes_fetched'] / 1024, 1)} KiB of {dist.converted_size} {dist.size_measurement} "
+        f"in {record['requests']} request(s), using {'the PEP 658 metadata file' if record['source'] == 'metadata-file' else 'HTTP range requests'}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+@trace.traced("render")
+def print_cache(args: argparse.Namespace):
+    _cache = cache.MetadataCache()
+    if args.cache_action[0] == "prune":
+        verbose_print(print_cache, f"Pruning cache at {_cache.path}")
+        removed, freed = _cache.prune(
+            parse_size(args.max_size[0]),
+            args.max_age[0] * 86400 if args.max_age else None,
+        )
+        if output.is_structured():
+            output.emit({"removed": removed, "freed": freed})
+        else:
+            print(f"Removed {removed} cache entries ({round(freed / 1024, 1)} KiB freed).")
+        return 0
+
+    stats = _cache.stats()
+    if output.is_structured():
+        output.emit({**stats, "ttl": _cache.ttl})
+        return 0
+    print(f"Cache directory: {stats['path']}")
+    print(f"Entries: {stats['entries']}")
+    print(
+        f"Size: {round(stats['size'] / 1.049e6, 1)} MiB"
+        if stats["size"] > 1048576
+        else f"Size: {round(stats['size'] / 1024, 1)} KiB"
+    )
+    if stats["entries"]:
+        print(f"Least recently used: {datetime.fromtimestamp(stats['oldest']).strftime('%Y-%m-%d %H:%M')}")
+        print(f"Most recently used: {datetime.fromtimestamp(stats['newest']).strftime('%Y-%m-%d %H:%M')}")
+    print(f"Expiry (TTL): {_cache.ttl} seconds")
+    return 0
+
+
+@trace.traced("render")
+def print_store(args: argparse.Namespace):
+    from . import store
+
+    _store = store.WheelStore()
+    if args.store_action[0] == "gc":
+        if not args.max_size and not args.max_age:
+            print("otlet: 'store gc' requires --max-size and/or --max-age", file=sys.stderr)
+            return 1
+        verbose_print(print_store, f"Garbage-collecting store at {_store.path}")
+        removed, freed = _store.gc(
+            parse_size(args.max_size[0]) if args.max_size else None,
+            args.max_age[0] * 86400 if args.max_age else None,
+        )
+        if output.is_structured():
+            output.emit({"removed": removed, "freed": freed})
+        else:
+            print(f"Removed {removed} files from the store ({round(freed / 1.049e6, 1)} MiB freed).")
+        return 0
+
+    stats = _store.stats()
+    if output.is_structured():
+        output.emit(stats)
+        return 0
+    print(f"Store directory: {stats['path']}")
+    print(f"Files: {stats['entries']}")
+    print(f"Size: {round(stats['size'] / 1.049e6, 1)} MiB")
+    return 0
+
+
+@trace.traced("render")
+def print_snapshot(args: argparse.Namespace):
+    from . import batch, snapshot
+
+    path = args.output[0] if args.output else None
+    if args.snapshot_action[0] == "create":
+        if not args.file:
+            print("otlet: 'snapshot create' requires -f/--file", file=sys.stderr)
+            return 1
+        specs = batch.read_specs(args.file[0])
+        verbose_print(print_snapshot, f"Creating snapshot of {len(specs)} packages")
+        stats, errors = snapshot.create_snapshot(
+            path, [(spec.name, spec.version) for spec in specs], args.jobs[0]
+        )
+        for key, err in errors:
+            print(f"otlet: {key}: {err}", file=sys.stderr)
+    else:
+        try:
+            stats = snapshot.Snapshot(path).stats()
+        except (OSError, ValueError) as err:
+            print(f"otlet: no usable snapshot at {path or snapshot.snapshot_dir()} ({err})", file=sys.stderr)
+            return 1
+        errors = []
+
+    if output.is_structured():
+        output.emit(stats)
+        return 1 if errors else 0
+    print(f"Snapshot directory: {stats['path']}")
+    print(f"Created: {datetime.fromtimestamp(stats['created']).strftime('%Y-%m-%d %H:%M')}")
+    print(f"Projects: {stats['projects']} ({stats['entries']} entries)")
+    print(
+        f"Size: {round(stats['size'] / 1.049e6, 1)} MiB"
+        if stats["size"] > 1048576
+        else f"Size: {round(stats['size'] / 1024, 1)} KiB"
+    )
+    return 1 if errors else 0
+
+
+@trace.traced("render")
+def print_catalog(args: argparse.Namespace):
+    from . import catalog
+
+    action = args.catalog_action[0]
+    if action == "completion":
+        from .clparser.options import SUBCOMMANDS
+
+        if args.word not in catalog.COMPLETION_SCRIPTS:
+            print(f"otlet: 'catalog completion' takes one of {', '.join(catalog.COMPLETION_SCRIPTS)}", file=sys.stderr)
+            return 1
+        print(catalog.completion_script(args.word, SUBCOMMANDS))
+        return 0
+    if action == "sync":
+        verbose_print(print_catalog, f"Syncing catalog from {catalog.simple_url()}")
+        count, changed = catalog.sync(force=args.force)
+        if output.is_structured():
+            output.emit({"path": catalog.catalog_path(), "projects": count, "changed": changed})
+        else:
+            print(f"{'Updated' if changed else 'Already up to date:'} catalog of {count} projects at {catalog.catalog_path()}")
+        return 0
+
+    _catalog = catalog.get_catalog()
+    if action == "complete":
+        # stay quiet for shell completion, which has nothing to offer without a catalog
+        names = _catalog.complete(args.word, args.limit[0]) if _catalog else []
+        if output.is_structured():
+            output.emit_all({"name": name} for name in names)
+        else:
+            print("\n".join(names))
+        return 0
+    if _catalog is None:
+        print(f"otlet: no catalog at {catalog.catalog_path()}. Create one with 'otlet catalog sync'.", file=sys.stderr)
+        return 1
+    info = {
+        "path": _catalog.path,
+        "source": _catalog.header["source"],
+        "created": _catalog.header["created"],
+        "projects": len(_catalog),
+        "size": os.path.getsize(_catalog.path),
+    }
+    if output.is_structured():
+        output.emit(info)
+        return 0
+    print(f"Catalog: {info['path']}")
+    print(f"Source: {info['source']}")
+    print(f"Synced: {datetime.fromtimestamp(info['created']).strftime('%Y-%m-%d %H:%M')}")
+    print(f"Projects: {info['projects']}")
+    print(f"Size: {round(info['size'] / 1.049e6, 1)} MiB")
+    return 0
+
+
+def print_suggestions(name: str) -> None:
+    """Print project names similar to name, if there is a catalog to look them up in."""
+    from . import catalog
+
+    _catalog = catalog.get_catalog()
+    if _catalog is None:
+        verbose_print(print_suggestions, "No catalog to suggest similar names from, see 'otlet catalog sync'")
+        return
+    name = re.split(r"[\[<>=!~;\s]", name)[0]
+    suggestions = [_ for _ in _catalog.suggest(name) if _ != catalog.canonical_name(name)]
+    if suggestions:
+        print(f"Did you mean: {', '.join(suggestions)}?", file=sys.stderr)
+
+
+@trace.traced("render")
+def print_watch(args: argparse.Namespace):
+    from . import batch, watch
+
+    names = list(args.packages or [])
+    if args.file:
+        names += [spec.name for spec in batch.read_specs(args.file[0])]
+    if not names:
+        print("otlet: 'watch' requires packages to watch, as arguments or with -f/--file", file=sys.stderr)
+        return 1
+    path = args.state[0] if args.state else watch.state_path()
+    state = watch.load_state(path)
+    watcher = watch.Watcher(names, state, args.interval[0], args.max_interval[0], args.jobs[0])
+    verbose_print(print_watch, f"Watching {len(watcher.names)} packages, state in {path}")
+    colors = {"release": 32, "yanked": 33, "unyanked": 36, "removed": 31, "error": 31}
+    writer = output.RecordWriter(flush=True) if output.is_structured() else None
+
+    def emit(event: dict):
+        if writer is not None:
+            writer.write(event)
+            return
+        stamp = datetime.fromisoformat(event["time"]).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+        if event["event"] == "error":
+            text = f"{event['package']}: {event['error']}"
+        elif event["event"] == "yanked" and event.get("reason"):
+            text = f"{event['package']} {event['version']} yanked: {event['reason']}"
+        else:
+            suffix = " (yanked)" if event.get("yanked") else ""
+            text = f"{event['package']} {event['version']} {event['event']}{suffix}"
+        print(f"{stamp} \u001b[{colors[event['event']]}m{text}\u001b[0m", flush=True)
+
+    try:
+        watcher.run(emit, lambda: watch.save_state(path, state), once=args.once)
+    finally:
+        if writer is not None:
+            writer.close()
+        verbose_print(
+            print_watch,
+            f"{watcher.stats['checks']} checks, {watcher.stats['not_modified']} unchanged, "
+            f"{watcher.stats['changed']} changed, {watcher.stats['errors']} failed",
+        )
+    return 1 if args.once and any("error" in state[key] for key in watcher.names if key in state) else 0
+
+
+@trace.traced("render")
+def print_batch(args: argparse.Namespace):
+    from . import batch, download
+
+    specs = batch.read_specs(args.file[0])
+    code = 0
+    results = batch.fetch_packages(specs, args.jobs[0])
+    if args.download:
+
+        def found_packages():
+            nonlocal code
+            for spec, pkg in results:
+                if isinstance(pkg, Exception):
+                    print(f"otlet: {spec.line}: {pkg}", file=sys.stderr)
+                    code = 1
+                else:
+                    yield spec.line, pkg
+
+        download_code = download.download_dists(
+            found_packages(),
+            args.download,
+            args.dist_type,
+            args.whl_options,
+            args.jobs[0],
+            args.connections[0],
+            parse_size(args.buffer_size[0]),
+            args.target,
+        )
+        return download_code or code
+
+    if output.is_structured():
+
+        def records():
+            nonlocal code
+            for spec, pkg in results:
+                if isinstance(pkg, Exception):
+                    code = 1
+                    yield {"spec": spec.line, "error": str(pkg)}
+                else:
+                    yield {"spec": spec.line, **output.package_record(pkg)}
+
+        # flush every record, so consumers see each package as soon as it is fetched
+        output.emit_all(records(), flush=True)
+        return code
+
+    for spec, pkg in results:
+        if isinstance(pkg, Exception):
+            print(f"otlet: {spec.line}: {pkg}", file=sys.stderr)
+            code = 1
+            continue
+        text = f"{pkg.release_name} ({pkg.upload_time.date() if pkg.upload_time else 'Unknown'})"
+        if pkg.info.yanked:
+            text += "\u001b[1m\u001b[33m (yanked)\u001b[0m"
+        if pkg.vulnerabilities:
+            text += f"\u001b[31m ({len(pkg.vulnerabilities)} known vulnerabilities)\u001b[0m"
+        print(text)
+    return code
+
+
+@trace.traced("render")
+def print_verify(args: argparse.Namespace):
+    from . import verify
+
+    directory = args.directory[0]
+    if not os.path.isdir(directory):
+        print(f"otlet: {directory} is not a directory", file=sys.stderr)
+        return 1
+    files = verify.scan(directory)
+    verbose_print(print_verify, f"Verifying {len(files)} files in {directory}")
+    results = list(verify.verify_files(files, args.jobs[0], args.processes[0] if args.processes else None))
+    counts = {status: 0 for status in ("ok", "mismatch", "unknown", "error")}
+    for result in results:
+        counts[result.status] += 1
+    code = 1 if counts["mismatch"] or counts["error"] else 0
+    if output.is_structured():
+        if config["format"] == "ndjson":
+            output.emit_all((output.verify_record(result) for result in results), flush=True)
+        else:
+            output.emit(
+                {
+                    "files": [output.verify_record(result) for result in results],
+                    "summary": {"files": len(results), "bytes": sum(r.file.size for r in results), **counts},
+                }
+            )
+        return code
+
+    colors = {"mismatch": 31, "error": 31, "unknown": 33}
+    for result in results:
+        if result.status == "ok":
+            verbose_print(print_verify, f"{result.file.path}: ok")
+            continue
+        detail = f"expected {result.expected}, got {result.actual}" if result.status == "mismatch" else result.error
+        print(f"\u001b[{colors[result.status]}m{result.status}: {result.file.path} ({detail})\u001b[0m")
+    size = sum(result.file.size for result in results)
+    print(
+        f"{len(results)} files ({round(size / 1.049e6, 1)} MiB): {counts['ok']} ok, {counts['mismatch']} mismatched, "
+        f"{counts['unknown']} unknown, {counts['error']} failed"
+    )
+    return code
+
+
+@trace.traced("render")
+def print_audit(args: argparse.Namespace):
+    from . import audit, batch
+
+    specs = batch.read_specs(args.file[0])
+    verbose_print(print_audit, f"Auditing {len(specs)} packages")
+    results = audit.audit_packages(specs, args.jobs[0], set(args.ignore or []))
+    code = 0
+    count = 0
+    if output.is_structured():
+
+        def records():
+            nonlocal code, count
+            for result in results:
+                if result.error is not None:
+                    code = 1
+                count += len(result.vulnerabilities)
+                yield output.audit_record(result)
+
+        if config["format"] == "ndjson":
+            output.emit_all(records(), flush=True)
+        else:
+            packages = list(records())
+            output.emit(
+                {
+                    "packages": packages,
+                    "summary": {
+                        "packages": len(packages),
+                        "vulnerable_packages": sum(1 for p in packages if p.get("vulnerabilities")),
+                        "vulnerabilities": count,
+                        "errors": sum(1 for p in packages if "error" in p),
+                    },
+                }
+            )
+        return 1 if count > args.max_vulns[0] else code
+
+    rows = []
+    vulnerable = []
+    for result in results:
+        if result.error is not None:
+            print(f"otlet: {result.spec.line}: {result.error}", file=sys.stderr)
+            code = 1
+            continue
+        count += len(result.vulnerabilities)
+        if result.vulnerabilities:
+            vulnerable.append(result)
+        fixed_in = audit.fixed_version(result.pkg, result.vulnerabilities)
+        rows.append(
+            (
+                result.pkg.name,
+                str(result.pkg.version),
+                str(len(result.vulnerabilities)),
+                (fixed_in or "no fix available") if result.vulnerabilities else "",
+            )
+        )
+
+    for result in vulnerable:
+        print(f"\u001b[1m\u001b[31m{result.pkg.release_name}\u001b[0m")
+        for vuln in result.vulnerabilities:
+            aliases = f" ({', '.join(vuln.aliases)})" if vuln.aliases else ""
+            fixes = ", ".join(str(_) for _ in vuln.fixed_in) or "not fixed yet"
+            print(f"\t\u001b[1m{vuln.id}{aliases}\u001b[0m fixed in: {fixes}")
+            print(f"\t\t{vuln.link}")
+        print()
+
+    if rows:
+        header = ("[package]", "[version]", "[vulns]", "[fixed in]")
+        widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+        print("  ".join(h.ljust(w) for h, w in zip(header, widths)).rstrip())
+        print("\u2500" * 5)
+        for row in rows:
+            text = "  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip()
+            print(f"\u001b[31m{text}\u001b[0m" if row[2] != "0" else text)
+        print()
+
+    summary = f"{count} known vulnerabilities found in {len(vulnerable)} of {len(rows)} packages"
+    if count > args.max_vulns[0]:
+        print(f"\u001b[1m\u001b[31m{summary}.\u001b[0m")
+        return 1
+    print(f"\u001b[32m{summary}.\u001b[0m")
+    return code
+
+
+@trace.traced("render")
+def print_diff(args: argparse.Namespace):
+    from . import diff
+
+    old, new = diff.fetch_releases(args.package[0], args.old_version[0], args.new_version[0])
+    result = diff.diff_releases(old, new)
+    if output.is_structured():
+        output.emit(result)
+        return 0
+
+    print(f"Comparing {old.release_name} to {new.release_name}\n")
+    deps = result["dependencies"]
+    if not any(deps.values()):
+        print("Dependencies: unchanged")
+    else:
+        print("Dependencies:")
+        for requirement in deps["added"]:
+            print(f"\t\u001b[32m+ {diff.format_requirement(requirement)}\u001b[0m")
+        for requirement in deps["removed"]:
+            print(f"\t\u001b[31m- {diff.format_requirement(requirement)}\u001b[0m")
+        for change in deps["changed"]:
+            print(
+                f"\t\u001b[33m~ {diff.format_requirement(change['old'])} -> "
+                f"{diff.format_requirement(change['new'])}\u001b[0m"
+            )
+
+    requires_python = result["requires_python"]
+    if requires_python["old"] == requires_python["new"]:
+        print(f"Python Version(s): {requires_python['new'] or 'Not Specified'} (unchanged)")
+    else:
+        print(
+            f"Python Version(s): \u001b[33m{requires_python['old'] or 'Not Specified'} -> "
+            f"{requires_python['new'] or 'Not Specified'}\u001b[0m"
+        )
+
+    yanked = result["yanked"]
+    if yanked["new"]:
+        reason = f" ({yanked['new_reason']})" if yanked["new_reason"] else ""
+        print(f"\u001b[1m\u001b[33m{new.release_name} is yanked{reason}\u001b[0m")
+    if yanked["old"]:
+        print(f"\u001b[33m{old.release_name} is yanked\u001b[0m")
+
+    vulns = result["vulnerabilities"]
+    print(
+        f"Vulnerabilities: {len(vulns['fixed'])} fixed, {len(vulns['introduced'])} introduced, "
+        f"{len(vulns['unfixed'])} still unfixed"
+    )
+    for label, color in (("fixed", 32), ("introduced", 31), ("unfixed", 33)):
+        if vulns[label]:
+            print(f"\t\u001b[{color}m{label}: {', '.join(vulns[label])}\u001b[0m")
+    return 0
+
+
+def check_args(args: argparse.Namespace) -> Tuple[Optional["PackageObject"], int]:
     code = 2
+    if args.subcommand == "cache":
+        verbose_print(check_args, "Running print_cache()")
+        return (None, print_cache(args))
+    if args.subcommand == "store":
+        verbose_print(check_args, "Running print_store()")
+        return (None, print_store(args))
+    if args.subcommand == "snapshot":
+        verbose_print(check_args, "Running print_snapshot()")
+        return (None, print_snapshot(args))
+    if args.subcommand == "catalog":
+        verbose_print(check_args, "Running print_catalog()")
+        return (None, print_catalog(args))
+    if args.subcommand == "watch":
+        verbose_print(check_args, "Running print_watch()")
+        return (None, print_watch(args))
+    if config.get("offline"):
+        from . import snapshot
+
+        try:
+            snapshot.get_snapshot()
+        except (OSError, ValueError) as err:
+            print(
+                f"otlet: no usable snapshot at {snapshot.snapshot_dir()} ({err}). Create one with 'otlet snapshot create'.",
+                file=sys.stderr,
+            )
+            return (None, 1)
+    if args.subcommand == "batch":
+        verbose_print(check_args, "Running print_batch()")
+        return (None, print_batch(args))
+    if args.subcommand == "audit":
+        verbose_print(check_args, "Running print_audit()")
+        return (None, print_audit(args))
+    if args.subcommand == "verify":
+        verbose_print(check_args, "Running print_verify()")
+        return (None, print_verify(args))
+    if args.subcommand == "diff":
+        verbose_print(check_args, "Running print_diff()")
+        return (None, print_diff(args))
+    if args.subcommand == "serve":
+        from . import server
+
+        verbose_print(check_args, "Running server.serve()")
+        return (
+            None,
+            server.serve(
+                args.socket[0] if args.socket else None,
+                args.port[0] if args.port else None,
+                args.max_entries[0],
+                args.ttl[0],
+            ),
+        )
+
+    if getattr(args, "target", None):
+        from . import tags
+
+        try:
+            tags.parse_target(args.target)
+        except ValueError as err:
+            print(f"otlet: {err}", file=sys.stderr)
+            return (None, 1)
+
+    from . import api
+
     verbose_print(check_args, "Fetching package data from PyPI/Warehouse")
-    if "releases" in sys.argv or args.package_version == "stable":
-        pk_object = PackageObject(args.package[0])
+    if args.subcommand == "releases" or args.package_version == "stable":
+        pk_object = api.OtletPackageObject(args.package[0])
     else:
-        pk_object = PackageObject(args.package[0], args.package_version)
+        pk_object = api.OtletPackageObject(args.package[0], args.package_version)
 
-    if "releases" in sys.argv:
+    if args.subcommand == "releases":
         verbose_print(check_args, "Running print_releases()")
         code = print_releases(pk_object, args)
-    elif "download" in sys.argv:
+    elif args.subcommand == "deps":
+        verbose_print(check_args, "Running print_deps()")
+        code = print_deps(pk_object, args)
+    elif args.subcommand == "inspect":
+        verbose_print(check_args, "Running print_inspect()")
+        code = print_inspect(pk_object, args)
+    elif args.subcommand == "download":
         if args.list_whls:
             verbose_print(check_args, "Running print_distributions()")
             code = print_distributions(
-                pk_object, dist_type=args.dist_type, opt_dict=args.whl_options
+                pk_object,
+                dist_type=args.dist_type,
+                opt_dict=args.whl_options,
+                target=args.target,
             )
         else:
+            from . import download
+
             verbose_print(check_args, "Running download.download_dist()")
             code = download.download_dist(
-                pk_object, args.dest, args.dist_type, args.whl_options
+                pk_object,
+                args.dest,
+                args.dist_type,
+                args.whl_options,
+                args.connections[0],
+                parse_size(args.buffer_size[0]),
+                args.target,
             )
     elif args.vulnerabilities:
         # List all known vulnerabilities for a release.
@@ -191,7 +847,11 @@ def check_args(args: argparse.Namespace) -> Tuple[PackageObject, int]:
     elif args.urls:
         # List all available URLs for a release.
         verbose_print(check_args, "Printing all available URLs for package")
-        if pk_object.info.project_urls is None:
+        if output.is_structured():
+            output.emit(
+                {"name": pk_object.name, "version": pk_object.version, "project_urls": pk_object.info.project_urls or {}}
+            )
+        elif pk_object.info.project_urls is None:
             print(f"No URLs available for {pk_object.release_name}")
         else:
             for _type, url in pk_object.info.project_urls.items():
@@ -200,9 +860,14 @@ def check_args(args: argparse.Namespace) -> Tuple[PackageObject, int]:
     elif args.list_extras:
         # List all allowable extras for a release.
         verbose_print(check_args, "Printing all available extras for package")
-        print(f"Allowable extras for '{pk_object.release_name}' are:")
-        for extra in pk_object.info.possible_extras:
-            print(f"\t- {pk_object.canonicalized_name}[{extra}]")
+        if output.is_structured():
+            output.emit(
+                {"name": pk_object.name, "version": pk_object.version, "extras": list(pk_object.info.possible_extras or [])}
+            )
+        else:
+            print(f"Allowable extras for '{pk_object.release_name}' are:")
+            for extra in pk_object.info.possible_extras:
+                print(f"\t- {pk_object.canonicalized_name}[{extra}]")
         code = 0
     elif args.notices:
         verbose_print(check_args, "Running print_notices()")
@@ -210,9 +875,28 @@ def check_args(args: argparse.Namespace) -> Tuple[PackageObject, int]:
     return (pk_object, code)
 
 
+def parse_size(size: str) -> int:
+    """Convert a human-readable size such as '500M' or '2G' into bytes."""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    size = size.strip().upper().rstrip("IB")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
 def verbose_print(calling_function, msg: str) -> None:
+    """
+    Print msg to stderr with the time since startup and the calling function's
+    name if '--verbose' was passed, and record it in the trace (if any).
+    """
     if config["verbose"]:
-        print(f"\u001b[38;5;245m[{calling_function.__name__}(): {hex(id(calling_function))}]", msg, "\u001b[0m", file=sys.stderr)
+        print(
+            f"\u001b[38;5;245m[{trace.elapsed():>8.1f} ms] [{calling_function.__name__}()]",
+            msg,
+            "\u001b[0m",
+            file=sys.stderr,
+        )
+    trace.instant(calling_function.__name__, msg=msg)
 
 
 __all__ = ["check_args"]
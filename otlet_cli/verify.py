@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import mmap
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from . import util, api, index, trace
+from .download import parse_wheel_filename
+
+DEFAULT_JOBS = 8
+SDIST_SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".zip", ".tar")
+# files up to this size are hashed with a single read, larger ones are memory-mapped
+MMAP_THRESHOLD = 1024 * 1024
+# files handed to a hashing process at once, so tens of thousands of small
+# files don't each cost a round trip between processes
+MAX_CHUNKSIZE = 64
+
+
+class LocalFile(NamedTuple):
+    path: str
+    filename: str
+    size: int
+    project: Optional[str]
+    version: Optional[str]
+
+
+class VerifyResult(NamedTuple):
+    """The outcome of checking one local file against the digest its index publishes."""
+
+    file: LocalFile
+    status: str  # 'ok', 'mismatch', 'unknown' or 'error'
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    error: Optional[str] = None
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def split_filename(filename: str) -> Optional[Tuple[str, str]]:
+    """Return the project and version a wheel or sdist filename belongs to, or None if it is neither."""
+    parts = parse_wheel_filename(filename)
+    if parts is not None:
+        return parts[0], parts[1]  # type: ignore
+    lowered = filename.lower()
+    for suffix in SDIST_SUFFIXES:
+        if lowered.endswith(suffix):
+            # the version is everything after the last '-' (sdist names escape '-' in the project as '_')
+            _match = re.fullmatch(r"(.+)-(\d[^-]*)", filename[: -len(suffix)])
+            return _match.group(1, 2) if _match else None  # type: ignore
+    return None
+
+
+def scan(directory: str) -> List[LocalFile]:
+    """Return every file below directory (skipping hidden ones), with the project and version its name refers to."""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            split = split_filename(name)
+            files.append(LocalFile(path, name, os.path.getsize(path), *(split or (None, None))))
+    return files
+
+
+def hash_file(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return the sha256 hexdigest of the file at path, or None and why it couldn't be read."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= MMAP_THRESHOLD:
+                return hashlib.sha256(f.read()).hexdigest(), None
+            # hashing the mapped file in one call avoids a copy per chunk, and hashlib
+            # releases the GIL for it
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return hashlib.sha256(data).hexdigest(), None
+    except OSError as err:
+        return None, err.strerror or str(err)
+
+
+def published_digests(project: str, versions: List[str]) -> Dict[str, str]:
+    """
+    Return the sha256 digest of every file the index publishes for versions
+    of project, by filename. A single version is looked up through its own
+    (smaller) response, several through the project's response listing all of them.
+    """
+    if len(versions) == 1:
+        try:
+            urls = json.loads(api.fetch_json(f"{index.index_url()}/{project}/{versions[0]}/json")).get("urls") or []
+            return {url["filename"]: (url.get("digests") or {}).get("sha256") for url in urls}
+        except HTTPError as err:
+            # the filename may spell the version differently from the index
+            if err.code != 404:
+                raise
+    releases = json.loads(api.fetch_json(f"{index.index_url()}/{project}/json")).get("releases") or {}
+    urls = [url for files in releases.values() for url in files]
+    return {url["filename"]: (url.get("digests") or {}).get("sha256") for url in urls}
+
+
+def _fetch_digests(item: Tuple[str, List[str]]) -> Tuple[Dict[str, str], Optional[str]]:
+    project, versions = item
+    try:
+        return published_digests(project, versions), None
+    except HTTPError as err:
+        return {}, "not found on the index" if err.code == 404 else f"HTTP {err.code} {err.reason}"
+    except (URLError, OSError, ValueError) as err:
+        return {}, str(getattr(err, "reason", err))
+
+
+def verify_files(
+    files: List[LocalFile], jobs: int = DEFAULT_JOBS, processes: Optional[int] = None
+) -> Iterator[VerifyResult]:
+    """
+    Check every file against the sha256 digest its index publishes for it.
+
+    Local files are hashed across a process pool (one process per core by
+    default), largest first so the pool drains evenly, while the published
+    digests are fetched concurrently in threads: once per project, no matter
+    how many of its files there are. Results are yielded in the order of files.
+    """
+    known = [file for file in files if file.project is not None]
+    versions: Dict[str, set] = {}
+    for file in known:
+        versions.setdefault(canonical_name(file.project), set()).add(file.version)  # type: ignore
+    projects = sorted((project, sorted(_)) for project, _ in versions.items())
+    util.verbose_print(
+        verify_files, f"Hashing {len(known)} files and fetching digests of {len(projects)} projects"
+    )
+    by_size = sorted(known, key=lambda file: file.size, reverse=True)
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, min(MAX_CHUNKSIZE, len(by_size) // (processes * 4)))
+    with ProcessPoolExecutor(max_workers=processes) as hashers, ThreadPoolExecutor(max_workers=max(1, jobs)) as fetchers:
+        # start hashing before fetching, so both run at the same time
+        hashed = hashers.map(hash_file, [file.path for file in by_size], chunksize=chunksize)
+        digests: Dict[str, Optional[str]] = {}
+        errors: Dict[str, str] = {}
+        for (project, _), (published, error) in zip(projects, fetchers.map(_fetch_digests, projects)):
+            if error is not None:
+                util.verbose_print(verify_files, f"Unable to fetch digests of {project}: {error}")
+                errors[project] = error
+            digests.update(published)
+        with trace.span("hash_files", "hash", files=len(by_size)):
+            actual = dict(zip((file.path for file in by_size), hashed))
+
+    for file in files:
+        if file.project is None:
+            yield VerifyResult(file, "unknown", error="not a wheel or sdist filename")
+            continue
+        error = errors.get(canonical_name(file.project))
+        if error is not None:
+            yield VerifyResult(file, "error", error=error)
+            continue
+        if file.filename not in digests:
+            yield VerifyResult(file, "unknown", error=f"not published for {file.project} {file.version}")
+            continue
+        expected = digests[file.filename]
+        digest, error = actual[file.path]
+        if digest is None:
+            yield VerifyResult(file, "error", expected, error=error)
+        elif expected is None:
+            yield VerifyResult(file, "unknown", actual=digest, error="no sha256 digest published")
+        else:
+            yield VerifyResult(file, "ok" if digest == expected.lower() else "mismatch", expected, digest)
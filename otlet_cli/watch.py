@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import heapq
+import random
+import hashlib
+import tempfile
+import threading
+import http.client
+from time import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from . import util, cache, index, pool
+
+DEFAULT_INTERVAL = 300  # seconds between checks of the most active projects
+DEFAULT_MAX_INTERVAL = 3600  # seconds between checks of the least active ones
+DEFAULT_JOBS = 8
+# check a project about this many times per typical gap between its releases
+CHECKS_PER_RELEASE = 200
+# after a project changed, keep checking it at the shortest interval for this long,
+# since fixes and yanks tend to follow a release closely
+ACTIVE_PERIOD = 86400
+SAVE_INTERVAL = 60  # seconds between state checkpoints
+STATE_FORMAT = 1
+
+
+def state_path() -> str:
+    return os.path.join(cache.cache_dir(), "watch.json")
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def load_state(path: str) -> Dict[str, dict]:
+    """Load the per-package state saved by a previous run, or nothing if there is none."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("format") != STATE_FORMAT:
+        return {}
+    return data["packages"]
+
+
+def save_state(path: str, state: Dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # write to a temporary file first, so an interrupted save keeps the previous state
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"format": STATE_FORMAT, "packages": state}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def summarize_releases(body: bytes) -> Tuple[Dict[str, Optional[str]], Optional[float]]:
+    """
+    Return the releases in a JSON API response, mapped to their yanked reason
+    ('' if yanked without one, None if not yanked), and the mean number of
+    seconds between the last ten releases (None if there are fewer than two).
+    """
+    releases: Dict[str, Optional[str]] = {}
+    uploaded = []
+    for version, files in json.loads(body).get("releases", {}).items():
+        yanked = bool(files) and all(file.get("yanked") for file in files)
+        releases[version] = (files[0].get("yanked_reason") or "") if yanked else None
+        times = [file["upload_time_iso_8601"] for file in files if file.get("upload_time_iso_8601")]
+        if times:
+            uploaded.append(min(times))
+    uploaded.sort()
+    recent = [datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp() for t in uploaded[-10:]]
+    gap = (recent[-1] - recent[0]) / (len(recent) - 1) if len(recent) > 1 else None
+    return releases, gap
+
+
+def release_events(
+    name: str, old: Dict[str, Optional[str]], new: Dict[str, Optional[str]]
+) -> List[dict]:
+    """Return an event for every release that was added, removed, yanked or un-yanked between old and new."""
+    events = []
+    for version in new.keys() - old.keys():
+        events.append({"event": "release", "package": name, "version": version, "yanked": new[version] is not None})
+    for version in old.keys() - new.keys():
+        events.append({"event": "removed", "package": name, "version": version})
+    for version in old.keys() & new.keys():
+        if old[version] is None and new[version] is not None:
+            events.append({"event": "yanked", "package": name, "version": version, "reason": new[version] or None})
+        elif old[version] is not None and new[version] is None:
+            events.append({"event": "unyanked", "package": name, "version": version})
+    return events
+
+
+class Watcher:
+    """
+    Polls a set of packages for new, removed and (un)yanked releases.
+
+    Every package keeps its own state: the releases seen last, the ETag
+    (or, for servers without one, the digest) of the response they came
+    from, and when it was last checked and last changed. Checks are
+    conditional requests, so an unchanged package only costs a '304 Not
+    Modified'. Each package is checked at an interval between interval and
+    max_interval, shorter for packages that release often or just changed,
+    and checks are spread out instead of all falling due at once.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        state: Dict[str, dict],
+        interval: float = DEFAULT_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        jobs: int = DEFAULT_JOBS,
+    ) -> None:
+        self.names = {canonical_name(name): name for name in names}
+        self.state = state
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.jobs = max(1, jobs)
+        self.stats = {"checks": 0, "not_modified": 0, "changed": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def poll_interval(self, entry: dict, now: float) -> float:
+        """Return how long to wait before checking a package again."""
+        if entry.get("changed") and now - entry["changed"] < ACTIVE_PERIOD:
+            return self.interval
+        gap = entry.get("gap")
+        interval = gap / CHECKS_PER_RELEASE if gap else self.max_interval
+        return min(max(interval, self.interval), self.max_interval)
+
+    def check(self, key: str) -> List[dict]:
+        """Check one package, returning its events (none for the first check, which only records its releases)."""
+        name = self.names[key]
+        entry = self.state.setdefault(key, {})
+        url = f"{index.index_url()}/{name}/json"
+        headers = {"Accept": "application/json"}
+        if entry.get("etag") and "releases" in entry:
+            headers["If-None-Match"] = entry["etag"]
+        now = time()
+        error = None
+        summary = None
+        try:
+            res = pool.get_pool().request(url, headers)
+            digest = hashlib.sha256(res.body).hexdigest()
+            if digest != entry.get("digest"):
+                summary = summarize_releases(res.body)
+        except HTTPError as err:
+            if err.code == 304:
+                with self._lock:
+                    self.stats["checks"] += 1
+                    self.stats["not_modified"] += 1
+                entry["checked"] = now
+                entry.pop("error", None)
+                return []
+            error = "not found" if err.code == 404 else f"HTTP {err.code} {err.reason}"
+        except URLError as err:
+            error = str(err.reason)
+        except (OSError, EOFError, http.client.HTTPException, ValueError) as err:
+            # i.e. a timeout or reset connection while reading the body, or a truncated (gzipped) response
+            error = str(err) or type(err).__name__
+        with self._lock:
+            self.stats["checks"] += 1
+            self.stats["errors"] += error is not None
+        entry["checked"] = now
+        if error is not None:
+            util.verbose_print(self.check, f"Checking {name} failed: {error}")
+            # report each error once, not on every check until it clears
+            events = [] if entry.get("error") == error else [{"event": "error", "package": name, "error": error}]
+            entry["error"] = error
+            return events
+        entry.pop("error", None)
+
+        if summary is None:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            entry["etag"] = res.headers.get("ETag")
+            return []
+        releases, gap = summary
+        events = release_events(name, entry["releases"], releases) if "releases" in entry else []
+        if events:
+            entry["changed"] = now
+            with self._lock:
+                self.stats["changed"] += 1
+        entry.update(etag=res.headers.get("ETag"), digest=digest, releases=releases, gap=gap)
+        return events
+
+    def schedule(self, now: float, once: bool = False) -> List[Tuple[float, str]]:
+        """
+        Return when each package is next due, as a heap. Packages that are
+        already due (or were never checked) are spread evenly over the
+        shortest interval, so a large watch list doesn't start with a burst.
+        With once, every package is due right away.
+        """
+        if once:
+            return [(now, key) for key in self.names]
+        due, overdue = [], []
+        for key in self.names:
+            entry = self.state.get(key)
+            if entry and entry.get("checked") and "releases" in entry:
+                at = entry["checked"] + self.poll_interval(entry, now)
+                if at > now:
+                    due.append((at, key))
+                    continue
+            overdue.append(key)
+        random.shuffle(overdue)
+        for num, key in enumerate(overdue):
+            due.append((now + num * self.interval / len(overdue), key))
+        heapq.heapify(due)
+        return due
+
+    def run(
+        self,
+        emit: Callable[[dict], None],
+        save: Callable[[], None],
+        once: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """
+        Check packages as they fall due, passing every event to emit, until
+        stop is set. With once, every package is checked right away, one
+        time. save is called every SAVE_INTERVAL seconds and when done.
+        """
+        stop = stop or threading.Event()
+        heap = self.schedule(time(), once)
+        last_save = time()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            try:
+                while heap and not stop.is_set():
+                    wait = heap[0][0] - time()
+                    if wait > 0:
+                        stop.wait(min(wait, SAVE_INTERVAL))
+                        continue
+                    batch = []
+                    while heap and heap[0][0] <= time():
+                        batch.append(heapq.heappop(heap)[1])
+                    util.verbose_print(self.run, f"Checking {len(batch)} package(s)")
+                    for key, events in zip(batch, executor.map(self.check, batch)):
+                        stamp = datetime.fromtimestamp(self.state[key]["checked"], timezone.utc).isoformat()
+                        for event in events:
+                            emit({**event, "time": stamp})
+                        if not once:
+                            entry = self.state[key]
+                            # jitter keeps packages with equal intervals from lining up again
+                            delay = self.poll_interval(entry, time()) * random.uniform(0.9, 1.1)
+                            heapq.heappush(heap, (entry["checked"] + delay, key))
+                    if time() - last_save >= SAVE_INTERVAL:
+                        save()
+                        last_save = time()
+            finally:
+                save()
@@ -0,0 +1,214 @@
+import io
+import re
+import hashlib
+import zipfile
+import configparser
+from email.parser import HeaderParser
+from typing import Any, Dict, List, Optional, Tuple
+from otlet.api import PackageObject
+from . import util, download, pool, trace
+from .download import Distribution
+
+READAHEAD = 64 * 1024  # the tail read covers the central directory of most wheels
+# core metadata fields that may appear more than once (PEP 566)
+MULTIPLE_USE_FIELDS = {
+    "classifier",
+    "dynamic",
+    "license_file",
+    "obsoletes_dist",
+    "platform",
+    "project_url",
+    "provides_dist",
+    "provides_extra",
+    "requires_dist",
+    "requires_external",
+    "supported_platform",
+}
+
+
+class HTTPRangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file over a remote URL, fetching only the byte ranges
+    that are read (and READAHEAD bytes past them, so the many small reads
+    zipfile makes don't each cost a request). Servers that ignore the Range
+    header send the whole file, which is then served from memory.
+    """
+
+    def __init__(self, url: str, size: int) -> None:
+        super().__init__()
+        self.url = url
+        self.size = size
+        self.position = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._blocks: List[Tuple[int, bytes]] = []
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def _cached(self, start: int, end: int) -> Optional[bytes]:
+        for block_start, block in self._blocks:
+            if block_start <= start and end <= block_start + len(block):
+                return block[start - block_start : end - block_start]
+        return None
+
+    @trace.traced("network")
+    def fetch(self, start: int, end: int) -> None:
+        """Fetch bytes start to end (exclusive) of the file, unless they were fetched already."""
+        end = min(end, self.size)
+        if start >= end or self._cached(start, end) is not None:
+            return
+        util.verbose_print(self.fetch, f"Fetching bytes {start}-{end - 1} of {self.url}")
+        with pool.get_pool().open(self.url, {"Range": f"bytes={start}-{end - 1}"}) as res:
+            data = res.read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        if res.status != 206:
+            util.verbose_print(self.fetch, "Server ignored the range request, keeping the whole file in memory")
+            self._blocks = [(0, data)]
+            self.size = len(data)
+            return
+        self._blocks.append((start, data))
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.position + size, self.size)
+        if self.position >= end:
+            return b""
+        data = self._cached(self.position, end)
+        if data is None:
+            self.fetch(self.position, max(end, self.position + READAHEAD))
+            data = self._cached(self.position, end) or b""
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def metadata_url(pkg: PackageObject, dist: Distribution) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the URL of the PEP 658 metadata file the index provides for dist,
+    with its sha256 digest (if published). The URL is None if there is none.
+    """
+    for url in pkg.http_response.get("urls") or []:
+        if url.get("filename") != dist.filename:
+            continue
+        # 'data-dist-info-metadata' is the name PEP 658 originally used
+        available = url.get("core-metadata", url.get("data-dist-info-metadata"))
+        if available:
+            digest = available.get("sha256") if isinstance(available, dict) else None
+            return dist.download_url + ".metadata", digest
+    return None, None
+
+
+def parse_metadata(text: str) -> Dict[str, Any]:
+    """
+    Convert core metadata (a wheel's METADATA file) to a dict the way PEP 566
+    describes: keys are lowercased with underscores, multiple-use fields are
+    lists, and the description is the message body if not given as a header.
+    """
+    message = HeaderParser().parsestr(text)
+    metadata: Dict[str, Any] = {}
+    for key, value in message.items():
+        key = key.lower().replace("-", "_")
+        if key in MULTIPLE_USE_FIELDS:
+            metadata.setdefault(key, []).append(value)
+        elif key == "keywords":
+            metadata[key] = [_ for _ in re.split(r"[,\s]+", value) if _]
+        else:
+            metadata[key] = value
+    body = message.get_payload()
+    if body and body.strip() and "description" not in metadata:
+        metadata["description"] = body
+    return metadata
+
+
+def parse_entry_points(text: str) -> Dict[str, Dict[str, str]]:
+    """Return the entry points in an entry_points.txt file, by group."""
+    parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+    parser.optionxform = str  # type: ignore  # entry point names are case-sensitive
+    parser.read_string(text)
+    return {group: dict(parser[group]) for group in parser.sections()}
+
+
+def _dist_info_member(names: List[str], member: str) -> Optional[str]:
+    for name in names:
+        if re.fullmatch(rf"[^/]+\.dist-info/{re.escape(member)}", name):
+            return name
+    return None
+
+
+def inspect_wheel(
+    pkg: PackageObject, dist: Distribution, entry_points: bool = False, files: bool = False
+) -> Dict[str, Any]:
+    """
+    Read the metadata of a remote wheel without downloading it. Its PEP 658
+    metadata file is used when the index provides one and nothing else was
+    asked for. Otherwise the zip central directory and the needed
+    .dist-info members are fetched with HTTP range requests.
+
+    Returns a record with the wheel's metadata, entry points and file list
+    (as requested), and how many bytes and requests it took.
+    """
+    record: Dict[str, Any] = {"filename": dist.filename, "url": dist.download_url, "size": dist.size}
+    url, digest = metadata_url(pkg, dist)
+    if url and not entry_points and not files:
+        util.verbose_print(inspect_wheel, f"Fetching PEP 658 metadata from {url}")
+        body = pool.get_pool().request(url).body
+        if digest and hashlib.sha256(body).hexdigest() != digest.lower():
+            raise IOError(f"The metadata file of {dist.filename} does not match its published sha256 digest.")
+        record.update(source="metadata-file", requests=1, bytes_fetched=len(body))
+        with trace.span("metadata", "parse"):
+            record["metadata"] = parse_metadata(body.decode("utf-8", "replace"))
+        return record
+
+    util.verbose_print(inspect_wheel, f"Reading the zip central directory of {dist.download_url}")
+    size = dist.size or download._probe(dist.download_url)["size"]
+    if not size:
+        raise IOError(f"Unable to determine the size of {dist.filename}.")
+    remote = HTTPRangeFile(dist.download_url, size)
+    # the end of central directory record (and usually the whole directory) is in the last 64 KiB
+    remote.fetch(max(0, size - READAHEAD), size)
+    with zipfile.ZipFile(remote) as archive:
+        infos = archive.infolist()
+        names = [info.filename for info in infos]
+        wanted = {"metadata": "METADATA"}
+        if entry_points:
+            wanted["entry_points"] = "entry_points.txt"
+        contents = {}
+        for key, member in wanted.items():
+            name = _dist_info_member(names, member)
+            if name is None:
+                continue
+            info = archive.getinfo(name)
+            # local file header (30 bytes, plus name and extra field) followed by the compressed data
+            remote.fetch(info.header_offset, info.header_offset + 30 + len(name) + 1024 + info.compress_size)
+            contents[key] = archive.read(info).decode("utf-8", "replace")
+    record.update(source="range-requests", requests=remote.requests, bytes_fetched=remote.bytes_fetched)
+    with trace.span("metadata", "parse"):
+        record["metadata"] = parse_metadata(contents["metadata"]) if "metadata" in contents else None
+        if entry_points:
+            record["entry_points"] = parse_entry_points(contents.get("entry_points", ""))
+    if files:
+        record["files"] = [
+            {"path": info.filename, "size": info.file_size, "compressed_size": info.compress_size}
+            for info in infos
+            if not info.is_dir()
+        ]
+    return record
@@ -0,0 +1,20 @@
+import pytest
+from benchmarks.fakepypi import FakePyPI
+from benchmarks.suite import configure
+
+
+@pytest.fixture(scope="session")
+def fakepypi():
+    """A local fake PyPI, shared by every test. Tests add the projects and files they need to it."""
+    with FakePyPI(recordings=None) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def otlet_config(fakepypi, tmp_path, monkeypatch):
+    """Point otlet at the fake PyPI, with its cache, store and snapshot directories in a fresh temporary directory."""
+    monkeypatch.setenv("OTLET_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("OTLET_STORE", "OTLET_STORE_DIR", "OTLET_SNAPSHOT", "OTLET_INDEX_URL", "OTLET_FILES_URL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OTLET_NO_DAEMON", "1")
+    configure(fakepypi.index_url)
@@ -0,0 +1,87 @@
+import sys
+import json
+import signal
+import pytest
+from benchmarks.fakepypi import _with_etag
+from otlet_cli import cli
+
+
+def vulnerability(id, fixed_in, aliases=(), withdrawn=None):
+    return {
+        "aliases": list(aliases),
+        "details": "",
+        "fixed_in": fixed_in,
+        "id": id,
+        "link": f"https://osv.dev/vulnerability/{id}",
+        "source": "osv",
+        "withdrawn": withdrawn,
+    }
+
+
+def add_vulnerable_project(fakepypi, name, vulnerabilities):
+    fakepypi.add_project(name, releases=3)
+    data = json.loads(fakepypi.projects[name][0])
+    data["vulnerabilities"] = vulnerabilities
+    fakepypi.projects[name] = _with_etag(json.dumps(data).encode())
+
+
+@pytest.fixture
+def requirements(fakepypi, tmp_path, monkeypatch):
+    add_vulnerable_project(
+        fakepypi,
+        "audit-vulnerable",
+        [
+            vulnerability("PYSEC-1", ["0.0.4"], aliases=["CVE-1"]),
+            vulnerability("PYSEC-2", ["0.0.5", "0.1.0"]),
+            vulnerability("PYSEC-3", ["0.0.4"], withdrawn="2024-01-01T00:00:00Z"),
+        ],
+    )
+    add_vulnerable_project(fakepypi, "audit-unfixed", [vulnerability("PYSEC-4", [])])
+    fakepypi.add_project("audit-clean")
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    path = tmp_path / "requirements.txt"
+    path.write_text("audit-vulnerable\naudit-unfixed\naudit-clean  # no known vulnerabilities\n")
+    return str(path)
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+@pytest.mark.parametrize("max_vulns, code", [(None, 1), ("2", 1), ("3", 0), ("10", 0)])
+def test_exit_code_follows_max_vulns(requirements, monkeypatch, capsys, max_vulns, code):
+    argv = ["audit", "-f", requirements] + (["--max-vulns", max_vulns] if max_vulns else [])
+    assert run(monkeypatch, *argv) == code
+    out = capsys.readouterr().out
+    # the withdrawn vulnerability is not counted
+    assert "3 known vulnerabilities found in 2 of 3 packages" in out
+    assert "PYSEC-3" not in out
+
+
+def test_fixed_versions(requirements, monkeypatch, capsys):
+    assert run(monkeypatch, "--format", "json", "audit", "-f", requirements) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert report["summary"] == {"packages": 3, "vulnerable_packages": 2, "vulnerabilities": 3, "errors": 0}
+    # the oldest release fixing every vulnerability, unless one is not fixed at all
+    assert [package["fixed_in"] for package in report["packages"]] == ["0.0.5", None, None]
+
+
+def test_ignored_vulnerabilities_are_not_counted(requirements, monkeypatch, capsys):
+    argv = ["--format", "json", "audit", "-f", requirements, "--ignore", "CVE-1", "--ignore", "PYSEC-4"]
+    assert run(monkeypatch, *argv, "--max-vulns", "1") == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["summary"]["vulnerabilities"] == 1
+    assert [vuln["id"] for vuln in report["packages"][0]["vulnerabilities"]] == ["PYSEC-2"]
+    assert run(monkeypatch, *argv) == 1
+
+
+def test_lookup_errors_fail_the_audit(fakepypi, tmp_path, monkeypatch, capsys):
+    fakepypi.add_project("audit-found")
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    path = tmp_path / "requirements.txt"
+    path.write_text("audit-found\naudit-not-found==1.0\n")
+    assert run(monkeypatch, "audit", "-f", str(path), "--max-vulns", "5") == 1
+    assert "audit-not-found==1.0" in capsys.readouterr().err
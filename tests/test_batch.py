@@ -0,0 +1,80 @@
+import io
+import sys
+import json
+import signal
+import pytest
+from otlet.exceptions import PyPIPackageNotFound, PyPIPackageVersionNotFound
+from otlet_cli import batch, cli
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("six", ("six", None)),
+        ("six==1.16.0", ("six", "1.16.0")),
+        ("six === 1.16.0", ("six", "1.16.0")),
+        ("  zope.interface == 5.4.0  # pinned for now", ("zope.interface", "5.4.0")),
+        ("requests[socks,security]==2.31.0", ("requests", "2.31.0")),
+        ("urllib3>=1.26,<2", ("urllib3", None)),
+        ("idna~=3.4", ("idna", None)),
+        ("django==4.*", ("django", None)),
+        ("colorama==0.4.6; sys_platform == 'win32'", ("colorama", "0.4.6")),
+        ("", None),
+        ("# a comment", None),
+        ("-r other.txt", None),
+        ("--index-url https://example.com/simple", None),
+        ("https://example.com/six-1.16.0.tar.gz", None),
+        ("git+https://github.com/benjaminp/six.git#egg=six", None),
+    ],
+)
+def test_parse_spec(line, expected):
+    spec = batch.parse_spec(line)
+    assert (spec and (spec.name, spec.version)) == expected
+
+
+def test_read_specs(tmp_path, monkeypatch):
+    path = tmp_path / "requirements.txt"
+    path.write_text("# tools\nsix==1.16.0\n\n-e .\nidna>=3\n./local/package\n")
+    specs = batch.read_specs(str(path))
+    assert [(spec.line, spec.name, spec.version) for spec in specs] == [
+        ("six==1.16.0", "six", "1.16.0"),
+        ("idna>=3", "idna", None),
+    ]
+    monkeypatch.setattr(sys, "stdin", io.StringIO("six\nidna\n"))
+    assert [spec.name for spec in batch.read_specs("-")] == ["six", "idna"]
+
+
+def test_fetch_packages_keeps_order_and_errors(fakepypi):
+    for name in ("batch-a", "batch-b"):
+        fakepypi.add_project(name, releases=2)
+    specs = [batch.parse_spec(line) for line in ("batch-b", "batch-missing", "batch-a==0.0.9", "batch-a")]
+    results = list(batch.fetch_packages(specs, jobs=4))
+    assert [spec for spec, _ in results] == specs
+    assert results[0][1].name == "batch-b"
+    assert isinstance(results[1][1], PyPIPackageNotFound)
+    assert isinstance(results[2][1], PyPIPackageVersionNotFound)
+    assert str(results[3][1].version) == "0.0.2"
+
+
+def run(monkeypatch, fakepypi, *argv):
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+def test_batch_reports_every_error(fakepypi, tmp_path, monkeypatch, capsys):
+    fakepypi.add_project("batch-found", releases=3)
+    path = tmp_path / "requirements.txt"
+    path.write_text("batch-found\nbatch-lost\nbatch-found\nbatch-gone  # also missing\n")
+    assert run(monkeypatch, fakepypi, "batch", "-f", str(path)) == 1
+    captured = capsys.readouterr()
+    assert [line.split(":")[1].strip() for line in captured.err.splitlines()] == ["batch-lost", "batch-gone"]
+    assert captured.out.count("batch-found v0.0.3") == 2
+
+    assert run(monkeypatch, fakepypi, "--format", "ndjson", "batch", "-f", str(path)) == 1
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["spec"] for record in records] == ["batch-found", "batch-lost", "batch-found", "batch-gone"]
+    assert ["error" in record for record in records] == [False, True, False, True]
+    assert records[0]["version"] == "0.0.3"
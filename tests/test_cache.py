@@ -0,0 +1,117 @@
+import os
+import time
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler
+from otlet_cli import api, cache, config
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    """Enable the metadata cache, and record the status of every response the fake PyPI sends."""
+    monkeypatch.setitem(config, "no_cache", False)
+    monkeypatch.setattr(cache, "_metadata_cache", None)
+    statuses = []
+    send_response = FakePyPIRequestHandler.send_response
+
+    def record(self, code, message=None):
+        statuses.append(code)
+        send_response(self, code, message)
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "send_response", record)
+    return statuses
+
+
+def test_fresh_entry_is_served_from_cache(fakepypi, responses):
+    fakepypi.add_project("cached-fresh")
+    url = f"{fakepypi.index_url}/cached-fresh/json"
+    body = api.fetch_json(url)
+    assert body == fakepypi.projects["cached-fresh"][0]
+    assert api.fetch_json(url) == body
+    assert responses == [200]
+
+
+def test_stale_entry_is_revalidated(fakepypi, responses, monkeypatch):
+    monkeypatch.setenv("OTLET_CACHE_TTL", "0")
+    fakepypi.add_project("cached-stale")
+    url = f"{fakepypi.index_url}/cached-stale/json"
+    body = api.fetch_json(url)
+    fetched = cache.get_cache().get(url).fetched
+    assert api.fetch_json(url) == body
+    assert responses == [200, 304]
+    # a '304 Not Modified' resets the entry's TTL
+    assert cache.get_cache().get(url).fetched > fetched
+
+    fakepypi.add_project("cached-stale", releases=2)
+    assert api.fetch_json(url) == fakepypi.projects["cached-stale"][0] != body
+    assert responses == [200, 304, 200]
+    assert cache.get_cache().get(url).body == fakepypi.projects["cached-stale"][0]
+
+
+def test_refresh_revalidates_fresh_entry(fakepypi, responses):
+    fakepypi.add_project("cached-refresh")
+    url = f"{fakepypi.index_url}/cached-refresh/json"
+    api.fetch_json(url)
+    api.fetch_json(url, refresh=True)
+    assert responses == [200, 304]
+
+
+def test_no_cache(fakepypi, responses, monkeypatch):
+    monkeypatch.setitem(config, "no_cache", True)
+    fakepypi.add_project("cached-never")
+    url = f"{fakepypi.index_url}/cached-never/json"
+    api.fetch_json(url)
+    api.fetch_json(url)
+    assert responses == [200, 200]
+
+
+def test_entry_expiry(tmp_path):
+    _cache = cache.MetadataCache(str(tmp_path), ttl=60)
+    _cache.put("https://pypi.org/pypi/six/json", b"{}", '"abc"')
+    entry = _cache.get("https://pypi.org/pypi/six/json")
+    assert (entry.body, entry.etag) == (b"{}", '"abc"')
+    assert entry.is_fresh(_cache.ttl)
+    assert not entry._replace(fetched=time.time() - 61).is_fresh(_cache.ttl)
+    assert _cache.get("https://pypi.org/pypi/other/json") is None
+
+
+@pytest.mark.parametrize("value, expected", [("30", 30), ("0", 0), ("ten", 600), ("-5", 600), ("", 600)])
+def test_ttl_from_environment(monkeypatch, capsys, value, expected):
+    monkeypatch.setenv("OTLET_CACHE_TTL", value)
+    assert cache.MetadataCache().ttl == expected
+    assert ("OTLET_CACHE_TTL" in capsys.readouterr().err) == (expected == 600 and value != "")
+
+
+def test_prune(tmp_path):
+    _cache = cache.MetadataCache(str(tmp_path))
+    now = time.time()
+    sizes = []
+    for num in range(4):
+        url = f"https://pypi.org/pypi/p{num}/json"
+        _cache.put(url, b"x" * 100)
+        # p0 was used longest ago
+        os.utime(_cache._entry_path(url), (now - 1000 * (4 - num), now - 1000 * (4 - num)))
+        sizes.append(os.path.getsize(_cache._entry_path(url)))
+    assert (_cache.stats()["entries"], _cache.stats()["size"]) == (4, sum(sizes))
+
+    assert _cache.prune(max_age=2500) == (2, sizes[0] + sizes[1])
+    assert _cache.get("https://pypi.org/pypi/p1/json") is None
+    assert _cache.prune(max_size=sizes[3]) == (1, sizes[2])
+    assert _cache.get("https://pypi.org/pypi/p3/json") is not None
+
+
+def test_prune_skips_files_being_written(tmp_path):
+    _cache = cache.MetadataCache(str(tmp_path))
+    _cache.put("https://pypi.org/pypi/six/json", b"{}")
+    entry_dir = os.path.dirname(_cache._entry_path("https://pypi.org/pypi/six/json"))
+    writing = os.path.join(entry_dir, "tmpwriting.tmp")
+    stale = os.path.join(entry_dir, "tmpstale.tmp")
+    for path in (writing, stale):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - cache.STALE_TMP_AGE - 60
+    os.utime(stale, (old, old))
+    stats = _cache.stats()
+    assert stats["entries"] == 1
+    assert _cache.prune(max_size=0) == (1, stats["size"])
+    assert os.path.exists(writing)
+    assert not os.path.exists(stale)
@@ -0,0 +1,88 @@
+import json
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag
+from otlet_cli import catalog
+
+NAMES = ["requests", "requests-oauthlib", "Requests_Toolbelt", "request", "numpy", "numba", "six", "a", "zope.interface"]
+
+
+@pytest.fixture
+def names_catalog(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    assert catalog.write_catalog(NAMES + ["not a name!"], path, "https://pypi.org/simple/") == len(NAMES)
+    _catalog = catalog.Catalog(path)
+    yield _catalog
+    _catalog.close()
+
+
+def test_prefix_lookup(names_catalog):
+    assert len(names_catalog) == len(NAMES)
+    assert names_catalog.complete("requests") == ["requests", "requests-oauthlib", "requests-toolbelt"]
+    assert names_catalog.complete("Requests_") == ["requests-oauthlib", "requests-toolbelt"]
+    assert names_catalog.complete("requests", limit=2) == ["requests", "requests-oauthlib"]
+    assert names_catalog.complete("num") == ["numba", "numpy"]
+    # shorter than the offset table's prefixes, so the whole catalog is searched
+    assert names_catalog.complete("n") == ["numba", "numpy"]
+    assert names_catalog.complete("a") == ["a"]
+    assert names_catalog.complete("") == sorted(catalog.canonical_name(name) for name in NAMES)
+    assert names_catalog.complete("zz") == []
+    assert names_catalog.complete("pandas") == []
+
+
+def test_contains(names_catalog):
+    assert "Zope.Interface" in names_catalog
+    assert "request" in names_catalog and "requests" in names_catalog
+    assert "req" not in names_catalog
+    assert "requests-oauth" not in names_catalog
+
+
+def test_suggestions(names_catalog):
+    assert names_catalog.suggest("reqeusts")[0] == "requests"
+    assert names_catalog.suggest("nunpy") == ["numpy"]
+    # names are also looked up by the second character, for a stray first one
+    assert names_catalog.suggest("xnumpy") == ["numpy"]
+    assert names_catalog.suggest("") == []
+    assert names_catalog.suggest("completely-different") == []
+
+
+@pytest.fixture
+def simple_index(fakepypi, monkeypatch):
+    """Serve a PEP 691 simple index of NAMES from the fake PyPI, recording each response's status."""
+    index = _with_etag(json.dumps({"meta": {"api-version": "1.0"}, "projects": [{"name": name} for name in NAMES]}).encode())
+    statuses = []
+    respond = FakePyPIRequestHandler.respond
+    send_response = FakePyPIRequestHandler.send_response
+
+    def respond_simple(self, head):
+        if self.path.rstrip("/") != "/simple":
+            return respond(self, head)
+        self.send_data(*index, catalog.SIMPLE_JSON, head)
+
+    def record(self, code, message=None):
+        if self.path.rstrip("/") == "/simple":
+            statuses.append(code)
+        send_response(self, code, message)
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "respond", respond_simple)
+    monkeypatch.setattr(FakePyPIRequestHandler, "send_response", record)
+    return statuses
+
+
+def test_sync(simple_index, tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    assert catalog.sync(path) == (len(NAMES), True)
+    # revalidated with the catalog's ETag
+    assert catalog.sync(path) == (len(NAMES), False)
+    assert catalog.sync(path, force=True) == (len(NAMES), True)
+    assert simple_index == [200, 304, 200]
+    _catalog = catalog.Catalog(path)
+    assert _catalog.header["source"] == catalog.simple_url()
+    assert _catalog.complete("six") == ["six"]
+    _catalog.close()
+
+
+def test_sync_replaces_unreadable_catalog(simple_index, tmp_path):
+    path = tmp_path / "catalog.bin"
+    path.write_bytes(b"not a catalog")
+    assert catalog.sync(str(path)) == (len(NAMES), True)
+    assert simple_index == [200]
@@ -0,0 +1,101 @@
+import json
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag
+from otlet_cli import api, deps
+
+
+@pytest.mark.parametrize(
+    "constraints, expected",
+    [
+        (["~=1.4.5"], [">=1.4.5", "<1.5"]),
+        (["~=2.2"], [">=2.2", "<3"]),
+        (["==2.*"], [">=2", "<3"]),
+        (["!=2.*", ">=1"], [">=1"]),
+        (["===1.0"], ["==1.0"]),
+        (["<3", "!=2.1"], ["<3", "!=2.1"]),
+        (None, []),
+    ],
+)
+def test_expand_constraints(constraints, expected):
+    assert deps.expand_constraints(constraints) == expected
+
+
+@pytest.fixture
+def requests_made(monkeypatch):
+    """Record the path of every request the fake PyPI answers."""
+    paths = []
+    respond = FakePyPIRequestHandler.respond
+
+    def record(self, head):
+        paths.append(self.path)
+        respond(self, head)
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "respond", record)
+    return paths
+
+
+def test_shared_dependencies_are_fetched_once(fakepypi, requests_made):
+    # a diamond: both deps-left and deps-right require deps-shared
+    fakepypi.add_project("deps-diamond", requires_dist=["deps-left", "deps_right>=0.0.1"])
+    fakepypi.add_project("deps-left", requires_dist=["deps-shared"])
+    fakepypi.add_project("deps-right", requires_dist=["Deps.Shared (>=0.0.1)"])
+    fakepypi.add_project("deps-shared", releases=3)
+    pkg = api.OtletPackageObject("deps-diamond")
+    root = deps.DependencyResolver(jobs=4).resolve(pkg)
+
+    (_, left), (_, right) = root.children
+    assert [(node.name, node.version) for _, node in root.children] == [("deps-left", "0.0.1"), ("deps_right", "0.0.1")]
+    assert left.children[0][1] is right.children[0][1]
+    assert left.children[0][1].version == "0.0.3"
+    assert sorted(requests_made) == [f"/pypi/{name}/json" for name in ("deps-diamond", "deps-left", "deps-shared", "deps_right")]
+
+    flat = deps.flatten(root)
+    assert [(node.key, sorted(parent.name for parent in parents)) for node, parents in flat] == [
+        (("deps-left", "0.0.1"), ["deps-diamond"]),
+        (("deps-right", "0.0.1"), ["deps-diamond"]),
+        (("deps-shared", "0.0.3"), ["deps-left", "deps_right"]),
+    ]
+
+
+def test_cycles_terminate(fakepypi, requests_made):
+    fakepypi.add_project("deps-cycle-a", requires_dist=["deps-cycle-b"])
+    fakepypi.add_project("deps-cycle-b", requires_dist=["deps-cycle-a"])
+    root = deps.DependencyResolver().resolve(api.OtletPackageObject("deps-cycle-a"))
+    b = root.children[0][1]
+    # deps-cycle-b's dependency is the root itself, which is not expanded again
+    assert b.children[0][1] is root
+    assert [(parent.name, node.name) for parent, node in root.walk()] == [
+        ("deps-cycle-a", "deps-cycle-b"),
+        ("deps-cycle-b", "deps-cycle-a"),
+    ]
+    assert len(requests_made) == 2
+
+
+def test_depth_and_unresolvable_requirements(fakepypi):
+    fakepypi.add_project("deps-errors", requires_dist=["deps-nested", "deps-not-on-index", "deps-nested-too-new>=1.0"])
+    fakepypi.add_project("deps-nested", requires_dist=["deps-nested-deeper"])
+    fakepypi.add_project("deps-nested-too-new", releases=2)
+    root = deps.DependencyResolver().resolve(api.OtletPackageObject("deps-errors"), depth=1)
+    nested, missing, too_new = (node for _, node in root.children)
+    # only one level down, so deps-nested's own dependencies are never looked up
+    assert not nested.expanded and nested.children == []
+    assert missing.version is None and missing.error
+    assert too_new.version is None and too_new.error == "no release matches >=1.0"
+
+
+def test_best_version_skips_yanked_and_prereleases(fakepypi):
+    fakepypi.add_project("deps-best", releases=3)
+    pkg = api.OtletPackageObject("deps-best")
+    assert deps.best_version(pkg, None) == "0.0.3"
+    assert deps.best_version(pkg, ["<0.0.3"]) == "0.0.2"
+    assert deps.best_version(pkg, ["~=0.0.1", "!=0.0.2"]) == "0.0.3"
+    assert deps.best_version(pkg, [">0.0.3"]) is None
+
+    data = json.loads(fakepypi.projects["deps-best"][0])
+    data["releases"]["0.0.3"][0]["yanked"] = True
+    data["releases"]["0.1.0rc1"] = data["releases"].pop("0.0.1")
+    fakepypi.projects["deps-best"] = _with_etag(json.dumps(data).encode())
+    pkg = api.OtletPackageObject("deps-best")
+    assert deps.best_version(pkg, None) == "0.0.2"
+    # a pre-release is only picked if no final release fits
+    assert deps.best_version(pkg, [">=0.0.3"]) == "0.1.0rc1"
@@ -0,0 +1,121 @@
+import sys
+import json
+import signal
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag, canonical_name
+from otlet_cli import cli, diff
+
+
+@pytest.fixture
+def release_json(fakepypi, monkeypatch):
+    """
+    Serve the release endpoint ('/pypi/<name>/<version>/json') for releases added
+    through the returned function, which takes the project name, the version, and
+    the fields of 'info' that differ from the project's.
+    """
+    releases = {}
+    respond = FakePyPIRequestHandler.respond
+
+    def respond_release(self, head):
+        segments = self.path.strip("/").split("/")
+        if len(segments) == 4 and segments[0] == "pypi" and segments[3] == "json":
+            release = releases.get((canonical_name(segments[1]), segments[2]))
+            if release is None:
+                return self.send_empty(404)
+            return self.send_data(*release, "application/json", head)
+        respond(self, head)
+
+    def add_release(name, version, vulnerabilities=(), **info):
+        data = json.loads(fakepypi.projects[canonical_name(name)][0])
+        del data["releases"]
+        data["info"].update(version=version, **info)
+        data["urls"] = []
+        data["vulnerabilities"] = [
+            {"aliases": [], "details": "", "fixed_in": [], "id": id, "link": "", "source": "osv"}
+            for id in vulnerabilities
+        ]
+        releases[(canonical_name(name), version)] = _with_etag(json.dumps(data).encode())
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "respond", respond_release)
+    return add_release
+
+
+@pytest.fixture
+def releases(fakepypi, release_json):
+    fakepypi.add_project("diff-me", releases=2)
+    release_json(
+        "diff-me",
+        "0.0.1",
+        requires_dist=["idna>=2.5", "six", "chardet (<5)", "colorama; platform_system == 'NotThisPlatform'"],
+        requires_python=">=3.6",
+        vulnerabilities=["PYSEC-1", "PYSEC-2"],
+    )
+    release_json(
+        "diff-me",
+        "0.0.2",
+        requires_dist=["IDNA>=2.5,<4", "Six", "charset-normalizer>=2"],
+        requires_python=">=3.7",
+        yanked=True,
+        yanked_reason="broken wheel",
+        vulnerabilities=["PYSEC-2", "PYSEC-3"],
+    )
+
+
+def test_diff_releases(releases):
+    old, new = diff.fetch_releases("diff-me", "0.0.1", "0.0.2")
+    result = diff.diff_releases(old, new)
+    dependencies = result["dependencies"]
+    assert [requirement["name"] for requirement in dependencies["added"]] == ["charset-normalizer"]
+    # colorama doesn't apply to this platform, so it isn't compared
+    assert [requirement["name"] for requirement in dependencies["removed"]] == ["chardet"]
+    # only a change in constraints counts, not in how the name is spelled
+    assert [
+        (change["old"]["version_constraints"], change["new"]["version_constraints"]) for change in dependencies["changed"]
+    ] == [([">=2.5"], ["<4", ">=2.5"])]
+    assert result["requires_python"] == {"old": ">=3.6", "new": ">=3.7"}
+    assert result["yanked"] == {"old": False, "new": True, "new_reason": "broken wheel"}
+    assert result["vulnerabilities"] == {"fixed": ["PYSEC-1"], "introduced": ["PYSEC-3"], "unfixed": ["PYSEC-2"]}
+
+
+def test_format_requirement():
+    requirement = {"name": "idna", "version_constraints": ["<4", ">=2.5"], "markers": {}, "extras": []}
+    assert diff.format_requirement(requirement) == "idna (<4, >=2.5)"
+    assert diff.format_requirement({**requirement, "markers": {"python_version": ">=3.7"}}) == (
+        "idna (<4, >=2.5); python_version >=3.7"
+    )
+    assert diff.format_requirement({**requirement, "version_constraints": [], "markers": {"os_name": "nt"}}) == (
+        'idna; os_name == "nt"'
+    )
+
+
+def run(monkeypatch, fakepypi, *argv):
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+def test_diff_output(fakepypi, releases, monkeypatch, capsys):
+    assert run(monkeypatch, fakepypi, "diff", "diff-me", "0.0.1", "0.0.2") == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "Comparing diff-me v0.0.1 to diff-me v0.0.2"
+    assert out[2:6] == [
+        "Dependencies:",
+        "\t\u001b[32m+ charset-normalizer (>=2)\u001b[0m",
+        "\t\u001b[31m- chardet (<5)\u001b[0m",
+        "\t\u001b[33m~ idna (>=2.5) -> IDNA (<4, >=2.5)\u001b[0m",
+    ]
+    assert "Python Version(s): \u001b[33m>=3.6 -> >=3.7\u001b[0m" in out
+    assert "\u001b[1m\u001b[33mdiff-me v0.0.2 is yanked (broken wheel)\u001b[0m" in out
+    assert "Vulnerabilities: 1 fixed, 1 introduced, 1 still unfixed" in out
+
+    assert run(monkeypatch, fakepypi, "--format", "json", "diff", "diff-me", "0.0.2", "0.0.2") == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["old_version"] == result["new_version"] == "0.0.2"
+    assert result["dependencies"] == {"added": [], "removed": [], "changed": []}
+
+
+def test_missing_release(fakepypi, releases, monkeypatch, capsys):
+    assert run(monkeypatch, fakepypi, "diff", "diff-me", "0.0.1", "9.9") == 1
+    assert "9.9" in capsys.readouterr().err
@@ -0,0 +1,556 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import hashlib
+import threading
+import pytest
+from urllib.error import URLError
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag
+from otlet_cli import api, cli, download
+
+MiB = 1024 * 1024
+
+
+def sha256_of(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def interrupted_download(url, dest, sha256, after):
+    """Download url over two connections, cancelling once more than after bytes were received."""
+    cancel = threading.Event()
+    progress = download.DownloadProgress()
+    progress.add_listener(lambda p, event: event == "progress" and p.bytes_read > after and cancel.set())
+    return download._download(url, dest, 2, 64 * 1024, cancel, {"sha256": sha256}, progress)
+
+
+def test_download_verifies_sha256(fakepypi, tmp_path):
+    url, sha256 = fakepypi.add_file("verified-1.0-py3-none-any.whl", 9 * MiB)
+    dest = str(tmp_path / "verified.whl")
+    progress = download._download(url, dest, 2, digests={"sha256": sha256})
+    assert progress.status == 0
+    assert sha256_of(dest) == sha256
+    assert not os.path.exists(dest + ".part") and not os.path.exists(dest + ".part.json")
+
+
+def test_download_rejects_wrong_digest(fakepypi, tmp_path):
+    url, _ = fakepypi.add_file("tampered-1.0-py3-none-any.whl", 64 * 1024)
+    dest = str(tmp_path / "tampered.whl")
+    progress = download._download(url, dest, 1, digests={"sha256": "0" * 64})
+    assert progress.status == 1
+    assert not os.path.exists(dest)
+
+
+class SegmentWriter:
+    """Writes data into a preallocated file in segments, the way _download_segment reports it to the hasher."""
+
+    def __init__(self, path, data, count, buffer_size=1000):
+        self.path = path
+        self.data = data
+        bounds = [len(data) * i // count for i in range(count + 1)]
+        self.segments = [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]
+        with open(path, "wb") as f:
+            f.truncate(len(data))
+        self.hasher = download._OrderedHasher(path, ["sha256", "md5"], buffer_size, self.segments)
+        self.lock = threading.Lock()
+
+    def write(self, number, size):
+        """Write the next size bytes of segment number."""
+        segment = self.segments[number]
+        with self.lock:
+            offset = segment[0] + segment[2]
+            chunk = self.data[offset : min(offset + size, segment[1] + 1)]
+        with open(self.path, "r+b", buffering=0) as f:
+            f.seek(offset)
+            f.write(chunk)
+        with self.lock:
+            segment[2] += len(chunk)
+        self.hasher.update(offset, chunk)
+
+    def done(self, number):
+        return self.segments[number][0] + self.segments[number][2] > self.segments[number][1]
+
+    def hexdigests(self):
+        return self.hasher.hexdigests()
+
+
+def expected_digests(data):
+    return {"sha256": hashlib.sha256(data).hexdigest(), "md5": hashlib.md5(data).hexdigest()}
+
+
+def test_hasher_in_order(tmp_path):
+    data = os.urandom(10000)
+    writer = SegmentWriter(str(tmp_path / "file.part"), data, 1)
+    while not writer.done(0):
+        writer.write(0, 999)
+    assert writer.hasher.position == len(data)
+    assert writer.hexdigests() == expected_digests(data)
+
+
+@pytest.fixture
+def read_back(monkeypatch):
+    """Count the bytes the download module reads back from files."""
+    count = [0]
+
+    class CountingReader:
+        def __init__(self, f):
+            self.f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def seek(self, *args):
+            return self.f.seek(*args)
+
+        def read(self, size=-1):
+            data = self.f.read(size)
+            count[0] += len(data)
+            return data
+
+    monkeypatch.setattr(
+        download, "open", lambda path, mode="r", **kwargs: CountingReader(open(path, mode, **kwargs)), raising=False
+    )
+    return count
+
+
+def test_hasher_catches_up_on_segments_written_ahead(tmp_path, read_back):
+    data = os.urandom(30000)
+    writer = SegmentWriter(str(tmp_path / "file.part"), data, 3)
+    # the last segment completes first, then half of the middle one
+    while not writer.done(2):
+        writer.write(2, 4000)
+    writer.write(1, 5000)
+    assert (writer.hasher.position, read_back[0]) == (0, 0)
+    # the first segment is hashed from memory as it arrives
+    writer.write(0, 6000)
+    assert (writer.hasher.position, read_back[0]) == (6000, 0)
+    # once it is complete, the written part of the middle one is read back
+    writer.write(0, 6000)
+    assert (writer.hasher.position, read_back[0]) == (15000, 5000)
+    # the rest of the middle segment arrives at the hash position, and is hashed from memory
+    writer.write(1, 4000)
+    assert (writer.hasher.position, read_back[0]) == (19000, 5000)
+    # completing it catches up on the last segment
+    writer.write(1, 4000)
+    assert (writer.hasher.position, read_back[0]) == (len(data), 15000)
+    assert writer.hexdigests() == expected_digests(data)
+
+
+def test_hasher_waits_for_last_byte_of_segment(tmp_path):
+    data = os.urandom(2000)
+    writer = SegmentWriter(str(tmp_path / "file.part"), data, 2)
+    writer.write(1, 1000)
+    writer.write(0, 999)
+    # the byte before the second segment is not written yet, so its data can't be hashed
+    assert writer.hasher.position == 999
+    writer.write(0, 1)
+    assert writer.hasher.position == len(data)
+    assert writer.hexdigests() == expected_digests(data)
+
+
+def test_hasher_out_of_order_matches_file(tmp_path):
+    data = os.urandom(200000)
+    for seed in range(20):
+        rng = random.Random(seed)
+        writer = SegmentWriter(str(tmp_path / f"file{seed}.part"), data, rng.randint(2, 8))
+        while not all(writer.done(n) for n in range(len(writer.segments))):
+            number = rng.choice([n for n in range(len(writer.segments)) if not writer.done(n)])
+            writer.write(number, rng.randint(1, 20000))
+        assert writer.hasher.position == len(data), seed
+        assert writer.hexdigests() == expected_digests(data), seed
+
+
+def test_hasher_with_concurrent_writers(tmp_path):
+    data = os.urandom(4 * MiB)
+    writer = SegmentWriter(str(tmp_path / "file.part"), data, 8)
+
+    def write_segment(number):
+        while not writer.done(number):
+            writer.write(number, 7777)
+
+    threads = [threading.Thread(target=write_segment, args=(n,)) for n in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert writer.hexdigests() == expected_digests(data)
+
+
+def test_hasher_resumes_from_written_segments(tmp_path):
+    data = os.urandom(30000)
+    writer = SegmentWriter(str(tmp_path / "file.part"), data, 3)
+    # left over from a previous run: the first segment and part of the second
+    writer.write(0, 10000)
+    writer.write(1, 2500)
+    writer.write(2, 5000)
+    resumed = download._OrderedHasher(writer.path, ["sha256", "md5"], 1000, writer.segments)
+    resumed.catch_up()
+    assert resumed.position == 12500
+    writer.hasher = resumed
+    for number in (2, 1):
+        while not writer.done(number):
+            writer.write(number, 3000)
+    assert writer.hexdigests() == expected_digests(data)
+
+
+def test_resume_from_part_json(fakepypi, tmp_path):
+    url, sha256 = fakepypi.add_file("resume-1.0-py3-none-any.whl", 12 * MiB)
+    dest = str(tmp_path / "resume.whl")
+    progress = interrupted_download(url, dest, sha256, 2 * MiB)
+    assert progress.status == 1
+    with open(dest + ".part.json") as f:
+        state = json.load(f)
+    written = sum(segment[2] for segment in state["segments"])
+    assert 0 < written < 12 * MiB
+
+    resumed = []
+    progress = download.DownloadProgress()
+    progress.add_listener(lambda p, event: event == "start" and resumed.append(p.bytes_read))
+    progress = download._download(url, dest, 2, digests={"sha256": sha256}, progress=progress)
+    assert progress.status == 0
+    assert resumed == [written]
+    assert sha256_of(dest) == sha256
+
+
+def test_resume_discarded_if_remote_changed(fakepypi, tmp_path):
+    filename = "changed-1.0-py3-none-any.whl"
+    url, sha256 = fakepypi.add_file(filename, 12 * MiB)
+    dest = str(tmp_path / "changed.whl")
+    assert interrupted_download(url, dest, sha256, 2 * MiB).status == 1
+
+    data = b"x" * (12 * MiB)
+    fakepypi.files[filename] = _with_etag(data)
+    resumed = []
+    progress = download.DownloadProgress()
+    progress.add_listener(lambda p, event: event == "start" and resumed.append(p.bytes_read))
+    progress = download._download(
+        url, dest, 2, digests={"sha256": hashlib.sha256(data).hexdigest()}, progress=progress
+    )
+    assert progress.status == 0
+    assert resumed == [0]
+
+
+def test_truncated_state_restarts(fakepypi, tmp_path):
+    url, sha256 = fakepypi.add_file("truncated-1.0-py3-none-any.whl", 12 * MiB)
+    dest = str(tmp_path / "truncated.whl")
+    assert interrupted_download(url, dest, sha256, 2 * MiB).status == 1
+    with open(dest + ".part.json", "r+") as f:
+        f.truncate(10)
+    assert download._load_state(dest, download._probe(url)) is None
+    assert download._download(url, dest, 2, digests={"sha256": sha256}).status == 0
+    assert sha256_of(dest) == sha256
+
+
+def test_save_state_is_atomic(tmp_path):
+    dest = str(tmp_path / "state.whl")
+    lock = threading.Lock()
+    states = [{"url": "u", "segments": [[n, n, n]] * 20000} for n in range(4)]
+    download._save_state(dest, states[0], lock)
+    done = threading.Event()
+    torn = []
+
+    def save(state):
+        for _ in range(10):
+            download._save_state(dest, state, lock)
+
+    def load():
+        # a reader must always see one complete state, never a partly written one
+        while not done.is_set():
+            with open(dest + ".part.json") as f:
+                data = f.read()
+            try:
+                json.loads(data)
+            except ValueError:
+                torn.append(len(data))
+
+    reader = threading.Thread(target=load)
+    reader.start()
+    writers = [threading.Thread(target=save, args=(state,)) for state in states]
+    for th in writers:
+        th.start()
+    for th in writers:
+        th.join()
+    done.set()
+    reader.join()
+    assert not torn
+    with open(dest + ".part.json") as f:
+        assert json.load(f) in states
+    assert os.listdir(tmp_path) == ["state.whl.part.json"]
+
+
+@pytest.fixture
+def no_head(monkeypatch):
+    monkeypatch.setattr(FakePyPIRequestHandler, "do_HEAD", lambda self: self.send_empty(405))
+
+
+def test_probe_falls_back_to_ranged_get(fakepypi, no_head):
+    url, _ = fakepypi.add_file("nohead-1.0-py3-none-any.whl", 5 * MiB)
+    remote = download._probe(url)
+    assert remote["size"] == 5 * MiB
+    assert remote["accepts_ranges"]
+    assert remote["etag"] == fakepypi.files["nohead-1.0-py3-none-any.whl"][1]
+
+
+def test_download_without_head(fakepypi, no_head, tmp_path):
+    url, sha256 = fakepypi.add_file("nohead2-1.0-py3-none-any.whl", 9 * MiB)
+    dest = str(tmp_path / "nohead.whl")
+    assert download._download(url, dest, 2, digests={"sha256": sha256}).status == 0
+    assert sha256_of(dest) == sha256
+
+
+def without_digest(fakepypi, filename, size):
+    """Serve filename with an ETag that is no MD5 digest, so nothing but its size tells a download is complete."""
+    url, sha256 = fakepypi.add_file(filename, size)
+    fakepypi.files[filename] = (fakepypi.files[filename][0], '"v1"')
+    return url, sha256
+
+
+def rewrite_range(monkeypatch, rewrite):
+    """Have the fake PyPI answer range requests for (start, end) with the range rewrite returns instead."""
+    send_data = FakePyPIRequestHandler.send_data
+
+    def send_rewritten(self, *args, **kwargs):
+        _match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if _match:
+            del self.headers["Range"]
+            self.headers["Range"] = "bytes=%d-%d" % rewrite(int(_match.group(1)), int(_match.group(2)))
+        return send_data(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "send_data", send_rewritten)
+
+
+def test_short_range_keeps_state(fakepypi, monkeypatch, tmp_path):
+    url, sha256 = without_digest(fakepypi, "short-1.0-py3-none-any.whl", 12 * MiB)
+    dest = str(tmp_path / "short.whl")
+    # a valid, but shorter range than requested
+    rewrite_range(monkeypatch, lambda start, end: (start, min(end, start + MiB - 1)))
+    progress = download._download(url, dest, 2)
+    assert progress.status == 1
+    assert "less than requested" in progress.error
+    assert not os.path.exists(dest)
+    assert os.path.exists(dest + ".part.json")
+
+    monkeypatch.undo()
+    assert download._download(url, dest, 2).status == 0
+    assert sha256_of(dest) == sha256
+
+
+def test_misplaced_range_is_rejected(fakepypi, monkeypatch, tmp_path):
+    url, _ = without_digest(fakepypi, "misplaced-1.0-py3-none-any.whl", 12 * MiB)
+    dest = str(tmp_path / "misplaced.whl")
+    rewrite_range(monkeypatch, lambda start, end: (start + 1, end))
+    progress = download._download(url, dest, 2)
+    assert progress.status == 1
+    assert "range" in progress.error
+    assert not os.path.exists(dest)
+
+
+def test_write_all_retries_short_writes():
+    class ShortWrites:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += bytes(data[:3])
+            return min(3, len(data))
+
+    f = ShortWrites()
+    download._write_all(f, b"0123456789")
+    assert f.data == b"0123456789"
+
+
+def test_interrupted_download_exits_non_zero(fakepypi, monkeypatch, tmp_path):
+    fakepypi.add_project("interrupted", wheels=["py3-none-any"], file_size=12 * MiB)
+    pkg = api.OtletPackageObject("interrupted")
+    send_data = FakePyPIRequestHandler.send_data
+
+    def slow_send_data(self, *args, **kwargs):
+        if self.path.endswith(".whl"):
+            time.sleep(0.2)
+        return send_data(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakePyPIRequestHandler, "send_data", slow_send_data)
+    wait = download.DownloadProgress.wait
+    interrupted = []
+
+    def interrupted_wait(self, timeout=None):
+        # ^C while the progress is drawn
+        if not interrupted:
+            interrupted.append(True)
+            raise KeyboardInterrupt
+        return wait(self, timeout)
+
+    monkeypatch.setattr(download.DownloadProgress, "wait", interrupted_wait)
+    dest = str(tmp_path / "interrupted.whl")
+    with pytest.raises(SystemExit) as exc:
+        download.download_dist(pkg, dest, "bdist_wheel")
+    assert exc.value.code == download.INTERRUPTED_EXIT_CODE
+    assert not os.path.exists(dest)
+    assert os.path.exists(dest + ".part.json")
+
+
+@pytest.fixture
+def requirement_set(fakepypi, tmp_path, monkeypatch):
+    """A requirements file with two packages that have wheels, one with only an sdist, and two that fail."""
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    fakepypi.add_project("bulk-a", releases=2, wheels=["py3-none-any"])
+    fakepypi.add_project("bulk-b", wheels=["py2.py3-none-any"], file_size=3 * MiB)
+    fakepypi.add_project("bulk-sdist-only")
+    fakepypi.add_project("bulk-corrupt", wheels=["py3-none-any"])
+    data, _ = fakepypi.files["bulk_corrupt-0.0.1-py3-none-any.whl"]
+    fakepypi.files["bulk_corrupt-0.0.1-py3-none-any.whl"] = _with_etag(b"x" + data[1:])
+    path = tmp_path / "requirements.txt"
+    path.write_text("bulk-a\nbulk_b>=0.0.1\nbulk-sdist-only\nbulk-corrupt\nbulk-missing\n")
+    return str(path)
+
+
+def run_cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+def test_bulk_download(fakepypi, requirement_set, tmp_path, monkeypatch, capsys):
+    dest = tmp_path / "dists"
+    assert run_cli(monkeypatch, "batch", "-f", requirement_set, "--download", str(dest), "--connections", "2") == 1
+    # wheels are preferred, and anything else is taken if there is none
+    assert sorted(os.listdir(dest)) == [
+        "bulk-sdist-only-0.0.1.tar.gz",
+        "bulk_a-0.0.2-py3-none-any.whl",
+        "bulk_b-0.0.1-py2.py3-none-any.whl",
+    ]
+    for filename in os.listdir(dest):
+        assert sha256_of(str(dest / filename)) == hashlib.sha256(fakepypi.files[filename][0]).hexdigest()
+    captured = capsys.readouterr()
+    assert "Downloaded 3 of 4 files to" in captured.out
+    assert [line.split(":")[0] for line in captured.err.splitlines()] == ["otlet", "bulk_corrupt-0.0.1-py3-none-any.whl"]
+    assert "bulk-missing" in captured.err
+    assert "corrupted during download" in captured.err
+
+
+def test_bulk_download_records(fakepypi, requirement_set, tmp_path, monkeypatch, capsys):
+    dest = tmp_path / "wheels"
+    argv = ["--format", "ndjson", "batch", "-f", requirement_set, "--download", str(dest), "-d", "bdist_wheel"]
+    assert run_cli(monkeypatch, *argv) == 1
+    captured = capsys.readouterr()
+    records = {record["spec"]: record for record in map(json.loads, captured.out.splitlines())}
+    assert sorted(records) == ["bulk-a", "bulk-corrupt", "bulk_b>=0.0.1"]
+    assert records["bulk-a"]["source"] == records["bulk_b>=0.0.1"]["source"] == "download"
+    assert records["bulk-a"]["path"] == str(dest / "bulk_a-0.0.2-py3-none-any.whl")
+    assert "error" in records["bulk-corrupt"]
+    assert "No distributions found for bulk-sdist-only" in captured.err
+
+
+def test_bulk_download_from_store(fakepypi, requirement_set, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("OTLET_STORE_DIR", str(tmp_path / "store"))
+    argv = ["--format", "ndjson", "batch", "-f", requirement_set, "--store", "--download"]
+    run_cli(monkeypatch, *argv, str(tmp_path / "first"))
+    capsys.readouterr()
+    run_cli(monkeypatch, *argv, str(tmp_path / "second"))
+    sources = {record["spec"]: record.get("source") for record in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert sources == {"bulk-a": "store", "bulk_b>=0.0.1": "store", "bulk-sdist-only": "store", "bulk-corrupt": None}
+
+
+def test_progress_counts_concurrent_adds():
+    progress = download.DownloadProgress("counted.whl", 16 * 20000 * 3)
+    events = []
+    progress.add_listener(lambda p, event: events.append(event))
+    progress.start(progress.total)
+    seen = []
+
+    def add():
+        for _ in range(20000):
+            progress.add(3)
+
+    def read():
+        # what a progress line sees while the download runs
+        last = 0
+        while not progress.done():
+            bytes_read, eta = progress.bytes_read, progress.eta
+            seen.append(last <= bytes_read <= progress.total and (eta is None or eta >= 0))
+            last = bytes_read
+            download.format_progress(progress)
+
+    # switch threads as often as possible, so unsynchronized updates would get lost
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        threads = [threading.Thread(target=add) for _ in range(16)]
+        for th in readers + threads:
+            th.start()
+        for th in threads:
+            th.join()
+        progress.finish(0)
+        for th in readers:
+            th.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert progress.bytes_read == progress.total
+    assert events.count("progress") == 16 * 20000
+    assert (events[0], events[-1]) == ("start", "finish")
+    assert seen and all(seen)
+
+
+def test_progress_rates():
+    progress = download.DownloadProgress("rates.whl")
+    assert (progress.elapsed, progress.throughput, progress.eta) == (0.0, 0.0, None)
+    progress.start(1000, resumed=400)
+    progress.started -= 2
+    progress.add(200)
+    # only this run's bytes count towards the throughput
+    assert progress.throughput == pytest.approx(100, rel=0.01)
+    assert progress.eta == pytest.approx(4, rel=0.01)
+    assert download.format_progress(progress).startswith("0.6 / 1.0 KiB, 0.0 MiB/s, ")
+    progress.finish(0)
+    elapsed = progress.elapsed
+    time.sleep(0.01)
+    # stopped counting when it finished
+    assert progress.elapsed == elapsed
+    assert progress.eta == 0.0
+
+
+def test_wait_for_progress_from_another_thread():
+    progress = download.DownloadProgress()
+    assert not progress.wait(0.01)
+    threading.Timer(0.05, progress.finish, args=(1, "Download failed: test")).start()
+    assert progress.wait(5)
+    assert (progress.status, progress.error) == (1, "Download failed: test")
+
+
+def test_background_download_reports_progress(fakepypi, tmp_path):
+    url, sha256 = fakepypi.add_file("background-1.0-py3-none-any.whl", 6 * MiB)
+    progress = download.DownloadProgress()
+    events = []
+    progress.add_listener(lambda p, event: events.append((event, threading.current_thread().name)))
+    future = download.download(url, str(tmp_path / "background.whl"), 3, 64 * 1024, {"sha256": sha256}, progress=progress)
+    assert progress.wait(30)
+    assert future.result() is progress
+    assert (progress.status, progress.bytes_read, progress.total) == (0, 6 * MiB, 6 * MiB)
+    assert events[0][0] == "start" and events[-1][0] == "finish"
+    assert {event for event, _ in events[1:-1]} == {"progress"}
+    # reported on the download's own threads
+    assert all(name != threading.current_thread().name for _, name in events)
+
+
+def test_unexpected_error_finishes_progress(tmp_path):
+    # a port nothing listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    progress = download.DownloadProgress()
+    url = f"http://127.0.0.1:{port}/unreachable.whl"
+    future = download.download(url, str(tmp_path / "unreachable.whl"), progress=progress)
+    with pytest.raises(URLError):
+        future.result(30)
+    assert progress.done() and progress.status == 1
+    assert progress.error.startswith("Download failed: ")
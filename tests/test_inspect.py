@@ -0,0 +1,138 @@
+import io
+import os
+import json
+import hashlib
+import zipfile
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag
+from otlet_cli import api, download, wheel
+
+METADATA = """Metadata-Version: 2.1
+Name: inspect-me
+Version: 0.0.1
+Summary: A wheel to inspect
+Classifier: Programming Language :: Python :: 3
+Classifier: License :: OSI Approved :: MIT License
+Requires-Dist: idna (>=2.5)
+Requires-Dist: six
+Keywords: inspect, wheel metadata
+
+The long description.
+"""
+ENTRY_POINTS = """[console_scripts]
+inspect-me = inspect_me.cli:main
+
+[otlet.Plugins]
+Loud = inspect_me:Loud
+"""
+
+
+def build_wheel(dist_info_first: bool = False) -> bytes:
+    members = [
+        # incompressible, so the wheel is much larger than what inspecting it reads
+        ("inspect_me/__init__.py", os.urandom(512 * 1024)),
+        ("inspect_me/cli.py", "def main(): pass\n"),
+    ]
+    dist_info = [
+        ("inspect_me-0.0.1.dist-info/METADATA", METADATA),
+        ("inspect_me-0.0.1.dist-info/entry_points.txt", ENTRY_POINTS),
+        ("inspect_me-0.0.1.dist-info/RECORD", ""),
+    ]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in dist_info + members if dist_info_first else members + dist_info:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def inspected(fakepypi, request):
+    """
+    A project whose wheel is a real zip file, returned with the wheel's
+    Distribution. Parametrize it indirectly with True to put .dist-info first.
+    """
+    fakepypi.add_project("inspect-me", wheels=["py3-none-any"])
+    filename = "inspect_me-0.0.1-py3-none-any.whl"
+    data = build_wheel(getattr(request, "param", False))
+    fakepypi.files[filename] = _with_etag(data)
+    project = json.loads(fakepypi.projects["inspect-me"][0])
+    for file in project["urls"]:
+        if file["filename"] == filename:
+            file["size"], file["digests"]["sha256"] = len(data), hashlib.sha256(data).hexdigest()
+    project["releases"]["0.0.1"] = project["urls"]
+    fakepypi.projects["inspect-me"] = _with_etag(json.dumps(project).encode())
+    pkg = api.OtletPackageObject("inspect-me")
+    return pkg, download.select_dist(pkg, "bdist_wheel", None, None)
+
+
+@pytest.mark.parametrize("inspected, requests", [(False, 1), (True, 2)], indirect=["inspected"])
+def test_metadata_from_range_requests(inspected, requests):
+    pkg, dist = inspected
+    record = wheel.inspect_wheel(pkg, dist)
+    assert record["source"] == "range-requests"
+    # the tail of the file has the central directory, and METADATA too unless it comes first
+    assert record["requests"] == requests
+    assert record["bytes_fetched"] < dist.size / 4
+    metadata = record["metadata"]
+    assert (metadata["name"], metadata["version"]) == ("inspect-me", "0.0.1")
+    assert metadata["requires_dist"] == ["idna (>=2.5)", "six"]
+    assert len(metadata["classifier"]) == 2
+    assert metadata["keywords"] == ["inspect", "wheel", "metadata"]
+    assert metadata["description"].strip() == "The long description."
+
+
+def test_entry_points_and_files(inspected):
+    pkg, dist = inspected
+    record = wheel.inspect_wheel(pkg, dist, entry_points=True, files=True)
+    assert record["entry_points"] == {
+        "console_scripts": {"inspect-me": "inspect_me.cli:main"},
+        "otlet.Plugins": {"Loud": "inspect_me:Loud"},
+    }
+    assert [file["path"] for file in record["files"]] == [
+        "inspect_me/__init__.py",
+        "inspect_me/cli.py",
+        "inspect_me-0.0.1.dist-info/METADATA",
+        "inspect_me-0.0.1.dist-info/entry_points.txt",
+        "inspect_me-0.0.1.dist-info/RECORD",
+    ]
+    assert record["files"][0]["size"] == 512 * 1024
+    assert record["bytes_fetched"] < dist.size / 4
+
+
+def test_server_without_range_support(inspected, monkeypatch):
+    pkg, dist = inspected
+    send_data = FakePyPIRequestHandler.send_data
+    monkeypatch.setattr(
+        FakePyPIRequestHandler,
+        "send_data",
+        lambda self, data, etag, content_type, head, ranges=False: send_data(self, data, etag, content_type, head),
+    )
+    record = wheel.inspect_wheel(pkg, dist)
+    # the whole file arrives with the first request, and everything else is read from it
+    assert (record["requests"], record["bytes_fetched"]) == (1, dist.size)
+    assert record["metadata"]["name"] == "inspect-me"
+
+
+def add_metadata_file(fakepypi, dist, body, digest):
+    fakepypi.files[dist.filename + ".metadata"] = _with_etag(body)
+    project = json.loads(fakepypi.projects["inspect-me"][0])
+    for file in project["urls"]:
+        if file["filename"] == dist.filename:
+            file["core-metadata"] = {"sha256": digest}
+    fakepypi.projects["inspect-me"] = _with_etag(json.dumps(project).encode())
+    return api.OtletPackageObject("inspect-me")
+
+
+def test_metadata_file(fakepypi, inspected):
+    _, dist = inspected
+    body = METADATA.encode()
+    pkg = add_metadata_file(fakepypi, dist, body, hashlib.sha256(body).hexdigest())
+    record = wheel.inspect_wheel(pkg, dist)
+    assert (record["source"], record["requests"], record["bytes_fetched"]) == ("metadata-file", 1, len(body))
+    assert record["metadata"]["requires_dist"] == ["idna (>=2.5)", "six"]
+    # entry points are only in the wheel itself
+    assert wheel.inspect_wheel(pkg, dist, entry_points=True)["source"] == "range-requests"
+
+    pkg = add_metadata_file(fakepypi, dist, body, hashlib.sha256(b"something else").hexdigest())
+    with pytest.raises(IOError):
+        wheel.inspect_wheel(pkg, dist)
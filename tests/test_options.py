@@ -0,0 +1,82 @@
+import os
+import sys
+import subprocess
+import pytest
+from otlet_cli.clparser.options import OtletArgumentParser, find_subcommand, move_common_options
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["six"], None),
+        (["six", "1.16.0"], None),
+        (["releases", "six"], "releases"),
+        (["--format", "json", "releases", "six"], "releases"),
+        (["--format=json", "releases", "six"], "releases"),
+        (["--index-url", "http://localhost/pypi", "download", "six"], "download"),
+        (["-v", "--trace", "trace.json", "deps", "six"], "deps"),
+        # a package that is named like a sub-command is only one after a '--'
+        (["--", "releases"], None),
+        # only the first positional argument can name a sub-command
+        (["six", "releases"], None),
+        (["--format", "releases", "six"], None),
+        ([], None),
+    ],
+)
+def test_find_subcommand(argv, expected):
+    assert find_subcommand(argv) == expected
+
+
+def test_move_common_options():
+    argv = ["--format", "json", "-v", "releases", "six", "--sort", "date"]
+    assert move_common_options(argv) == ["releases", "--format", "json", "-v", "six", "--sort", "date"]
+    assert move_common_options(["releases", "six"]) == ["releases", "six"]
+    assert move_common_options(["six", "--format", "json"]) == ["six", "--format", "json"]
+
+
+def parse(argv):
+    return OtletArgumentParser(argv).parse_args(argv)
+
+
+def test_options_before_subcommand():
+    args = parse(["--format", "json", "releases", "six"])
+    assert args.subcommand == "releases"
+    assert args.format == "json"
+    assert args.package == ["six"]
+    args = parse(["--index-url", "http://localhost/pypi", "releases", "six"])
+    assert args.index_url == ["http://localhost/pypi"]
+    assert args.package == ["six"]
+
+
+def test_default_invocation():
+    args = parse(["six", "1.16.0", "--format", "ndjson"])
+    assert args.subcommand is None
+    assert args.package == ["six"]
+    assert args.package_version == "1.16.0"
+    assert args.format == "ndjson"
+
+
+def test_top_level_help(capsys):
+    with pytest.raises(SystemExit):
+        parse(["--help"])
+    help_text = capsys.readouterr().out
+    assert "package_name" in help_text
+    for option in ("--format", "--index-url", "--no-cache", "releases", "download", "cache"):
+        assert option in help_text
+
+
+def test_cache_does_not_import_otlet(tmp_path):
+    # run in a fresh interpreter, since the test session has imported otlet already
+    code = (
+        "import sys\n"
+        "from otlet_cli import cli\n"
+        "sys.argv = ['otlet', 'cache', 'stats']\n"
+        "try:\n"
+        "    cli.run_cli()\n"
+        "except SystemExit as err:\n"
+        "    assert not err.code, err.code\n"
+        "print(sorted(name for name in sys.modules if name == 'otlet' or name.startswith('otlet.')))\n"
+    )
+    env = {**os.environ, "OTLET_CACHE_DIR": str(tmp_path / "cache")}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
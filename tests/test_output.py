@@ -0,0 +1,77 @@
+import sys
+import json
+import signal
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from otlet.packaging.version import parse
+from otlet_cli import cli, config, output
+
+
+@pytest.fixture
+def output_format(monkeypatch):
+    def set_format(name):
+        monkeypatch.setitem(config, "format", name)
+
+    return set_format
+
+
+def test_ndjson_writer(output_format, capsys):
+    output_format("ndjson")
+    assert output.emit_all([{"n": 1}, {"n": 2}, {"n": 3}]) == 3
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+
+def test_json_writer(output_format, capsys):
+    output_format("json")
+    with output.RecordWriter() as writer:
+        writer.write({"n": 1})
+        # the array is written incrementally, not only once every record is known
+        assert capsys.readouterr().out == '[{"n": 1}'
+        writer.write({"n": 2})
+    assert capsys.readouterr().out == ',\n{"n": 2}]\n'
+
+
+@pytest.mark.parametrize("name, expected", [("json", "[]\n"), ("ndjson", "")])
+def test_writers_without_records(output_format, capsys, name, expected):
+    output_format(name)
+    assert output.emit_all([]) == 0
+    assert capsys.readouterr().out == expected
+
+
+def test_emit(capsys):
+    output.emit({"name": "six", "version": "1.16.0"})
+    assert capsys.readouterr().out == '{"name": "six", "version": "1.16.0"}\n'
+
+
+def test_encode_otlet_values():
+    record = {
+        "upload_time": datetime(2021, 5, 5, 14, 30),
+        "digests": SimpleNamespace(sha256="abc"),
+        "version": parse("1.16.0"),
+        "name": "naïve",
+    }
+    assert json.loads(output.encode(record)) == {
+        "upload_time": "2021-05-05T14:30:00",
+        "digests": {"sha256": "abc"},
+        "version": "1.16.0",
+        "name": "naïve",
+    }
+    assert "naïve" in output.encode(record)
+
+
+@pytest.mark.parametrize("name", ["json", "ndjson"])
+def test_releases_output(fakepypi, monkeypatch, capsys, name):
+    fakepypi.add_project("test-output", releases=3)
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    monkeypatch.setattr(sys, "argv", ["otlet", "--format", name, "releases", "test-output"])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    assert not cli.main()
+    out = capsys.readouterr().out
+    records = json.loads(out) if name == "json" else [json.loads(line) for line in out.splitlines()]
+    assert [(r["name"], r["version"], r["yanked"]) for r in records] == [
+        ("test-output", version, False) for version in ("0.0.1", "0.0.2", "0.0.3")
+    ]
+    assert records[0]["upload_time"].startswith("2015-01-01T00:00:00")
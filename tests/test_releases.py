@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from otlet.packaging.version import parse
+from otlet_cli.releases import ReleaseIndex
+
+START = datetime(2020, 1, 1)
+
+
+def files(day, yanked=False):
+    return [SimpleNamespace(upload_time=START + timedelta(days=day), yanked=yanked)]
+
+
+@pytest.fixture
+def index():
+    # versions are uploaded out of order, i.e. a fix for an old branch after a newer release
+    return ReleaseIndex(
+        {
+            "1.0": files(0),
+            "1.1": files(10),
+            "2.0rc1": files(20),
+            "2.0": files(30) + files(31),
+            "1.2": files(40, yanked=True),
+            "2.1": files(50, yanked=True) + files(51),
+            "3.0.dev0": [],
+        }
+    )
+
+
+def names(releases):
+    return [r.name for r in releases]
+
+
+def test_sorted_by_version(index):
+    assert len(index) == 7
+    assert names(index.query()) == ["1.0", "1.1", "1.2", "2.0rc1", "2.0", "2.1", "3.0.dev0"]
+
+
+def test_release_attributes(index):
+    releases = {r.name: r for r in index.query()}
+    assert releases["2.0"].upload_time == START + timedelta(days=30)
+    assert releases["1.2"].yanked
+    # only yanked if all of its files are
+    assert not releases["2.1"].yanked
+    assert releases["3.0.dev0"].upload_time is None and not releases["3.0.dev0"].yanked
+
+
+def test_version_bounds_are_exclusive(index):
+    assert names(index.query(after_version="1.1")) == ["1.2", "2.0rc1", "2.0", "2.1", "3.0.dev0"]
+    assert names(index.query(before_version="2.0")) == ["1.0", "1.1", "1.2", "2.0rc1"]
+    assert names(index.query(after_version="1.0", before_version="2.0")) == ["1.1", "1.2", "2.0rc1"]
+    # bounds don't have to be releases themselves
+    assert names(index.query(after_version="1.5", before_version="2.0.5")) == ["2.0rc1", "2.0"]
+    assert index.query(after_version="2.0", before_version="2.0") == []
+
+
+def test_date_bounds_are_inclusive(index):
+    after, before = START + timedelta(days=10), START + timedelta(days=40)
+    assert names(index.query(after_date=after, before_date=before)) == ["1.1", "1.2", "2.0rc1", "2.0"]
+    assert names(index.query(after_date=after, before_date=before, sort="date")) == ["1.1", "2.0rc1", "2.0", "1.2"]
+    # releases without files have no upload time, so any date bound leaves them out
+    assert "3.0.dev0" not in names(index.query(after_date=START))
+
+
+def test_sort_by_date(index):
+    assert names(index.query(sort="date")) == ["3.0.dev0", "1.0", "1.1", "2.0rc1", "2.0", "1.2", "2.1"]
+    assert names(index.query(after_version="1.0", before_version="2.1", sort="date")) == ["1.1", "2.0rc1", "2.0", "1.2"]
+
+
+def test_combined_bounds_match_full_scan():
+    # enough releases that both the version and the date range end up being the smaller one
+    releases = {f"{i // 10}.{i % 10}": files((i * 7) % 100) for i in range(100)}
+    index = ReleaseIndex(releases)
+    for after_version, before_version in [(None, None), ("0.5", "9.5"), ("4.0", "4.9"), ("1.0", None)]:
+        for after_day, before_day in [(None, None), (0, 5), (10, 90), (None, 50), (50, None)]:
+            after_date = START + timedelta(days=after_day) if after_day is not None else None
+            before_date = START + timedelta(days=before_day) if before_day is not None else None
+            expected = [
+                name
+                for name, _files in releases.items()
+                if (after_version is None or parse(name) > parse(after_version))
+                and (before_version is None or parse(name) < parse(before_version))
+                and (after_date is None or _files[0].upload_time >= after_date)
+                and (before_date is None or _files[0].upload_time <= before_date)
+            ]
+            result = index.query(after_version, before_version, after_date, before_date)
+            assert names(result) == sorted(expected, key=parse)
+            result = index.query(after_version, before_version, after_date, before_date, sort="date")
+            assert names(result) == sorted(expected, key=lambda name: releases[name][0].upload_time)
@@ -0,0 +1,144 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+from otlet.exceptions import PyPIPackageNotFound
+from otlet_cli import daemon, server
+
+
+@pytest.fixture
+def otlet_daemon(monkeypatch):
+    """An 'otlet serve' daemon on a local port, which the daemon client is pointed at."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.OtletRequestHandler)
+    httpd.daemon_threads = True
+    httpd.packages = server.PackageCache()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OTLET_DAEMON", f"http://127.0.0.1:{httpd.server_address[1]}")
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_daemon_round_trip(fakepypi, otlet_daemon):
+    fakepypi.add_project("served")
+    body = daemon.fetch("/served/json")
+    assert body == fakepypi.projects["served"][0]
+    assert daemon.fetch("/served/json") == body
+    stats = otlet_daemon.packages.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_daemon_query_endpoints(fakepypi, otlet_daemon):
+    fakepypi.add_project("served-queries", releases=2)
+    conn = daemon.connect()
+    conn.request("GET", "/releases/served-queries")
+    res = conn.getresponse()
+    assert res.status == 200
+    assert [record["version"] for record in json.loads(res.read())] == ["0.0.1", "0.0.2"]
+    conn.request("GET", "/info/served-missing")
+    res = conn.getresponse()
+    assert res.status == 404
+    assert "error" in json.loads(res.read())
+    conn.close()
+
+
+def test_daemon_rejects_other_index(fakepypi, otlet_daemon):
+    fakepypi.add_project("served-elsewhere")
+    conn = daemon.connect()
+    conn.request("GET", "/pypi/served-elsewhere/json", headers={"X-Otlet-Index": "https://example.com/pypi"})
+    res = conn.getresponse()
+    assert res.status == 409
+    assert res.read().decode() == fakepypi.index_url
+    conn.close()
+    assert otlet_daemon.packages.stats()["entries"] == 0
+
+
+def test_client_falls_back_on_other_index(fakepypi, otlet_daemon, monkeypatch):
+    # only the client queries another index
+    monkeypatch.setattr(daemon, "index", SimpleNamespace(index_url=lambda: "https://example.com/pypi"))
+    # the daemon answers 409, which the client takes as 'no daemon'
+    assert daemon.fetch("/served/json") is None
+
+
+def test_fetch_without_daemon(monkeypatch, tmp_path):
+    monkeypatch.setenv("OTLET_DAEMON", str(tmp_path / "missing.sock"))
+    assert daemon.fetch("/six/json") is None
+
+
+def test_cache_keeps_no_fetch_locks(fakepypi):
+    fakepypi.add_project("cached-locks")
+    cache = server.PackageCache()
+    for _ in range(3):
+        cache.get("cached-locks")
+        cache.get("Cached_Locks")
+    with pytest.raises(PyPIPackageNotFound):
+        cache.get("cached-locks-missing")
+    with pytest.raises(PyPIPackageNotFound):
+        cache.get("cached-locks-missing")
+    assert (cache.hits, cache.misses) == (6, 2)
+    assert cache._fetching == {}
+
+
+def test_concurrent_lookups_share_a_fetch(fakepypi, monkeypatch):
+    fakepypi.add_project("cached-shared")
+    cache = server.PackageCache()
+    fetches = []
+    fetch = cache._fetch
+
+    def slow_fetch(name, version, refresh):
+        fetches.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return fetch(name, version, refresh)
+
+    monkeypatch.setattr(cache, "_fetch", slow_fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("cached-shared"))) for _ in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert len(fetches) == 1
+    assert len(results) == 8 and all(pkg is results[0] for pkg in results)
+    assert cache._fetching == {}
+
+
+def test_refresh_fetches_are_serialized(fakepypi, monkeypatch):
+    fakepypi.add_project("cached-refresh")
+    cache = server.PackageCache()
+    running = []
+    overlapped = []
+    fetch = cache._fetch
+
+    def slow_fetch(name, version, refresh):
+        running.append(1)
+        overlapped.append(len(running) > 1)
+        time.sleep(0.02)
+        try:
+            return fetch(name, version, refresh)
+        finally:
+            running.pop()
+
+    monkeypatch.setattr(cache, "_fetch", slow_fetch)
+    threads = [threading.Thread(target=cache.get, args=("cached-refresh", None, True)) for _ in range(12)]
+    for th in threads:
+        # staggered, so some requests arrive while others still wait for an earlier fetch
+        th.start()
+        time.sleep(0.005)
+    for th in threads:
+        th.join()
+    assert not any(overlapped)
+    assert cache._fetching == {}
+
+
+def test_cache_expires_and_evicts(fakepypi):
+    for name in ("cached-a", "cached-b"):
+        fakepypi.add_project(name)
+    cache = server.PackageCache(max_entries=1, ttl=0)
+    first = cache.get("cached-a")
+    time.sleep(0.01)
+    assert cache.get("cached-a") is not first
+    cache.get("cached-b")
+    assert cache.stats()["entries"] == 1
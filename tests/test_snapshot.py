@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import zlib
+import signal
+from urllib.error import HTTPError
+import pytest
+from otlet_cli import cli, snapshot
+
+
+@pytest.fixture(autouse=True)
+def no_open_snapshot(monkeypatch):
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+def test_snapshot_key():
+    assert snapshot.snapshot_key("Zope.Interface") == "zope-interface"
+    assert snapshot.snapshot_key("zope_interface", "5.4.0") == "zope-interface/5.4.0"
+
+
+def test_create_and_lookup(fakepypi, tmp_path):
+    for name in ("snap-a", "Snap_B"):
+        fakepypi.add_project(name, releases=2)
+    path = str(tmp_path / "snapshot")
+    stats, errors = snapshot.create_snapshot(path, [("snap-a", None), ("Snap_B", None), ("snap-missing", None)])
+    assert [(key, err.code) for key, err in errors] == [("snap-missing", 404)]
+    assert (stats["projects"], stats["entries"]) == (2, 2)
+
+    _snapshot = snapshot.Snapshot(path)
+    # every entry is the offset and length of its compressed body in the data file, stored back to back
+    with open(os.path.join(path, snapshot.INDEX_FILE)) as f:
+        data_name = json.load(f)["data"]
+    with open(os.path.join(path, data_name), "rb") as f:
+        data = f.read()
+    offset = 0
+    for key in ("snap-a", "snap-b"):
+        start, length = _snapshot.entries[key]
+        assert start == offset
+        assert zlib.decompress(data[start : start + length]) == fakepypi.projects[key][0]
+        offset += length
+    assert offset == len(data) == stats["size"]
+
+    assert _snapshot.lookup("/snap-a/json") == fakepypi.projects["snap-a"][0]
+    assert _snapshot.lookup("/SNAP.B/json") == fakepypi.projects["snap-b"][0]
+    with pytest.raises(HTTPError) as err:
+        _snapshot.lookup("/snap-missing/json")
+    assert err.value.code == 404
+    _snapshot._data.close()
+
+
+def test_recreate_replaces_data_file(fakepypi, tmp_path):
+    fakepypi.add_project("snap-replaced")
+    path = str(tmp_path / "snapshot")
+    snapshot.create_snapshot(path, [("snap-replaced", None)])
+    snapshot.create_snapshot(path, [("snap-replaced", None)])
+    assert len([name for name in os.listdir(path) if name.endswith(".dat")]) == 1
+
+
+def test_offline_reads_snapshot(fakepypi, tmp_path, monkeypatch, capsys):
+    fakepypi.add_project("snap-offline", releases=3)
+    path = str(tmp_path / "snapshot")
+    monkeypatch.setenv("OTLET_SNAPSHOT", path)
+    snapshot.create_snapshot(path, [("snap-offline", None)])
+    # gone from the index, so only the snapshot can answer
+    del fakepypi.projects["snap-offline"]
+    assert not run(monkeypatch, "--offline", "--format", "json", "releases", "snap-offline")
+    assert [record["version"] for record in json.loads(capsys.readouterr().out)] == ["0.0.1", "0.0.2", "0.0.3"]
+
+    assert run(monkeypatch, "--offline", "releases", "snap-other") == 1
+    assert "snap-other" in capsys.readouterr().err
+
+
+def test_offline_without_snapshot(tmp_path, monkeypatch, capsys):
+    assert run(monkeypatch, "--offline", "releases", "snap-none") == 1
+    assert "no usable snapshot" in capsys.readouterr().err
@@ -0,0 +1,118 @@
+import os
+import stat
+import hashlib
+import pytest
+from otlet_cli import download, store
+
+MiB = 1024 * 1024
+
+
+def sha256_of(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def wheel_store(monkeypatch, tmp_path):
+    monkeypatch.setenv("OTLET_STORE", "1")
+    return store.get_store()
+
+
+def test_store_keeps_a_read_only_copy(fakepypi, wheel_store, tmp_path):
+    url, sha256 = fakepypi.add_file("stored-1.0-py3-none-any.whl", 64 * 1024)
+    dest = str(tmp_path / "stored.whl")
+    assert download._download(url, dest, 1, digests={"sha256": sha256}).status == 0
+    stored = wheel_store.get(sha256)
+    assert stored is not None
+    assert not os.path.samefile(stored, dest)
+    assert stat.S_IMODE(os.stat(stored).st_mode) == 0o444
+
+
+def test_modified_download_does_not_change_store(fakepypi, wheel_store, tmp_path):
+    url, sha256 = fakepypi.add_file("edited-1.0-py3-none-any.whl", 64 * 1024)
+    first = str(tmp_path / "first.whl")
+    assert download._download(url, first, 1, digests={"sha256": sha256}).status == 0
+    with open(first, "r+b") as f:
+        f.write(b"modified")
+
+    second = str(tmp_path / "second.whl")
+    progress = download._download(url, second, 1, digests={"sha256": sha256}, size=64 * 1024)
+    assert progress.status == 0
+    assert progress.from_store
+    assert sha256_of(second) == sha256
+
+
+def test_corrupted_store_entry_is_evicted(fakepypi, wheel_store, tmp_path):
+    url, sha256 = fakepypi.add_file("corrupted-1.0-py3-none-any.whl", 64 * 1024)
+    first = str(tmp_path / "first.whl")
+    assert download._download(url, first, 1, digests={"sha256": sha256}).status == 0
+    stored = wheel_store.get(sha256)
+    os.chmod(stored, 0o644)
+    mtime = os.stat(stored).st_mtime_ns
+    with open(stored, "r+b") as f:
+        f.write(b"modified")
+    # make sure the mtime moved on, even on filesystems with a coarse timestamp granularity
+    os.utime(stored, ns=(mtime + 10**9, mtime + 10**9))
+
+    second = str(tmp_path / "second.whl")
+    progress = download._download(url, second, 1, digests={"sha256": sha256})
+    assert progress.status == 0
+    assert progress.from_store is None
+    assert sha256_of(second) == sha256
+    # the real download put a good copy back
+    assert sha256_of(wheel_store.get(sha256)) == sha256
+
+
+def test_link_checks_size(wheel_store, tmp_path):
+    path = tmp_path / "sized-1.0-py3-none-any.whl"
+    path.write_bytes(b"x" * 1000)
+    sha256 = sha256_of(path)
+    wheel_store.add(str(path), sha256)
+    assert wheel_store.link(sha256, str(tmp_path / "wrong.whl"), size=999) is None
+    assert wheel_store.get(sha256) is None
+    assert not os.path.exists(tmp_path / "wrong.whl")
+
+
+def test_link_serves_stored_copy(wheel_store, tmp_path):
+    path = tmp_path / "linked-1.0-py3-none-any.whl"
+    path.write_bytes(b"x" * 1000)
+    sha256 = sha256_of(path)
+    wheel_store.add(str(path), sha256)
+    assert wheel_store.get(sha256) == os.path.join(wheel_store._entry_dir(sha256), path.name)
+    dest = str(tmp_path / "linked.whl")
+    assert wheel_store.link(sha256, dest, size=1000) in ("reflink", "copy")
+    assert sha256_of(dest) == sha256
+
+
+def test_store_hit_is_a_private_copy(fakepypi, wheel_store, tmp_path):
+    url, sha256 = fakepypi.add_file("private-1.0-py3-none-any.whl", 64 * 1024)
+    assert download._download(url, str(tmp_path / "first.whl"), 1, digests={"sha256": sha256}).status == 0
+    second = str(tmp_path / "second.whl")
+    assert download._download(url, second, 1, digests={"sha256": sha256}).from_store
+    assert os.stat(second).st_nlink == 1
+    assert os.stat(second).st_mode & stat.S_IWUSR
+    # editing the copy leaves the store intact, so the next download is still served from it
+    with open(second, "r+b") as f:
+        f.write(b"modified")
+    third = str(tmp_path / "third.whl")
+    assert download._download(url, third, 1, digests={"sha256": sha256}).from_store
+    assert sha256_of(third) == sha256
+
+
+def test_link_hashes_only_changed_files(wheel_store, tmp_path, monkeypatch):
+    path = tmp_path / "hashed-1.0-py3-none-any.whl"
+    path.write_bytes(b"x" * 1000)
+    sha256 = sha256_of(path)
+    wheel_store.add(str(path), sha256)
+    hashed = []
+    file_sha256 = store.file_sha256
+    monkeypatch.setattr(store, "file_sha256", lambda p: hashed.append(p) or file_sha256(p))
+    dest = str(tmp_path / "hashed.whl")
+    assert wheel_store.link(sha256, dest) and wheel_store.link(sha256, dest)
+    assert hashed == []
+
+    stored = wheel_store.get(sha256)
+    mtime = os.stat(stored).st_mtime_ns
+    os.utime(stored, ns=(mtime + 10**9, mtime + 10**9))
+    assert wheel_store.link(sha256, dest) and wheel_store.link(sha256, dest)
+    assert hashed == [stored]
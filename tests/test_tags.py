@@ -0,0 +1,62 @@
+import pytest
+from otlet_cli import api, download, tags
+
+TARGET = "cp311-manylinux_2_17_x86_64"
+
+
+def test_parse_target():
+    assert tags.parse_target(TARGET) == ("cp311", "cp311", "manylinux_2_17_x86_64")
+    assert tags.parse_target("cp311-cp311t-win_amd64") == ("cp311", "cp311t", "win_amd64")
+    with pytest.raises(ValueError):
+        tags.parse_target("linux")
+
+
+def test_compatible_platforms():
+    platforms = tags.compatible_platforms("manylinux_2_17_x86_64")
+    assert platforms[:2] == ["manylinux_2_17_x86_64", "manylinux2014_x86_64"]
+    assert "manylinux2010_x86_64" in platforms and "manylinux1_x86_64" in platforms
+    assert platforms[-1] == "linux_x86_64"
+    assert "manylinux_2_28_x86_64" not in platforms
+    assert tags.compatible_platforms("macosx_11_0_arm64")[:2] == ["macosx_11_0_arm64", "macosx_11_0_universal2"]
+    assert "macosx_10_16_arm64" not in tags.compatible_platforms("macosx_11_0_arm64")
+
+
+def test_supported_tags_order():
+    supported = list(tags.supported_tags(*tags.parse_target(TARGET)))
+    assert len(supported) == len(set(supported))
+    assert supported[0] == ("cp311", "cp311", "manylinux_2_17_x86_64")
+    assert supported[1] == ("cp311", "cp311", "manylinux2014_x86_64")
+    order = [
+        ("cp311", "cp311", "linux_x86_64"),
+        ("cp311", "abi3", "manylinux_2_17_x86_64"),
+        ("cp311", "none", "manylinux_2_17_x86_64"),
+        ("cp37", "abi3", "manylinux2014_x86_64"),
+        ("py311", "none", "manylinux_2_17_x86_64"),
+        ("cp311", "none", "any"),
+        ("py3", "none", "any"),
+        ("py30", "none", "any"),
+    ]
+    assert [supported.index(tag) for tag in order] == sorted(supported.index(tag) for tag in order)
+    assert supported[-1] == ("py30", "none", "any")
+    assert ("cp311", "cp311", "win_amd64") not in supported
+    assert ("cp312", "abi3", "manylinux_2_17_x86_64") not in supported
+
+
+def test_rank_dists(fakepypi):
+    fakepypi.add_project(
+        "test-ranked",
+        wheels=[
+            "py3-none-any",
+            "cp311-cp311-manylinux_2_28_x86_64",
+            "cp39-abi3-manylinux2014_x86_64",
+            "cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64",
+            "cp311-cp311-win_amd64",
+        ],
+    )
+    dists = download.get_dists(api.OtletPackageObject("test-ranked"))
+    ranked = [dist.filename[len("test_ranked-0.0.1-"):-4] for _, dist in tags.rank_dists(dists, TARGET)]
+    assert ranked == [
+        "cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64",
+        "cp39-abi3-manylinux2014_x86_64",
+        "py3-none-any",
+    ]
@@ -0,0 +1,117 @@
+import sys
+import json
+import signal
+import threading
+import pytest
+from otlet_cli import cli, trace
+
+
+@pytest.fixture(autouse=True)
+def no_tracer(monkeypatch):
+    monkeypatch.setattr(trace, "_tracer", None)
+
+
+def test_disabled_tracing_records_nothing():
+    assert trace.span("fetch", "fetch") is trace.span("parse", "parse")
+    traced = trace.traced("fetch")(lambda: 42)
+    assert traced() == 42
+    trace.instant("message")
+    assert not trace.enabled()
+
+
+def test_self_times():
+    tracer = trace.Tracer()
+    ms = 1000000
+    tracer.events = [
+        ("main", "render", 0, 100 * ms, 1, None),
+        ("fetch", "fetch", 10 * ms, 40 * ms, 1, None),
+        ("request", "network", 15 * ms, 35 * ms, 1, None),
+        ("parse", "parse", 50 * ms, 60 * ms, 1, None),
+        # on another thread, so it doesn't count against main
+        ("download", "download", 20 * ms, 90 * ms, 2, None),
+        ("message", "log", 30 * ms, None, 1, None),
+    ]
+    assert tracer.self_times() == {
+        "render": [1, 100 * ms, 60 * ms],
+        "fetch": [1, 30 * ms, 10 * ms],
+        "network": [1, 20 * ms, 20 * ms],
+        "parse": [1, 10 * ms, 10 * ms],
+        "download": [1, 70 * ms, 70 * ms],
+    }
+
+
+def run(monkeypatch, fakepypi, *argv):
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    with pytest.raises(SystemExit) as exit:
+        cli.run_cli()
+    return exit.value.code
+
+
+def test_chrome_trace(fakepypi, tmp_path, monkeypatch, capsys):
+    fakepypi.add_project("traced", releases=3)
+    path = tmp_path / "trace.json"
+    assert run(monkeypatch, fakepypi, "-v", "--trace", str(path), "releases", "traced") == 0
+    assert f"Trace written to {path}" in capsys.readouterr().err
+    with open(path) as f:
+        document = json.load(f)
+    assert document["displayTimeUnit"] == "ms"
+    events = document["traceEvents"]
+    for event in events:
+        assert {"name", "cat", "ph", "ts", "pid", "tid"} <= event.keys()
+        assert isinstance(event["ts"], (int, float)) and event["ts"] >= 0
+        assert isinstance(event["pid"], int) and isinstance(event["tid"], int)
+        if event["ph"] == "X":
+            assert event["dur"] >= 0
+        else:
+            # verbose messages are instant events scoped to their thread
+            assert (event["ph"], event["s"], event["cat"]) == ("i", "t", "log")
+            assert "msg" in event["args"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert {"fetch", "network", "parse", "render"} <= {event["cat"] for event in complete}
+    assert any(event["ph"] == "i" for event in events)
+
+    # spans on a thread are either nested or disjoint, as the trace viewers expect
+    for first in complete:
+        for second in complete:
+            if first is second or first["tid"] != second["tid"] or first["ts"] > second["ts"]:
+                continue
+            first_end, second_end = first["ts"] + first["dur"], second["ts"] + second["dur"]
+            assert second_end <= first_end + 0.001 or second["ts"] >= first_end - 0.001
+
+
+def test_timings_summary(fakepypi, monkeypatch, capsys):
+    fakepypi.add_project("timed")
+    assert run(monkeypatch, fakepypi, "--timings", "releases", "timed") == 0
+    err = capsys.readouterr().err
+    assert "[phase]" in err
+    phases = [line.split()[0] for line in err.splitlines() if line and line.split()[0] in trace.CATEGORIES]
+    # in the order of CATEGORIES
+    assert phases == sorted(phases, key=trace.CATEGORIES.index)
+    assert {"fetch", "parse", "render"} <= set(phases)
+    assert "ms since startup" in err
+
+
+def test_spans_from_threads(tmp_path):
+    tracer = trace.enable(path=str(tmp_path / "trace.json"))
+    # keeps every thread alive until all are done, so none of them reuses another's id
+    barrier = threading.Barrier(8)
+
+    def work():
+        for _ in range(100):
+            with trace.span("work", "download", n=1):
+                pass
+        barrier.wait()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert len(tracer.events) == 800
+    assert len({event[4] for event in tracer.events}) == 8
+    tracer.write_chrome_trace(tracer.path)
+    with open(tracer.path) as f:
+        assert len(json.load(f)["traceEvents"]) == 800
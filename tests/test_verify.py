@@ -0,0 +1,93 @@
+import sys
+import json
+import signal
+import pytest
+from otlet_cli import cli, verify
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("zope.interface-5.4.0-cp39-cp39-manylinux2010_x86_64.whl", ("zope.interface", "5.4.0")),
+        ("zope.interface-5.4.0.tar.gz", ("zope.interface", "5.4.0")),
+        ("backports_zoneinfo-0.2.1.tar.gz", ("backports_zoneinfo", "0.2.1")),
+        ("pip-23.0.zip", ("pip", "23.0")),
+        ("README.txt", None),
+        ("no-version.tar.gz", None),
+    ],
+)
+def test_split_filename(filename, expected):
+    assert verify.split_filename(filename) == expected
+
+
+@pytest.fixture
+def wheelhouse(fakepypi, tmp_path):
+    """A directory with a file of every kind 'otlet verify' tells apart, by the status expected for it."""
+    # larger than MMAP_THRESHOLD, so it is hashed through a memory map
+    fakepypi.add_project("verify-me", releases=2, wheels=["py3-none-any"], file_size=2 * 1024 * 1024)
+    directory = tmp_path / "wheelhouse"
+    (directory / "nested").mkdir(parents=True)
+    (directory / ".hidden").mkdir()
+    files = {}
+
+    def add(path, data, status):
+        (directory / path).write_bytes(data)
+        files[str(directory / path)] = status
+
+    add("verify-me-0.0.2.tar.gz", fakepypi.files["verify-me-0.0.2.tar.gz"][0], "ok")
+    wheel = bytearray(fakepypi.files["verify_me-0.0.2-py3-none-any.whl"][0])
+    wheel[-1] ^= 1
+    add("nested/verify_me-0.0.2-py3-none-any.whl", bytes(wheel), "mismatch")
+    add("verify-me-9.9.tar.gz", b"a release the index doesn't have", "unknown")
+    add("README.txt", b"not a distribution", "unknown")
+    add("verify-missing-1.0.tar.gz", b"a project the index doesn't have", "error")
+    (directory / ".hidden" / "verify-me-0.0.1.tar.gz").write_bytes(b"skipped")
+    return directory, files
+
+
+def test_verify_files(wheelhouse):
+    directory, files = wheelhouse
+    scanned = verify.scan(str(directory))
+    assert sorted(file.path for file in scanned) == sorted(files)
+    results = list(verify.verify_files(scanned, processes=2))
+    assert [result.file for result in results] == scanned
+    assert {result.file.path: result.status for result in results} == files
+    by_name = {result.file.filename: result for result in results}
+    mismatch = by_name["verify_me-0.0.2-py3-none-any.whl"]
+    assert mismatch.expected != mismatch.actual and mismatch.expected is not None
+    assert by_name["verify-me-9.9.tar.gz"].error == "not published for verify-me 9.9"
+    assert by_name["verify-missing-1.0.tar.gz"].error == "not found on the index"
+
+
+def run(monkeypatch, fakepypi, *argv):
+    monkeypatch.setenv("OTLET_INDEX_URL", fakepypi.index_url)
+    monkeypatch.setattr(sys, "argv", ["otlet", *argv])
+    # main() installs its own handler for ^C
+    monkeypatch.setattr(signal, "signal", lambda *_: None)
+    return cli.main()
+
+
+def test_verify_output(fakepypi, wheelhouse, monkeypatch, capsys):
+    directory, files = wheelhouse
+    assert run(monkeypatch, fakepypi, "verify", str(directory)) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert out[-1].endswith(": 1 ok, 1 mismatched, 2 unknown, 1 failed")
+    assert any(line.startswith("\u001b[31mmismatch: ") and "verify_me-0.0.2-py3-none-any.whl" in line for line in out)
+
+    assert run(monkeypatch, fakepypi, "--format", "json", "verify", str(directory)) == 1
+    summary = json.loads(capsys.readouterr().out)["summary"]
+    assert summary == {
+        "files": 5,
+        "bytes": sum(file.size for file in verify.scan(str(directory))),
+        "ok": 1,
+        "mismatch": 1,
+        "unknown": 2,
+        "error": 1,
+    }
+
+
+def test_verified_directory_passes(fakepypi, tmp_path, monkeypatch, capsys):
+    fakepypi.add_project("verify-clean")
+    (tmp_path / "verify-clean-0.0.1.tar.gz").write_bytes(fakepypi.files["verify-clean-0.0.1.tar.gz"][0])
+    (tmp_path / "notes.txt").write_bytes(b"unknown files alone don't fail verification")
+    assert run(monkeypatch, fakepypi, "verify", str(tmp_path)) == 0
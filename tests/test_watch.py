@@ -0,0 +1,121 @@
+import gzip
+import json
+import pytest
+from benchmarks.fakepypi import FakePyPIRequestHandler, _with_etag, canonical_name
+from otlet_cli import watch
+
+
+def set_yanked(fakepypi, name, version):
+    data = json.loads(fakepypi.projects[canonical_name(name)][0])
+    for file in data["releases"][version]:
+        file["yanked"], file["yanked_reason"] = True, "broken"
+    fakepypi.projects[canonical_name(name)] = _with_etag(json.dumps(data).encode())
+
+
+def test_release_events(fakepypi):
+    fakepypi.add_project("watch-events", releases=2)
+    watcher = watch.Watcher(["watch-events"], {})
+    # the first check only records the releases
+    assert watcher.check("watch-events") == []
+    assert sorted(watcher.state["watch-events"]["releases"]) == ["0.0.1", "0.0.2"]
+
+    # unchanged, answered with a '304 Not Modified'
+    assert watcher.check("watch-events") == []
+    assert watcher.stats["not_modified"] == 1
+
+    fakepypi.add_project("watch-events", releases=3)
+    assert watcher.check("watch-events") == [
+        {"event": "release", "package": "watch-events", "version": "0.0.3", "yanked": False}
+    ]
+    set_yanked(fakepypi, "watch-events", "0.0.1")
+    assert watcher.check("watch-events") == [
+        {"event": "yanked", "package": "watch-events", "version": "0.0.1", "reason": "broken"}
+    ]
+    fakepypi.add_project("watch-events", releases=3)
+    assert watcher.check("watch-events") == [{"event": "unyanked", "package": "watch-events", "version": "0.0.1"}]
+    assert watcher.stats == {"checks": 5, "not_modified": 1, "changed": 3, "errors": 0}
+
+
+def test_errors_are_reported_once(fakepypi):
+    fakepypi.add_project("watch-removed")
+    watcher = watch.Watcher(["watch-removed"], {})
+    watcher.check("watch-removed")
+    del fakepypi.projects["watch-removed"]
+    assert watcher.check("watch-removed") == [{"event": "error", "package": "watch-removed", "error": "not found"}]
+    assert watcher.check("watch-removed") == []
+    assert watcher.stats["errors"] == 2
+
+    # once it is back, the error clears, and nothing changed in between
+    fakepypi.add_project("watch-removed")
+    assert watcher.check("watch-removed") == []
+    assert "error" not in watcher.state["watch-removed"]
+
+
+@pytest.mark.parametrize("body", [b'{"releases": {"1.0": [', b"<html>Service Unavailable</html>"])
+def test_malformed_response_is_an_error(fakepypi, body):
+    fakepypi.add_project("watch-malformed")
+    watcher = watch.Watcher(["watch-malformed"], {})
+    watcher.check("watch-malformed")
+    fakepypi.projects["watch-malformed"] = _with_etag(body)
+    events = watcher.check("watch-malformed")
+    assert [event["event"] for event in events] == ["error"]
+    # the releases seen last are kept, so nothing is reported as removed once the response is valid again
+    assert sorted(watcher.state["watch-malformed"]["releases"]) == ["0.0.1"]
+    fakepypi.add_project("watch-malformed", releases=2)
+    assert [event["event"] for event in watcher.check("watch-malformed")] == ["release"]
+
+
+def dropped_connection(self):
+    # close the connection halfway through the body, as an overloaded server or proxy might
+    self.send_response(200)
+    self.send_header("Content-Length", "1000")
+    self.end_headers()
+    self.wfile.write(b'{"releases": ')
+    self.close_connection = True
+
+
+def truncated_gzip(self):
+    body = gzip.compress(json.dumps({"releases": {}}).encode())[:-10]
+    self.send_response(200)
+    self.send_header("Content-Encoding", "gzip")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+
+@pytest.mark.parametrize("broken", [dropped_connection, truncated_gzip])
+def test_broken_response_does_not_stop_run(fakepypi, monkeypatch, broken):
+    for name in ("watch-ok", "watch-broken"):
+        fakepypi.add_project(name)
+    respond = FakePyPIRequestHandler.respond
+    monkeypatch.setattr(
+        FakePyPIRequestHandler,
+        "respond",
+        lambda self, head: broken(self) if "watch-broken" in self.path else respond(self, head),
+    )
+    state = {}
+    watcher = watch.Watcher(["watch-ok", "watch-broken"], state)
+    events = []
+    saves = []
+    watcher.run(events.append, lambda: saves.append(1), once=True)
+    assert [(event["event"], event["package"]) for event in events] == [("error", "watch-broken")]
+    assert "releases" in state["watch-ok"]
+    assert saves
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "watch.json")
+    assert watch.load_state(path) == {}
+    state = {"six": {"etag": '"abc"', "releases": {"1.0": None, "1.1": "broken"}, "checked": 1.5}}
+    watch.save_state(path, state)
+    assert watch.load_state(path) == state
+    assert [name for name in tmp_path.iterdir()] == [tmp_path / "watch.json"]
+
+
+def test_poll_interval_follows_release_gap():
+    watcher = watch.Watcher([], {}, interval=60, max_interval=3600)
+    # a project releasing daily is checked more often than one releasing yearly
+    assert watcher.poll_interval({"gap": 86400}, 0) == 86400 / watch.CHECKS_PER_RELEASE
+    assert watcher.poll_interval({"gap": 365 * 86400}, 0) == 3600
+    assert watcher.poll_interval({}, 0) == 3600
+    assert watcher.poll_interval({"gap": 365 * 86400, "changed": 100}, 200) == 60
@@ -0,0 +1,66 @@
+import pytest
+from otlet_cli import api, download
+from otlet_cli.clparser.options import OtletArgumentParser
+
+WHEELS = [
+    "cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64",
+    "cp311-cp311-win_amd64",
+    "cp310-cp310-manylinux_2_17_x86_64",
+    "py2.py3-none-any",
+]
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("six-1.16.0-py2.py3-none-any.whl", ("six", "1.16.0", None, "py2.py3", "none", "any")),
+        (
+            "numpy-1.26.0-1-cp311-cp311-manylinux_2_17_x86_64.whl",
+            ("numpy", "1.26.0", "1", "cp311", "cp311", "manylinux_2_17_x86_64"),
+        ),
+        (
+            "foo-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.WHL",
+            ("foo", "1.0", None, "cp311", "cp311", "manylinux_2_17_x86_64.manylinux2014_x86_64"),
+        ),
+        ("six-1.16.0.tar.gz", None),
+        ("foo-1.0.whl", None),
+        ("foo-1.0-bar-py3-none-any.whl", None),
+    ],
+)
+def test_parse_wheel_filename(filename, expected):
+    assert download.parse_wheel_filename(filename) == expected
+
+
+@pytest.fixture(scope="module")
+def wheels_package(fakepypi):
+    fakepypi.add_project("test-wheels", releases=2, wheels=WHEELS)
+    return api.OtletPackageObject("test-wheels")
+
+
+def test_get_dists_splits_wheel_tags(wheels_package):
+    dists = download.get_dists(wheels_package)
+    assert len(dists) == len(WHEELS) + 1
+    sdist = [dist for dist in dists.values() if dist.dist_type != "bdist_wheel"]
+    assert [dist.filename for dist in sdist] == ["test-wheels-0.0.2.tar.gz"]
+    wheels = {dist.filename: dist for dist in dists.values() if dist.dist_type == "bdist_wheel"}
+    dist = wheels["test_wheels-0.0.2-cp311-cp311-win_amd64.whl"]
+    assert (dist.python_tag, dist.abi_tag, dist.platform_tag) == ("cp311", "cp311", "win_amd64")
+
+
+@pytest.mark.parametrize(
+    "selector, expected",
+    [
+        ("python_tag:cp311", {WHEELS[0], WHEELS[1]}),
+        ("python_tag:py3", {WHEELS[3]}),
+        ("platform_tag:manylinux2014_x86_64", {WHEELS[0], WHEELS[3]}),
+        ("python_tag:cp3*,platform_tag:manylinux*x86_64", {WHEELS[0], WHEELS[2]}),
+        ("platform_tag:solaris*", {WHEELS[3]}),
+    ],
+)
+def test_get_dists_selects_by_tag(wheels_package, selector, expected):
+    argv = ["download", "test-wheels", "-w", selector]
+    opt_dict = OtletArgumentParser(argv).parse_args(argv).whl_options
+    dists = download.get_dists(wheels_package, opt_dict).values()
+    # sdists carry no wheel tags, so no selector excludes them
+    assert {dist.filename for dist in dists if dist.dist_type != "bdist_wheel"} == {"test-wheels-0.0.2.tar.gz"}
+    assert {dist.filename[len("test_wheels-0.0.2-"):-4] for dist in dists if dist.dist_type == "bdist_wheel"} == expected